@@ -1,3 +1,5 @@
+import os
+
 class DataPaths:
     CITY_TARGET_PASSENGER_RATING = 'csv_files/city_target_passenger_rating.csv'
     DIM_CITY = 'csv_files/dim_city.csv'
@@ -8,3 +10,146 @@ class DataPaths:
     MONTHLY_TARGET_NEW_PASSENGERS = 'csv_files/monthly_target_new_passengers.csv'
     MONTHLY_TARGET_TRIPS = 'csv_files/monthly_target_trips.csv'
     BACKGROUND_IMAGE = 'video_presentation_background_img.jpg'
+
+    # Fixed-name satisfaction model artifacts (read by the Streamlit app)
+    SATISFACTION_MODEL = 'models/satisfaction_predictor.joblib'
+    SATISFACTION_SCALER = 'models/scaler.joblib'
+    # Versioned satisfaction models published by train_model for the API
+    MODEL_REGISTRY = 'models/registry'
+    # Offline satisfaction scores for every trip, written by bulk_scoring
+    FACT_TRIPS_SCORES = 'csv_files/fact_trips_satisfaction.parquet'
+
+    CSV_TABLES = [
+        CITY_TARGET_PASSENGER_RATING,
+        DIM_CITY,
+        DIM_DATE,
+        DIM_REPEAT_TRIP_DISTRIBUTION,
+        FACT_PASSENGER_SUMMARY,
+        FACT_TRIPS,
+        MONTHLY_TARGET_NEW_PASSENGERS,
+        MONTHLY_TARGET_TRIPS
+    ]
+
+    # Loader used by the shared dataset store: 'columnar' reads a typed
+    # Parquet copy kept next to each CSV (rebuilt when stale), 'csv' always
+    # parses the CSV text
+    LOADER_MODE = 'columnar'
+    COLUMNAR_EXTENSION = '.parquet'
+
+class DataSchemas:
+    # Column dtypes applied when a table is ingested into its columnar copy
+    CATEGORICAL = ['city_id', 'passenger_type', 'day_type']
+    DATETIME = ['date', 'month', 'start_of_month']
+    FLOAT32 = ['passenger_rating', 'driver_rating']
+
+class ExecutionConfig:
+    # Bounded pools used by the routers to keep blocking work off the event loop
+    THREAD_POOL_WORKERS = 8
+    PROCESS_POOL_WORKERS = 2
+    # 'spawn' keeps workers free of the parent's threads and pyplot state
+    PROCESS_START_METHOD = 'spawn'
+    # Maximum concurrently executing requests per endpoint; extra requests queue
+    DEFAULT_ENDPOINT_CONCURRENCY = 4
+    ENDPOINT_CONCURRENCY = {
+        'ml/train-satisfaction-model': 1
+    }
+
+class ModelRegistryConfig:
+    # Published model versions kept on disk (the current one is never pruned)
+    RETAINED_VERSIONS = 10
+    # Versions kept unpickled in memory per process, current one included
+    RESIDENT_VERSIONS = 3
+
+class TrainingConfig:
+    # How train_model fits: 'in_memory' loads fact_trips and uses scikit-learn,
+    # 'streaming' fits from sufficient statistics accumulated over chunks,
+    # then measures the fit's errors in a second pass
+    MODE = 'in_memory'
+    STREAMING_CHUNK_SIZE = 500_000
+    # Streaming mode: rows are assigned to CV_FOLDS random folds; the first is
+    # the test split
+    CV_FOLDS = 5
+    RANDOM_SEED = 42
+    # Also fit one model per city_id (in-memory fit), trained in parallel with
+    # the global model in CITY_WORKERS processes (None = cpu count). Cities
+    # with fewer than MIN_CITY_ROWS complete rows use the global model
+    PER_CITY = False
+    CITY_WORKERS = None
+    MIN_CITY_ROWS = 1000
+
+class TrainingJobConfig:
+    # Background training jobs: where workers write progress, and how many
+    # finished jobs are kept for the status endpoint
+    PROGRESS_DIR = 'cache/jobs'
+    FINISHED_JOBS_RETAINED = 50
+
+class PlotCacheConfig:
+    # Rendered charts are cached per (data version, analysis, plot parameters)
+    ENABLED = True
+    # Bounded in-memory LRU tier, in analyses (each holds all of its charts)
+    MEMORY_ENTRIES = 32
+    # On-disk tier, shared by worker processes and kept across restarts;
+    # least recently used files are deleted beyond DISK_MAX_BYTES
+    DISK_DIR = 'cache/plots'
+    DISK_MAX_BYTES = 256 * 1024 * 1024
+
+class ResponseCacheConfig:
+    # Serialized /analysis/* responses keyed on route, parameters and dataset
+    # version. The memory tier is an LRU bounded by total body size; bodies
+    # above MAX_ENTRY_BYTES skip it. The disk tier is optional and, like the
+    # plot cache's, deletes least recently used files beyond DISK_MAX_BYTES
+    ENABLED = True
+    MEMORY_BYTES = 64 * 1024 * 1024
+    MAX_ENTRY_BYTES = 8 * 1024 * 1024
+    DISK_ENABLED = False
+    DISK_DIR = 'cache/responses'
+    DISK_MAX_BYTES = 256 * 1024 * 1024
+
+class WarmupConfig:
+    # Background precomputation of every analysis into the response cache at
+    # startup, repeated whenever the dataset version changes (checked every
+    # POLL_SECONDS). CONCURRENCY bounds the analyses computed at once
+    ENABLED = True
+    CONCURRENCY = 2
+    INCLUDE_PLOTS = (True, False)
+    POLL_SECONDS = 5
+
+class MetricsConfig:
+    # Stage timings of the services, exported at /metrics. Disabled, the
+    # services' stage marks do nothing
+    ENABLED = True
+    PREFIX = 'city_analysis'
+    LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class ProfilingConfig:
+    # Opt-in profiling of single analysis requests (?profile=true or an
+    # X-Profile: 1 header). Requests must also send X-Profile-Token equal to
+    # TOKEN, read from the environment; reports are stored under STORE_DIR
+    ENABLED = False
+    TOKEN = os.environ.get('PROFILE_TOKEN')
+    TOP_FUNCTIONS = 25
+    TRACEMALLOC = True
+    STORE_DIR = 'cache/profiles'
+
+class RenderConfig:
+    # Worker processes for chart rendering; None uses one per CPU core, 0
+    # renders in the calling process (serialized, pyplot is not thread-safe)
+    WORKERS = None
+    # Shared dark theme of every chart
+    FACECOLOR = '#2e2e2e'
+    STYLE = 'dark_background'
+    DPI = 100
+
+class PredictionConfig:
+    # Batch scoring: trips scored per vectorized call, and streamed per response chunk
+    BATCH_CHUNK_SIZE = 5000
+    # Largest batch accepted in one request. The body is read and validated
+    # whole before scoring starts, so both bound the memory of one request;
+    # larger jobs belong to the offline bulk scoring
+    BATCH_MAX_ITEMS = 50_000
+    BATCH_MAX_BYTES = 16 * 1024 * 1024
+    # Offline scoring of fact_trips: rows read and scored per chunk, worker
+    # processes (0 = score in this process) and chunks in flight per worker
+    BULK_CHUNK_SIZE = 100_000
+    BULK_WORKERS = 0
+    BULK_INFLIGHT_PER_WORKER = 2
@@ -1,8 +1,18 @@
+import time
+IMPORT_STARTED = time.perf_counter()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from routers import routers
+from routers.execution import ExecutionLayer
+from routers.json_response import FastJSONResponse
+from routers.lazy_imports import LazyImports
+from routers.warmup import AnalysisWarmup
+from services.fastapi.chart_renderer import ChartRenderer
+from services.fastapi.stage_metrics import StageMetrics
 
-app = FastAPI(title="City Analysis API")
+app = FastAPI(title="City Analysis API", default_response_class=FastJSONResponse)
 
 # Configure CORS
 app.add_middleware(
@@ -16,6 +26,29 @@ app.add_middleware(
 # Include routers
 app.include_router(routers.router, prefix="/api/v1")
 
+# Service modules (pandas, matplotlib, scikit-learn) are imported lazily by
+# the routes that use them; record what startup itself cost
+LazyImports.record_startup(time.perf_counter() - IMPORT_STARTED)
+
+@app.on_event("startup")
+async def report_startup():
+    report = LazyImports.stats()['startup']
+    print(
+        f"Startup: app imported in {report['app_import_seconds']:.3f}s, "
+        f"heavy modules loaded: {report['heavy_modules_at_startup'] or 'none'}"
+    )
+
+@app.on_event("startup")
+async def start_analysis_warmup():
+    # Runs in the background: the app is ready before the analyses are warm
+    AnalysisWarmup.start(routers.ANALYSES, routers.analysis_body)
+
+@app.on_event("shutdown")
+async def shutdown_execution_pools():
+    AnalysisWarmup.stop()
+    ExecutionLayer.shutdown()
+    ChartRenderer.shutdown()
+
 @app.get("/")
 async def root():
     return {
@@ -37,6 +70,11 @@ async def root():
         }
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Per endpoint and stage timings, rows and bytes in the Prometheus text format."""
+    return PlainTextResponse(StageMetrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,148 @@
+import asyncio
+import functools
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config.__init__ import ExecutionConfig
+from services.fastapi.stage_metrics import StageMetrics
+
+class ExecutionLayer:
+    """
+    Runs blocking service calls off the event loop.
+
+    Pandas work goes to a bounded thread pool; model training goes to a
+    process pool (it is CPU-bound under the GIL). Charts are rendered by
+    ChartRenderer's own worker processes. Each endpoint has its own
+    concurrency limit, and requests beyond it wait in a queue whose depth is
+    tracked.
+    """
+    THREAD = 'thread'
+    PROCESS = 'process'
+
+    _thread_pool = None
+    _process_pool = None
+    _semaphores = {}
+    _metrics = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def thread_pool():
+        with ExecutionLayer._lock:
+            if ExecutionLayer._thread_pool is None:
+                ExecutionLayer._thread_pool = ThreadPoolExecutor(
+                    max_workers=ExecutionConfig.THREAD_POOL_WORKERS,
+                    thread_name_prefix='analysis'
+                )
+            return ExecutionLayer._thread_pool
+
+    @staticmethod
+    def process_pool():
+        with ExecutionLayer._lock:
+            if ExecutionLayer._process_pool is None:
+                ExecutionLayer._process_pool = ProcessPoolExecutor(
+                    max_workers=ExecutionConfig.PROCESS_POOL_WORKERS,
+                    mp_context=multiprocessing.get_context(ExecutionConfig.PROCESS_START_METHOD)
+                )
+            return ExecutionLayer._process_pool
+
+    @staticmethod
+    def _endpoint_state(endpoint):
+        with ExecutionLayer._lock:
+            if endpoint not in ExecutionLayer._semaphores:
+                limit = ExecutionConfig.ENDPOINT_CONCURRENCY.get(
+                    endpoint, ExecutionConfig.DEFAULT_ENDPOINT_CONCURRENCY
+                )
+                ExecutionLayer._semaphores[endpoint] = asyncio.Semaphore(limit)
+                ExecutionLayer._metrics[endpoint] = {
+                    'concurrency_limit': limit,
+                    'queued': 0,
+                    'max_queued': 0,
+                    'running': 0,
+                    'completed': 0,
+                    'failed': 0,
+                    'total_wait_seconds': 0.0,
+                    'total_run_seconds': 0.0
+                }
+            return ExecutionLayer._semaphores[endpoint], ExecutionLayer._metrics[endpoint]
+
+    @staticmethod
+    async def run(endpoint, func, *args, kind=THREAD, **kwargs):
+        """
+        Run func(*args, **kwargs) in the pool selected by `kind`, subject to
+        the endpoint's concurrency limit. Process-pool callables and their
+        arguments must be picklable.
+        """
+        semaphore, metrics = ExecutionLayer._endpoint_state(endpoint)
+        pool = ExecutionLayer.process_pool() if kind == ExecutionLayer.PROCESS \
+            else ExecutionLayer.thread_pool()
+
+        queued_at = time.perf_counter()
+        waiting = semaphore.locked()
+        if waiting:
+            metrics['queued'] += 1
+            metrics['max_queued'] = max(metrics['max_queued'], metrics['queued'])
+        try:
+            await semaphore.acquire()
+        finally:
+            if waiting:
+                metrics['queued'] -= 1
+
+        started_at = time.perf_counter()
+        metrics['total_wait_seconds'] += started_at - queued_at
+        StageMetrics.observe(endpoint, 'queue_wait', started_at - queued_at)
+        metrics['running'] += 1
+        if kind == ExecutionLayer.THREAD:
+            # Stages the service marks in the worker thread belong to this endpoint
+            call = functools.partial(StageMetrics.call, endpoint, func, *args, **kwargs)
+        else:
+            call = functools.partial(func, *args, **kwargs)
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(pool, call)
+            metrics['completed'] += 1
+            return result
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool on the next call
+            metrics['failed'] += 1
+            ExecutionLayer.discard_process_pool(pool)
+            raise
+        except Exception:
+            metrics['failed'] += 1
+            raise
+        finally:
+            metrics['running'] -= 1
+            run_seconds = time.perf_counter() - started_at
+            metrics['total_run_seconds'] += run_seconds
+            StageMetrics.observe(endpoint, 'run', run_seconds)
+            semaphore.release()
+
+    @staticmethod
+    def stats():
+        """Per-endpoint queue depth, in-flight count and timing totals."""
+        with ExecutionLayer._lock:
+            endpoints = {name: dict(values) for name, values in ExecutionLayer._metrics.items()}
+        return {
+            "thread_pool_workers": ExecutionConfig.THREAD_POOL_WORKERS,
+            "process_pool_workers": ExecutionConfig.PROCESS_POOL_WORKERS,
+            "endpoints": endpoints
+        }
+
+    @staticmethod
+    def discard_process_pool(pool):
+        """Shut down a broken process pool, unless it has already been replaced."""
+        with ExecutionLayer._lock:
+            if ExecutionLayer._process_pool is pool:
+                ExecutionLayer._process_pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def shutdown():
+        with ExecutionLayer._lock:
+            if ExecutionLayer._thread_pool is not None:
+                ExecutionLayer._thread_pool.shutdown(wait=False, cancel_futures=True)
+                ExecutionLayer._thread_pool = None
+            if ExecutionLayer._process_pool is not None:
+                ExecutionLayer._process_pool.shutdown(wait=False, cancel_futures=True)
+                ExecutionLayer._process_pool = None
@@ -0,0 +1,97 @@
+import json
+import sys
+from datetime import date, datetime
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, encoding falls back to the stdlib
+    orjson = None
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded with orjson, which writes NumPy arrays and scalars
+    natively (no per-element Python conversion).
+
+    pandas objects are encoded column-wise, so services can return frames
+    as they are:
+    - a DataFrame becomes {"columns": [...], "data": [column values, ...]},
+      plus "index" when it is not the default 0..n-1 range;
+    - a Series becomes {"name", "index", "data"}.
+    Numeric columns go to orjson as arrays and NaN is written as null.
+    Without orjson the stdlib encoder is used with the same conversions
+    (slower, and NaN is rejected as JSONResponse does).
+    """
+    OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+    def render(self, content):
+        return FastJSONResponse.dumps(content)
+
+    @staticmethod
+    def dumps(content):
+        """Encode content to UTF-8 JSON bytes."""
+        if orjson is not None:
+            return orjson.dumps(content, default=FastJSONResponse.default, option=FastJSONResponse.OPTIONS)
+        return json.dumps(
+            content,
+            default=FastJSONResponse.default,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":")
+        ).encode("utf-8")
+
+    @staticmethod
+    def values(array):
+        """A column or index as something orjson encodes without a Python loop where possible."""
+        if array.dtype.kind in 'biuf':
+            return array if array.flags.c_contiguous else array.copy()
+        if array.dtype.kind == 'M':
+            numpy = sys.modules['numpy']
+            return [None if text == 'NaT' else text for text in numpy.datetime_as_string(array).tolist()]
+        return array.tolist()
+
+    @staticmethod
+    def _index(index):
+        pandas = sys.modules['pandas']
+        if isinstance(index, pandas.RangeIndex) and index.start == 0 and index.step == 1:
+            return None
+        return FastJSONResponse.values(index.to_numpy())
+
+    @staticmethod
+    def default(obj):
+        """Encode the types json/orjson do not handle themselves."""
+        pandas = sys.modules.get('pandas')
+        if pandas is not None:
+            if isinstance(obj, pandas.DataFrame):
+                encoded = {
+                    "columns": [str(column) for column in obj.columns],
+                    "data": [
+                        FastJSONResponse.values(obj.iloc[:, position].to_numpy())
+                        for position in range(obj.shape[1])
+                    ]
+                }
+                index = FastJSONResponse._index(obj.index)
+                if index is not None:
+                    encoded["index"] = index
+                return encoded
+            if isinstance(obj, pandas.Series):
+                return {
+                    "name": None if obj.name is None else str(obj.name),
+                    "index": FastJSONResponse.values(obj.index.to_numpy()),
+                    "data": FastJSONResponse.values(obj.to_numpy())
+                }
+            if isinstance(obj, pandas.Index):
+                return FastJSONResponse.values(obj.to_numpy())
+            if obj is pandas.NA or obj is pandas.NaT:
+                return None
+
+        numpy = sys.modules.get('numpy')
+        if numpy is not None:
+            if isinstance(obj, numpy.ndarray):
+                return obj.tolist()
+            if isinstance(obj, numpy.generic):
+                return obj.item()
+
+        if isinstance(obj, (datetime, date)):
+            return obj.isoformat()
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -0,0 +1,72 @@
+import importlib
+import sys
+import threading
+import time
+
+class LazyImports:
+    """
+    Resolves service callables from 'module:Class.attribute' targets on first
+    use, so heavy dependencies (pandas, matplotlib, scikit-learn, ...) are
+    only imported when an endpoint that needs them is called. The time each
+    first import took is recorded for the startup report.
+    """
+    HEAVY_MODULES = ['numpy', 'pandas', 'pyarrow', 'matplotlib', 'seaborn', 'scipy', 'sklearn', 'joblib']
+
+    _resolved = {}
+    _import_seconds = {}
+    _startup = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def resolve(target):
+        """Import the module of a 'module:Class.attribute' target and return the attribute."""
+        resolved = LazyImports._resolved.get(target)
+        if resolved is not None:
+            return resolved
+
+        module_name, _, attribute = target.partition(':')
+        with LazyImports._lock:
+            if target in LazyImports._resolved:
+                return LazyImports._resolved[target]
+
+            start = time.perf_counter()
+            resolved = importlib.import_module(module_name)
+            LazyImports._import_seconds.setdefault(
+                module_name, round(time.perf_counter() - start, 3)
+            )
+            for part in attribute.split('.'):
+                resolved = getattr(resolved, part)
+            LazyImports._resolved[target] = resolved
+            return resolved
+
+    @staticmethod
+    def call(target, *args, **kwargs):
+        """
+        Resolve a target and call it. Module-level and picklable, so the
+        import happens in the pool worker rather than on the event loop.
+        """
+        return LazyImports.resolve(target)(*args, **kwargs)
+
+    @staticmethod
+    def heavy_modules_loaded():
+        return [name for name in LazyImports.HEAVY_MODULES if name in sys.modules]
+
+    @staticmethod
+    def record_startup(import_seconds):
+        """Record how long the app took to import and which heavy modules it pulled in."""
+        LazyImports._startup = {
+            "app_import_seconds": round(import_seconds, 3),
+            "heavy_modules_at_startup": LazyImports.heavy_modules_loaded()
+        }
+        return LazyImports._startup
+
+    @staticmethod
+    def stats():
+        """Return the startup report and the lazy imports done since."""
+        with LazyImports._lock:
+            lazy_imports = dict(LazyImports._import_seconds)
+        return {
+            "startup": LazyImports._startup,
+            "heavy_modules_loaded": LazyImports.heavy_modules_loaded(),
+            "lazy_import_seconds": lazy_imports
+        }
@@ -0,0 +1,114 @@
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from config.__init__ import ProfilingConfig
+
+class RequestProfiler:
+    """
+    Profiles one analysis request on demand.
+
+    The service call runs under cProfile in its worker thread, with
+    tracemalloc tracking peak allocation, and the report (hot functions by
+    own time, functions by cumulative time, peak memory) is stored under
+    ProfilingConfig.STORE_DIR and returned with the response. Charts are
+    rendered in other processes, so their cost shows up as time waiting on
+    the renderer. tracemalloc is process-wide and slows allocation down, so
+    profiled calls run one at a time and their timings are inflated by it.
+    """
+    TRUE_VALUES = ('1', 'true', 'yes')
+    _lock = threading.Lock()
+
+    @staticmethod
+    def requested(request):
+        """Whether a request asks to be profiled (query flag or header)."""
+        return request.query_params.get('profile', '').lower() in RequestProfiler.TRUE_VALUES \
+            or request.headers.get('x-profile', '').lower() in RequestProfiler.TRUE_VALUES
+
+    @staticmethod
+    def permitted(request):
+        """Profiling must be enabled and the request must carry the configured token."""
+        if not ProfilingConfig.ENABLED or not ProfilingConfig.TOKEN:
+            return False
+        token = request.headers.get('x-profile-token', '')
+        return hmac.compare_digest(token.encode(), ProfilingConfig.TOKEN.encode())
+
+    @staticmethod
+    def _function_name(function):
+        file_name, line, name = function
+        if file_name.startswith(os.getcwd()):
+            file_name = os.path.relpath(file_name)
+        elif os.sep in file_name:
+            file_name = os.path.join(*file_name.split(os.sep)[-2:])
+        return f"{file_name}:{line}({name})"
+
+    @staticmethod
+    def _top(stats, column):
+        rows = sorted(stats.items(), key=lambda item: item[1][column], reverse=True)
+        return [
+            {
+                "function": RequestProfiler._function_name(function),
+                "calls": calls,
+                "own_seconds": round(own, 6),
+                "cumulative_seconds": round(cumulative, 6)
+            }
+            for function, (_, calls, own, cumulative, _) in rows[:ProfilingConfig.TOP_FUNCTIONS]
+        ]
+
+    @staticmethod
+    def run(endpoint, func, *args, **kwargs):
+        """
+        Call func(*args, **kwargs) under the profiler (in the calling thread).
+        Returns the result and the profile report.
+        """
+        with RequestProfiler._lock:
+            profiler = cProfile.Profile()
+            trace_memory = ProfilingConfig.TRACEMALLOC
+            started_tracing = trace_memory and not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            elif trace_memory:
+                tracemalloc.reset_peak()
+
+            wall_started, cpu_started = time.perf_counter(), time.thread_time()
+            profiler.enable()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                profiler.disable()
+                wall_seconds = time.perf_counter() - wall_started
+                cpu_seconds = time.thread_time() - cpu_started
+                peak_bytes = tracemalloc.get_traced_memory()[1] if trace_memory else None
+                if started_tracing:
+                    tracemalloc.stop()
+
+        stats = pstats.Stats(profiler).stats
+        report = {
+            "endpoint": endpoint,
+            "profiled_at": datetime.now(timezone.utc).isoformat(),
+            "wall_seconds": round(wall_seconds, 6),
+            "cpu_seconds": round(cpu_seconds, 6),
+            "tracemalloc_peak_bytes": peak_bytes,
+            "hot_functions": RequestProfiler._top(stats, 2),
+            "cumulative": RequestProfiler._top(stats, 3)
+        }
+        report["stored_at"] = RequestProfiler.store(report)
+        return result, report
+
+    @staticmethod
+    def store(report):
+        """Write a report under STORE_DIR; returns its path, or None when it cannot be written."""
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+        path = os.path.join(ProfilingConfig.STORE_DIR, f"{stamp}-{report['endpoint'].replace('/', '_')}.json")
+        try:
+            os.makedirs(ProfilingConfig.STORE_DIR, exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+        except OSError:
+            return None
+        return path
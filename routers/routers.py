@@ -1,25 +1,163 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
-from services.fastapi.city_performance import CityPerformanceService
-from services.fastapi.fare_analysis import FareAnalysisService
-from services.fastapi.rating_analysis import RatingAnalysisService
-from services.fastapi.demand_analysis import DemandAnalysisService
-from services.fastapi.daytype_analysis import DayTypeAnalysisService
-from services.fastapi.repeat_passenger_analysis import RepeatPassengerAnalysisService
-from services.fastapi.target_analysis import TargetAnalysisService
-from services.fastapi.rpr_analysis import RPRAnalysisService
-from services.fastapi.rpr_factors_analysis import RPRFactorsAnalysisService
-from services.fastapi.tourism_business_analysis import TourismBusinessAnalysisService
-from services.fastapi.mobility_trends_analysis import MobilityTrendsAnalysisService
-from services.fastapi.partnership_analysis import PartnershipAnalysisService
-from services.fastapi.data_collection_analysis import DataCollectionAnalysisService
-from services.fastapi.ml_satisfaction_prediction import MLSatisfactionPredictionService
-from pydantic import BaseModel, Field
+import base64
+import json
+import time
+from typing import Literal, Optional
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from config.__init__ import PredictionConfig
+from services.fastapi.dataset_store import DatasetStore
+from services.fastapi.plot_cache import PlotCache
+from services.fastapi.response_cache import ResponseCache
+from services.fastapi.stage_metrics import StageMetrics
+from routers.execution import ExecutionLayer
+from routers.json_response import FastJSONResponse
+from routers.lazy_imports import LazyImports
+from routers.profiling import RequestProfiler
+from routers.single_flight import SingleFlight
+from routers.training_jobs import TrainingJobs
+from routers.warmup import AnalysisWarmup
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 
 router = APIRouter()
 
+# Analyses served under /analysis/{name}, as lazily imported 'module:Class.method'
+# targets so a worker does not load pandas/matplotlib until they are used
+ANALYSES = {
+    "city-performance": "services.fastapi.city_performance:CityPerformanceService.analyze_top_bottom_cities",
+    "city-fares": "services.fastapi.fare_analysis:FareAnalysisService.analyze_city_fares",
+    "city-ratings": "services.fastapi.rating_analysis:RatingAnalysisService.analyze_city_ratings",
+    "city-demand": "services.fastapi.demand_analysis:DemandAnalysisService.analyze_monthly_demand",
+    "city-daytype": "services.fastapi.daytype_analysis:DayTypeAnalysisService.analyze_weekday_weekend_patterns",
+    "city-repeat-passengers": "services.fastapi.repeat_passenger_analysis:RepeatPassengerAnalysisService.analyze_passenger_frequency",
+    "target-achievement": "services.fastapi.target_analysis:TargetAnalysisService.analyze_target_achievement",
+    "rpr-metrics": "services.fastapi.rpr_analysis:RPRAnalysisService.analyze_rpr",
+    "rpr-factors": "services.fastapi.rpr_factors_analysis:RPRFactorsAnalysisService.analyze_rpr_factors",
+    "tourism-business": "services.fastapi.tourism_business_analysis:TourismBusinessAnalysisService.analyze_tourism_business_patterns",
+    "mobility-trends": "services.fastapi.mobility_trends_analysis:MobilityTrendsAnalysisService.analyze_mobility_trends",
+    "partnerships": "services.fastapi.partnership_analysis:PartnershipAnalysisService.analyze_partnership_opportunities",
+    "data-collection": "services.fastapi.data_collection_analysis:DataCollectionAnalysisService.analyze_data_collection_needs"
+}
+
+SATISFACTION_SERVICE = 'services.fastapi.ml_satisfaction_prediction:MLSatisfactionPredictionService'
+# Name under which satisfaction model training jobs are tracked (one active at a time)
+SATISFACTION_MODEL = 'satisfaction'
+MODEL_STORE = 'services.fastapi.model_store:ModelStore'
+
+PLOT_KEYS = ('visualization', 'visualizations')
+
+async def run_analysis(name, include_plots):
+    """
+    Run an analysis service off the event loop on the thread pool; its
+    charts are rendered by the chart renderer's worker processes. Charts
+    come from the plot cache when this data version has already been
+    rendered, so only the numbers are recomputed. Concurrent identical
+    calls (same analysis, plots flag and data version) share one
+    computation, so the returned dict must not be modified.
+    """
+    key = f'analysis/{name}?include_plots={include_plots}@{DatasetStore.data_version()}'
+    return await SingleFlight.run(
+        key, lambda: compute_analysis(name, include_plots), group=f'analysis/{name}'
+    )
+
+async def compute_analysis(name, include_plots):
+    """One run of an analysis service, reusing cached charts when present."""
+    endpoint = f'analysis/{name}'
+    analysis = ANALYSES[name]
+    if not include_plots:
+        return await ExecutionLayer.run(endpoint, LazyImports.call, analysis, include_plots=False)
+
+    plot_key = PlotCache.key(name)
+    plots = PlotCache.get(plot_key)
+    if plots is not None:
+        analysis_results = await ExecutionLayer.run(endpoint, LazyImports.call, analysis, include_plots=False)
+        analysis_results.update(plots)
+        return analysis_results
+
+    analysis_results = await ExecutionLayer.run(endpoint, LazyImports.call, analysis, include_plots=True)
+    PlotCache.put(plot_key, {k: analysis_results[k] for k in PLOT_KEYS if k in analysis_results})
+    return analysis_results
+
+async def analysis_plots(name):
+    """Rendered charts of an analysis, rendering them on a cache miss."""
+    plots = PlotCache.get(PlotCache.key(name))
+    if plots is None:
+        analysis_results = await run_analysis(name, True)
+        plots = {k: analysis_results[k] for k in PLOT_KEYS if k in analysis_results}
+    return plots
+
+def etag_matches(request, etag):
+    """Check a request's If-None-Match header against an ETag."""
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag == '*' or tag.removeprefix('W/') == etag:
+            return True
+    return False
+
+async def analysis_body(name, include_plots, key=None, data_version=None):
+    """
+    Serialized JSON body of an analysis from the response cache, running and
+    caching it on a miss. Returns the body and 'hit' or 'miss'.
+    """
+    data_version = data_version or DatasetStore.data_version()
+    key = key or ResponseCache.key(f'analysis/{name}', {"include_plots": include_plots}, data_version)
+    body = ResponseCache.get(key)
+    if body is not None:
+        return body, 'hit'
+    analysis_results = await run_analysis(name, include_plots)
+    started_at = time.perf_counter()
+    body = FastJSONResponse(content=analysis_results).body
+    StageMetrics.observe(f'analysis/{name}', 'serialize_response', time.perf_counter() - started_at, bytes=len(body))
+    ResponseCache.put(key, body, data_version)
+    return body, 'miss'
+
+async def profiled_analysis_response(request, name, include_plots):
+    """
+    Run an analysis under the request profiler, bypassing the response,
+    plot and single-flight caches, and return its results with the profile
+    report under "profile". Needs ProfilingConfig.ENABLED and the token.
+    """
+    if not RequestProfiler.permitted(request):
+        return JSONResponse(status_code=403, content={"detail": "Profiling is disabled or the profile token is invalid"})
+    endpoint = f'analysis/{name}'
+    analysis_results, report = await ExecutionLayer.run(
+        endpoint, RequestProfiler.run, endpoint, LazyImports.call, ANALYSES[name], include_plots=include_plots
+    )
+    return FastJSONResponse(
+        content=dict(analysis_results, profile=report),
+        headers={"Cache-Control": "no-store"}
+    )
+
+async def analysis_response(request, name, include_plots):
+    """
+    JSON response for an analysis, tagged with an ETag derived from the data
+    version. Clients revalidating with a matching If-None-Match get a 304
+    without the analysis being run. Serialized responses are kept in the
+    response cache, so repeated loads of an unchanged dataset skip both the
+    analysis and the JSON encoding. Requests flagged for profiling are run
+    fresh under the request profiler instead.
+    """
+    if RequestProfiler.requested(request):
+        return await profiled_analysis_response(request, name, include_plots)
+
+    data_version = DatasetStore.data_version()
+    key = ResponseCache.key(f'analysis/{name}', {"include_plots": include_plots}, data_version)
+    etag = f'"{key}"'
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    body, cache_status = await analysis_body(name, include_plots, key, data_version)
+    return Response(
+        content=body,
+        media_type='application/json',
+        headers={"ETag": etag, "X-Cache": cache_status}
+    )
+
 @router.get("/analysis/city-performance", tags=["City Analysis"])
-async def get_city_performance():
+async def get_city_performance(request: Request, include_plots: bool = True):
     """
     Get detailed analysis of top and bottom performing cities based on total trips.
     
@@ -30,8 +168,7 @@ async def get_city_performance():
     - Overall Statistics: Summary statistics for all cities
     """
     try:
-        analysis_results = CityPerformanceService.analyze_top_bottom_cities()
-        return JSONResponse(content=analysis_results)
+        return await analysis_response(request, 'city-performance', include_plots)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -39,7 +176,7 @@ async def get_city_performance():
         )
 
 @router.get("/analysis/city-fares", tags=["City Analysis"])
-async def get_city_fares():
+async def get_city_fares(request: Request, include_plots: bool = True):
     """
     Get detailed analysis of city fares and distances.
     
@@ -50,8 +187,7 @@ async def get_city_fares():
     - Fare Efficiency: Cities ranked by fare per kilometer
     """
     try:
-        analysis_results = FareAnalysisService.analyze_city_fares()
-        return JSONResponse(content=analysis_results)
+        return await analysis_response(request, 'city-fares', include_plots)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -59,7 +195,7 @@ async def get_city_fares():
         )
 
 @router.get("/analysis/city-ratings", tags=["City Analysis"])
-async def get_city_ratings():
+async def get_city_ratings(request: Request, include_plots: bool = True):
     """
     Get detailed analysis of city ratings by passenger type.
     
@@ -70,8 +206,7 @@ async def get_city_ratings():
     - Summary Statistics: Overall rating statistics and breakdowns by passenger type
     """
     try:
-        analysis_results = RatingAnalysisService.analyze_city_ratings()
-        return JSONResponse(content=analysis_results)
+        return await analysis_response(request, 'city-ratings', include_plots)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -79,7 +214,7 @@ async def get_city_ratings():
         )
 
 @router.get("/analysis/city-demand", tags=["City Analysis"])
-async def get_city_demand():
+async def get_city_demand(request: Request, include_plots: bool = True):
     """
     Get detailed analysis of monthly demand patterns for each city.
     
@@ -90,8 +225,7 @@ async def get_city_demand():
     - Summary Statistics: Overall demand patterns and variability metrics
     """
     try:
-        analysis_results = DemandAnalysisService.analyze_monthly_demand()
-        return JSONResponse(content=analysis_results)
+        return await analysis_response(request, 'city-demand', include_plots)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -99,7 +233,7 @@ async def get_city_demand():
         )
 
 @router.get("/analysis/city-daytype", tags=["City Analysis"])
-async def get_city_daytype():
+async def get_city_daytype(request: Request, include_plots: bool = True):
     """
     Get detailed analysis of weekday vs weekend patterns for each city.
     
@@ -110,8 +244,7 @@ async def get_city_daytype():
     - Pattern Insights: Cities with strongest weekday/weekend biases
     """
     try:
-        analysis_results = DayTypeAnalysisService.analyze_weekday_weekend_patterns()
-        return JSONResponse(content=analysis_results)
+        return await analysis_response(request, 'city-daytype', include_plots)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -119,7 +252,7 @@ async def get_city_daytype():
         )
 
 @router.get("/analysis/city-repeat-passengers", tags=["City Analysis"])
-async def get_city_repeat_passengers():
+async def get_city_repeat_passengers(request: Request, include_plots: bool = True):
     """
     Get detailed analysis of repeat passenger patterns across cities.
     
@@ -131,8 +264,7 @@ async def get_city_repeat_passengers():
     - City Rankings: Cities with highest and lowest passenger retention
     """
     try:
-        analysis_results = RepeatPassengerAnalysisService.analyze_passenger_frequency()
-        return JSONResponse(content=analysis_results)
+        return await analysis_response(request, 'city-repeat-passengers', include_plots)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -140,7 +272,7 @@ async def get_city_repeat_passengers():
         )
 
 @router.get("/analysis/target-achievement", tags=["City Analysis"])
-async def get_target_achievement():
+async def get_target_achievement(request: Request, include_plots: bool = True):
     """
     Get detailed analysis of target achievement across cities for key metrics.
     
@@ -152,8 +284,7 @@ async def get_target_achievement():
     - Improvement Needed: Cities requiring attention in each metric
     """
     try:
-        analysis_results = TargetAnalysisService.analyze_target_achievement()
-        return JSONResponse(content=analysis_results)
+        return await analysis_response(request, 'target-achievement', include_plots)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -161,7 +292,7 @@ async def get_target_achievement():
         )
 
 @router.get("/analysis/rpr-metrics", tags=["City Analysis"])
-async def get_rpr_metrics():
+async def get_rpr_metrics(request: Request, include_plots: bool = True):
     """
     Get detailed analysis of Repeat Passenger Rate (RPR%) metrics by city and month.
     
@@ -172,8 +303,7 @@ async def get_rpr_metrics():
     - Overall Statistics: System-wide RPR metrics and totals
     """
     try:
-        analysis_results = RPRAnalysisService.analyze_rpr()
-        return JSONResponse(content=analysis_results)
+        return await analysis_response(request, 'rpr-metrics', include_plots)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -181,7 +311,7 @@ async def get_rpr_metrics():
         )
 
 @router.get("/analysis/rpr-factors", tags=["City Analysis"])
-async def get_rpr_factors():
+async def get_rpr_factors(request: Request, include_plots: bool = True):
     """
     Analyze factors influencing Repeat Passenger Rate (RPR%) across cities.
     
@@ -192,8 +322,7 @@ async def get_rpr_factors():
     - Key Findings: Most significant positive and negative factors
     """
     try:
-        analysis_results = RPRFactorsAnalysisService.analyze_rpr_factors()
-        return JSONResponse(content=analysis_results)
+        return await analysis_response(request, 'rpr-factors', include_plots)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -201,7 +330,7 @@ async def get_rpr_factors():
         )
 
 @router.get("/analysis/tourism-business", tags=["City Analysis"])
-async def get_tourism_business_patterns():
+async def get_tourism_business_patterns(request: Request, include_plots: bool = True):
     """
     Analyze tourism vs. business demand patterns across cities.
     
@@ -213,8 +342,7 @@ async def get_tourism_business_patterns():
     - Marketing Recommendations: City-specific marketing focus
     """
     try:
-        analysis_results = TourismBusinessAnalysisService.analyze_tourism_business_patterns()
-        return JSONResponse(content=analysis_results)
+        return await analysis_response(request, 'tourism-business', include_plots)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -222,12 +350,12 @@ async def get_tourism_business_patterns():
         )
 
 @router.get("/analysis/mobility-trends")
-async def analyze_mobility_trends():
+async def analyze_mobility_trends(request: Request, include_plots: bool = True):
     """
     Analyze emerging mobility trends and potential impact of EV adoption
     """
     try:
-        return MobilityTrendsAnalysisService.analyze_mobility_trends()
+        return await analysis_response(request, 'mobility-trends', include_plots)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -235,12 +363,12 @@ async def analyze_mobility_trends():
         )
 
 @router.get("/analysis/partnerships")
-async def analyze_partnership_opportunities():
+async def analyze_partnership_opportunities(request: Request, include_plots: bool = True):
     """
     Analyze potential partnership opportunities with local businesses
     """
     try:
-        return PartnershipAnalysisService.analyze_partnership_opportunities()
+        return await analysis_response(request, 'partnerships', include_plots)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -248,23 +376,118 @@ async def analyze_partnership_opportunities():
         )
 
 @router.get("/analysis/data-collection")
-async def analyze_data_collection_needs():
+async def analyze_data_collection_needs(request: Request, include_plots: bool = True):
     """
     Analyze current data coverage and recommend additional data collection needs
     """
     try:
-        return DataCollectionAnalysisService.analyze_data_collection_needs()
+        return await analysis_response(request, 'data-collection', include_plots)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"An error occurred while analyzing data collection needs: {str(e)}"
         )
 
+@router.get("/analysis/{name}/plots/{plot_id}.png", tags=["Visualizations"])
+async def get_analysis_plot(request: Request, name: str, plot_id: str):
+    """
+    Get a single analysis chart as a raw PNG image.
+
+    The plot_id is the key the chart appears under in the analysis response:
+    "visualization" for single-chart analyses, otherwise a key of "visualizations"
+    (e.g. /analysis/city-repeat-passengers/plots/frequency_heatmap.png).
+    """
+    if name not in ANALYSES:
+        raise HTTPException(status_code=404, detail=f"Unknown analysis '{name}'")
+    etag = f'"{PlotCache.key(name, {"plot_id": plot_id})}"'
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    try:
+        cached = await analysis_plots(name)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"An error occurred while rendering plots for {name}: {str(e)}"
+        )
+
+    plots = dict(cached.get('visualizations', {}))
+    if 'visualization' in cached:
+        plots['visualization'] = cached['visualization']
+    if plot_id not in plots:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown plot '{plot_id}' for {name}. Available: {sorted(plots)}"
+        )
+    return Response(
+        content=base64.b64decode(plots[plot_id]['plot']),
+        media_type=plots[plot_id]['type'],
+        headers={"ETag": etag}
+    )
+
+@router.get("/system/datasets", tags=["System"])
+async def get_dataset_store_stats():
+    """
+    Report the shared dataset store: hit/miss/reload counters and loaded tables
+    """
+    return DatasetStore.stats()
+
+@router.get("/system/plot-cache", tags=["System"])
+async def get_plot_cache_stats():
+    """
+    Report the rendered-plot cache: memory/disk hit counters and LRU occupancy
+    """
+    return PlotCache.stats()
+
+@router.get("/system/response-cache", tags=["System"])
+async def get_response_cache_stats():
+    """
+    Report the analysis response cache: hit/miss counters and memory occupancy in bytes
+    """
+    return ResponseCache.stats()
+
+@router.get("/system/single-flight", tags=["System"])
+async def get_single_flight_stats():
+    """
+    Report request coalescing: per-analysis computations run, callers that joined one in flight and peak waiters
+    """
+    return SingleFlight.stats()
+
+@router.get("/system/warmup", tags=["System"])
+async def get_warmup_status():
+    """
+    Report the background warm-up of the analysis responses: status, warmed data version and last run
+    """
+    return AnalysisWarmup.stats()
+
+@router.get("/system/models", tags=["System"])
+async def get_model_store_stats():
+    """
+    Report the model registry: current version, resident versions and load/swap counters
+    """
+    return LazyImports.resolve(MODEL_STORE).stats()
+
+@router.get("/system/startup", tags=["System"])
+async def get_startup_report():
+    """
+    Report app import time, which heavy modules are loaded and the lazy imports done so far
+    """
+    return LazyImports.stats()
+
+@router.get("/system/execution", tags=["System"])
+async def get_execution_stats():
+    """
+    Report the execution layer: per-endpoint concurrency limits, queue depth and timings
+    """
+    return ExecutionLayer.stats()
+
 class SatisfactionPredictionInput(BaseModel):
-    distance_travelled_km: float = Field(alias='distance_travelled(km)')
+    # Must be positive: the insights use the fare per km
+    distance_travelled_km: float = Field(alias='distance_travelled(km)', gt=0)
     fare_amount: float
     passenger_rating: float
     driver_rating: float
+    # Routes the trip to its city's model when the current version has one
+    city_id: Optional[str] = None
 
     class Config:
         allow_population_by_field_name = True
@@ -277,34 +500,231 @@ class SatisfactionPredictionInput(BaseModel):
             }
         }
 
-@router.post("/ml/train-satisfaction-model")
-async def train_satisfaction_model():
+def trip_features(prediction_input):
+    """Feature dict expected by the satisfaction model for one validated input."""
+    return {
+        'distance_travelled(km)': prediction_input.distance_travelled_km,
+        'fare_amount': prediction_input.fare_amount,
+        'passenger_rating': prediction_input.passenger_rating,
+        'driver_rating': prediction_input.driver_rating,
+        'city_id': prediction_input.city_id
+    }
+
+@router.post("/ml/train-satisfaction-model", status_code=202)
+async def train_satisfaction_model(
+    request: Request,
+    mode: Literal['in_memory', 'streaming'] = None,
+    per_city: bool = None
+):
     """
-    Train the customer satisfaction prediction model
+    Start training the customer satisfaction prediction model in the background.
+
+    Returns the training job at once; poll its status_url for progress and
+    the final evaluation metrics. While a job is queued or running, further
+    submissions return that job (coalesced) instead of starting another.
+    mode selects in-memory or chunked streaming training and per_city also
+    trains one model per city_id in parallel (configured defaults when
+    omitted).
     """
     try:
-        return MLSatisfactionPredictionService.train_model()
+        job, coalesced = TrainingJobs.submit(
+            SATISFACTION_MODEL, f'{SATISFACTION_SERVICE}.train_model', 'ml/train-satisfaction-model',
+            mode=mode,
+            per_city=per_city
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"An error occurred while training the model: {str(e)}"
+            detail=f"An error occurred while starting model training: {str(e)}"
+        )
+    job_url = request.url_for('get_training_job', job_id=job['job_id']).path
+    return JSONResponse(
+        status_code=202,
+        content={**job, "coalesced": coalesced, "status_url": job_url},
+        headers={"Location": job_url}
+    )
+
+@router.get("/ml/train-satisfaction-model/jobs")
+async def list_training_jobs():
+    """
+    List the retained satisfaction model training jobs, newest first
+    """
+    return TrainingJobs.jobs(SATISFACTION_MODEL)
+
+@router.get("/ml/train-satisfaction-model/jobs/{job_id}")
+async def get_training_job(job_id: str):
+    """
+    Report a training job: status, current stage and, once finished, the
+    evaluation metrics or the error
+    """
+    job = TrainingJobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Training job '{job_id}' not found")
+    return job
+
+def pinned_model_version(model_version):
+    """Validate a model_version query parameter; None selects the current version."""
+    if model_version is not None and not LazyImports.resolve(MODEL_STORE).has_version(model_version):
+        raise HTTPException(status_code=404, detail=f"Model version '{model_version}' not found")
+    return model_version
+
+async def require_published_model(request):
+    """
+    Check that a current model version is published, importing the shipped
+    legacy model as the first version if there is one. Otherwise start (or
+    join) the satisfaction training job and answer 503 with its status URL,
+    so predictions never train inline and at most one training runs per model.
+    """
+    if LazyImports.resolve(MODEL_STORE).available():
+        return
+    try:
+        imported = await ExecutionLayer.run(
+            'ml/predict-satisfaction', LazyImports.call, f'{SATISFACTION_SERVICE}.import_legacy_model'
         )
+    except Exception as e:
+        # A legacy model that cannot be imported is replaced by a trained one
+        print(f"Legacy satisfaction model not imported: {str(e)}")
+        imported = None
+    if imported is not None:
+        return
+    job, _ = TrainingJobs.submit(
+        SATISFACTION_MODEL, f'{SATISFACTION_SERVICE}.train_model', 'ml/train-satisfaction-model'
+    )
+    job_url = request.url_for('get_training_job', job_id=job['job_id']).path
+    raise HTTPException(
+        status_code=503,
+        detail=f"No satisfaction model is published yet; training job {job['job_id']} is {job['status']}, see {job_url}",
+        headers={"Retry-After": "30", "Location": job_url}
+    )
+
+@router.get("/ml/models")
+async def list_model_versions():
+    """
+    List the published satisfaction model versions, newest first, with their training metrics
+    """
+    return LazyImports.resolve(MODEL_STORE).versions()
+
+@router.post("/ml/models/{model_version}/activate")
+async def activate_model_version(model_version: str):
+    """
+    Make a published version the current one; serving processes swap to it on their next request
+    """
+    model_store = LazyImports.resolve(MODEL_STORE)
+    pinned_model_version(model_version)
+    return {"current_version": model_store.activate(model_version)}
 
 @router.post("/ml/predict-satisfaction")
-async def predict_satisfaction(prediction_input: SatisfactionPredictionInput):
+async def predict_satisfaction(request: Request, prediction_input: SatisfactionPredictionInput, model_version: str = None):
     """
     Predict customer satisfaction for given trip parameters
+
+    Uses the current model version unless model_version pins another
+    published one; the version used is returned as model_version.
     """
+    model_version = pinned_model_version(model_version)
+    if model_version is None:
+        await require_published_model(request)
     try:
-        input_dict = {
-            'distance_travelled(km)': prediction_input.distance_travelled_km,
-            'fare_amount': prediction_input.fare_amount,
-            'passenger_rating': prediction_input.passenger_rating,
-            'driver_rating': prediction_input.driver_rating
-        }
-        return MLSatisfactionPredictionService.predict_satisfaction(input_dict)
+        return await ExecutionLayer.run(
+            'ml/predict-satisfaction',
+            LazyImports.call,
+            f'{SATISFACTION_SERVICE}.predict_satisfaction',
+            trip_features(prediction_input),
+            model_version=model_version
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"An error occurred while making prediction: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+async def read_limited_body(request, max_bytes):
+    """Read a request body, answering 413 as soon as it is known to exceed max_bytes."""
+    too_large = HTTPException(status_code=413, detail=f"Request body exceeds the limit of {max_bytes} bytes")
+    content_length = request.headers.get('content-length', '')
+    if content_length.isdigit() and int(content_length) > max_bytes:
+        raise too_large
+    body = bytearray()
+    async for part in request.stream():
+        body += part
+        if len(body) > max_bytes:
+            raise too_large
+    return bytes(body)
+
+@router.post("/ml/predict-satisfaction/batch")
+async def predict_satisfaction_batch(request: Request, model_version: str = None):
+    """
+    Predict customer satisfaction for many trips in one request
+
+    The body is a JSON array of trips (same fields as /ml/predict-satisfaction),
+    or NDJSON with one trip per line when sent as application/x-ndjson. Trips
+    are scored in vectorized chunks and the results are streamed back in input
+    order, as a JSON array or as NDJSON matching the request format. Batches
+    above PredictionConfig.BATCH_MAX_ITEMS trips or BATCH_MAX_BYTES are
+    rejected with 413. All
+    chunks use the same model version: the pinned model_version, or the
+    version current when the first chunk is scored.
+    """
+    model_version = pinned_model_version(model_version)
+    if model_version is None:
+        await require_published_model(request)
+    ndjson = 'ndjson' in request.headers.get('content-type', '')
+    body = await read_limited_body(request, PredictionConfig.BATCH_MAX_BYTES)
+    try:
+        if ndjson:
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = json.loads(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON body: {str(e)}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of trips")
+    if len(items) > PredictionConfig.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {len(items)} trips exceeds the limit of {PredictionConfig.BATCH_MAX_ITEMS}"
+        )
+
+    try:
+        trips = TypeAdapter(list[SatisfactionPredictionInput]).validate_python(items)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+    features = [trip_features(trip) for trip in trips]
+
+    async def score(start, version):
+        return await ExecutionLayer.run(
+            'ml/predict-satisfaction/batch',
+            LazyImports.call,
+            f'{SATISFACTION_SERVICE}.predict_satisfaction_batch',
+            features[start:start + PredictionConfig.BATCH_CHUNK_SIZE],
+            model_version=version
+        )
+
+    # Score the first chunk up front so failures still return a 500
+    try:
+        first_chunk = await score(0, model_version) if features else []
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"An error occurred while making batch predictions: {str(e)}"
+        )
+
+    async def stream():
+        if not ndjson:
+            yield '['
+        results = first_chunk
+        version = first_chunk[0]['model_version'] if first_chunk else model_version
+        for start in range(0, max(len(features), 1), PredictionConfig.BATCH_CHUNK_SIZE):
+            if start:
+                results = await score(start, version)
+            if ndjson:
+                yield ''.join(json.dumps(result) + '\n' for result in results)
+            else:
+                yield (',' if start else '') + ','.join(json.dumps(result) for result in results)
+        if not ndjson:
+            yield ']'
+
+    return StreamingResponse(
+        stream(),
+        media_type='application/x-ndjson' if ndjson else 'application/json'
+    )
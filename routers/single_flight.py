@@ -0,0 +1,67 @@
+import asyncio
+import threading
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls on the event loop.
+
+    The first caller for a key starts the computation; callers arriving with
+    the same key while it is in flight await the same task and receive the
+    same result (or exception), which must therefore be treated as
+    read-only. The shared task is shielded, so a caller that disconnects
+    does not cancel it for the others. Counters are kept per group (e.g.
+    per endpoint) for monitoring.
+    """
+    _inflight = {}
+    _metrics = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _group_metrics(group):
+        with SingleFlight._lock:
+            return SingleFlight._metrics.setdefault(group, {
+                'executions': 0,
+                'coalesced': 0,
+                'failed': 0,
+                'in_flight': 0,
+                'max_waiters': 0
+            })
+
+    @staticmethod
+    async def run(key, factory, group='default'):
+        """
+        Return the result of `await factory()`, sharing it with every
+        concurrent caller using the same key.
+        """
+        metrics = SingleFlight._group_metrics(group)
+        flight = SingleFlight._inflight.get(key)
+        if flight is not None:
+            metrics['coalesced'] += 1
+            flight['waiters'] += 1
+            metrics['max_waiters'] = max(metrics['max_waiters'], flight['waiters'])
+            return await asyncio.shield(flight['task'])
+
+        task = asyncio.ensure_future(factory())
+        flight = {'task': task, 'waiters': 1}
+        SingleFlight._inflight[key] = flight
+        metrics['executions'] += 1
+        metrics['in_flight'] += 1
+
+        def finished(task):
+            SingleFlight._inflight.pop(key, None)
+            metrics['in_flight'] -= 1
+            if task.cancelled() or task.exception() is not None:
+                metrics['failed'] += 1
+        task.add_done_callback(finished)
+
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def stats():
+        """Per-group executions, coalesced callers and largest number of waiters on one flight."""
+        with SingleFlight._lock:
+            groups = {name: dict(values) for name, values in SingleFlight._metrics.items()}
+        return {
+            "in_flight": len(SingleFlight._inflight),
+            "groups": groups
+        }
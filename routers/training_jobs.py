@@ -0,0 +1,166 @@
+import asyncio
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from config.__init__ import TrainingJobConfig
+from routers.execution import ExecutionLayer
+from routers.lazy_imports import LazyImports
+
+class ProgressFile:
+    """
+    Picklable progress callback handed to a training worker process. Each
+    call atomically rewrites a small JSON file that the status endpoint reads.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.started_at = None
+
+    def __call__(self, stage, fraction):
+        now = datetime.now(timezone.utc).isoformat()
+        self.started_at = self.started_at or now
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                "stage": stage,
+                "fraction": fraction,
+                "started_at": self.started_at,
+                "updated_at": now
+            }, f)
+        os.replace(tmp_path, self.path)
+
+    def read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+class TrainingJobs:
+    """
+    Background training jobs run in the execution layer's process pool.
+
+    Submitting returns a job at once; the job runs as an event-loop task that
+    awaits the worker. At most one job per model is active (queued or
+    running): submitting again while one is active returns that job instead
+    of starting another. Finished jobs are kept, oldest dropped first, up to
+    TrainingJobConfig.FINISHED_JOBS_RETAINED.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+    _jobs = {}
+    _active = {}
+    _tasks = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _now():
+        return datetime.now(timezone.utc).isoformat()
+
+    @staticmethod
+    def submit(model, target, endpoint, **kwargs):
+        """
+        Start training `model` by calling the 'module:Class.method' target
+        with kwargs in a worker process, or return the model's active job.
+        Returns (job, coalesced).
+        """
+        with TrainingJobs._lock:
+            active_id = TrainingJobs._active.get(model)
+            if active_id is not None:
+                active = TrainingJobs._jobs[active_id]
+                active['coalesced_submissions'] += 1
+                return TrainingJobs.describe(active), True
+
+            os.makedirs(TrainingJobConfig.PROGRESS_DIR, exist_ok=True)
+            job_id = uuid.uuid4().hex
+            job = {
+                "job_id": job_id,
+                "model": model,
+                "status": TrainingJobs.QUEUED,
+                "submitted_at": TrainingJobs._now(),
+                "started_at": None,
+                "finished_at": None,
+                "coalesced_submissions": 0,
+                "result": None,
+                "error": None,
+                "_progress": ProgressFile(os.path.join(TrainingJobConfig.PROGRESS_DIR, f"{job_id}.json"))
+            }
+            TrainingJobs._jobs[job_id] = job
+            TrainingJobs._active[model] = job_id
+            TrainingJobs._tasks[job_id] = asyncio.get_running_loop().create_task(
+                TrainingJobs._run(job, target, endpoint, kwargs)
+            )
+            return TrainingJobs.describe(job), False
+
+    @staticmethod
+    async def _run(job, target, endpoint, kwargs):
+        try:
+            job['result'] = await ExecutionLayer.run(
+                endpoint, LazyImports.call, target,
+                progress=job['_progress'], kind=ExecutionLayer.PROCESS, **kwargs
+            )
+            job['status'] = TrainingJobs.SUCCEEDED
+        except Exception as e:
+            job['status'] = TrainingJobs.FAILED
+            job['error'] = str(e)
+        finally:
+            job['finished_at'] = TrainingJobs._now()
+            job['_final_progress'] = job['_progress'].read()
+            job['_progress'].remove()
+            with TrainingJobs._lock:
+                TrainingJobs._active.pop(job['model'], None)
+                TrainingJobs._tasks.pop(job['job_id'], None)
+                TrainingJobs._prune()
+
+    @staticmethod
+    def _prune():
+        finished = [
+            job_id for job_id, job in TrainingJobs._jobs.items()
+            if job['status'] in (TrainingJobs.SUCCEEDED, TrainingJobs.FAILED)
+        ]
+        for job_id in finished[:max(len(finished) - TrainingJobConfig.FINISHED_JOBS_RETAINED, 0)]:
+            del TrainingJobs._jobs[job_id]
+
+    @staticmethod
+    def describe(job):
+        """Public view of a job, with the worker's latest progress."""
+        status = job['status']
+        if status in (TrainingJobs.QUEUED, TrainingJobs.RUNNING):
+            progress = job['_progress'].read()
+            if progress is not None:
+                # The worker has picked the job up and reported a stage
+                status = TrainingJobs.RUNNING
+        else:
+            progress = job.get('_final_progress')
+            if status == TrainingJobs.SUCCEEDED:
+                progress = {**(progress or {}), "stage": "done", "fraction": 1.0}
+
+        described = {key: value for key, value in job.items() if not key.startswith('_')}
+        described["status"] = status
+        described["started_at"] = (progress or {}).get('started_at')
+        described["progress"] = progress
+        return described
+
+    @staticmethod
+    def get(job_id):
+        """Describe one job, or None if it is unknown or has been pruned."""
+        job = TrainingJobs._jobs.get(job_id)
+        return None if job is None else TrainingJobs.describe(job)
+
+    @staticmethod
+    def jobs(model=None):
+        """Describe the retained jobs, newest first."""
+        return [
+            TrainingJobs.describe(job) for job in reversed(list(TrainingJobs._jobs.values()))
+            if model is None or job['model'] == model
+        ]
@@ -0,0 +1,93 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from config.__init__ import WarmupConfig
+from services.fastapi.dataset_store import DatasetStore
+
+class AnalysisWarmup:
+    """
+    Background task that precomputes every analysis into the response cache.
+
+    It runs after startup without blocking it: the app serves requests while
+    analyses are computed, at most WarmupConfig.CONCURRENCY at a time. The
+    dataset version is then polled, and a new version is warmed again. A
+    request arriving while its analysis is being warmed joins that
+    computation through the single-flight layer instead of starting another.
+    """
+    IDLE = 'idle'
+    WARMING = 'warming'
+    STOPPED = 'stopped'
+
+    _task = None
+    _state = {
+        "status": STOPPED,
+        "data_version": None,
+        "runs": 0,
+        "last_started_at": None,
+        "last_seconds": None,
+        "warmed": 0,
+        "failed": {}
+    }
+
+    @staticmethod
+    def start(names, warm):
+        """
+        Start warming the given analyses; warm(name, include_plots) is the
+        coroutine function that computes and caches one response.
+        """
+        if not WarmupConfig.ENABLED or AnalysisWarmup._task is not None:
+            return
+        AnalysisWarmup._state['status'] = AnalysisWarmup.IDLE
+        AnalysisWarmup._task = asyncio.create_task(AnalysisWarmup._loop(list(names), warm))
+
+    @staticmethod
+    def stop():
+        if AnalysisWarmup._task is not None:
+            AnalysisWarmup._task.cancel()
+            AnalysisWarmup._task = None
+        AnalysisWarmup._state['status'] = AnalysisWarmup.STOPPED
+
+    @staticmethod
+    async def _loop(names, warm):
+        while True:
+            data_version = DatasetStore.data_version()
+            if data_version != AnalysisWarmup._state['data_version']:
+                await AnalysisWarmup._warm_all(names, warm, data_version)
+            await asyncio.sleep(WarmupConfig.POLL_SECONDS)
+
+    @staticmethod
+    async def _warm_all(names, warm, data_version):
+        state = AnalysisWarmup._state
+        state.update(
+            status=AnalysisWarmup.WARMING,
+            last_started_at=datetime.now(timezone.utc).isoformat(),
+            warmed=0,
+            failed={}
+        )
+        started = time.perf_counter()
+        slots = asyncio.Semaphore(max(1, WarmupConfig.CONCURRENCY))
+
+        async def warm_one(name, include_plots):
+            async with slots:
+                try:
+                    await warm(name, include_plots)
+                    state['warmed'] += 1
+                except Exception as e:
+                    state['failed'][f"{name}?include_plots={include_plots}"] = str(e)
+
+        await asyncio.gather(*[
+            warm_one(name, include_plots)
+            for name in names
+            for include_plots in WarmupConfig.INCLUDE_PLOTS
+        ])
+        state.update(
+            status=AnalysisWarmup.IDLE,
+            data_version=data_version,
+            runs=state['runs'] + 1,
+            last_seconds=round(time.perf_counter() - started, 3)
+        )
+
+    @staticmethod
+    def stats():
+        """Return the warm-up status, the warmed data version and the last run's results."""
+        return dict(AnalysisWarmup._state, failed=dict(AnalysisWarmup._state['failed']))
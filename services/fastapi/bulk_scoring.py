@@ -0,0 +1,160 @@
+import os
+import time
+import collections
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from config.__init__ import DataPaths, ExecutionConfig, PredictionConfig
+from services.fastapi.columnar_cache import ColumnarCache, pa, pq
+from services.fastapi.similar_trips_index import SimilarTripsIndex
+from services.fastapi.ml_satisfaction_prediction import MLSatisfactionPredictionService
+
+# Model bundle and similar-trips index installed in each worker process
+_worker_state = {}
+
+class BulkScoringService:
+    """
+    Offline satisfaction scoring of every trip in fact_trips.
+
+    The trips file is read in chunks (record batches of the columnar copy
+    when it is fresh, CSV chunks otherwise), each chunk is scored with the
+    resident model and appended to a Parquet file, so memory stays bounded
+    by the chunk size and the number of chunks in flight rather than the
+    size of the table. Chunks can be fanned out to worker processes; results
+    are written in input order.
+    """
+    INPUT_COLUMNS = ['trip_id', 'city_id', 'distance_travelled(km)', 'fare_amount', 'passenger_rating', 'driver_rating']
+    FEATURES = ['distance_travelled(km)', 'fare_amount', 'passenger_rating', 'driver_rating']
+
+    @staticmethod
+    def _init_worker(bundle, index):
+        _worker_state['bundle'] = bundle
+        _worker_state['index'] = index
+
+    @staticmethod
+    def score_chunk(chunk, bundle=None, index=None):
+        """
+        Score one chunk of trips. Rows missing any model feature are kept
+        with empty scores.
+        """
+        bundle = _worker_state['bundle'] if bundle is None else bundle
+        index = _worker_state['index'] if index is None else index
+
+        complete = chunk[BulkScoringService.FEATURES].notna().all(axis=1)
+        if complete.any():
+            scores = MLSatisfactionPredictionService.score_frame(
+                chunk.loc[complete, BulkScoringService.FEATURES + ['city_id']], bundle, index
+            ).reindex(chunk.index)
+        else:
+            scores = pd.DataFrame({
+                'satisfaction_score': pd.Series(dtype='float64'),
+                'confidence_score': pd.Series(dtype='float64'),
+                'status': pd.Series(dtype='object'),
+                'confidence_level': pd.Series(dtype='object'),
+                'similar_trips_count': pd.Series(dtype='float64'),
+                'model_scope': pd.Series(dtype='object')
+            }).reindex(chunk.index)
+        scores['similar_trips_count'] = scores['similar_trips_count'].astype('Int64')
+        scores.insert(0, 'trip_id', chunk['trip_id'])
+        return scores.reset_index(drop=True)
+
+    @staticmethod
+    def score_fact_trips(output_path=None, chunk_size=None, workers=None, model_version=None):
+        """
+        Score every trip in fact_trips and write trip_id plus the satisfaction
+        and confidence scores of the current (or the given) model version to a
+        Parquet file. The file is written under a temporary name and moved
+        into place when complete.
+        """
+        if not ColumnarCache.available():
+            raise Exception("Error scoring trips: bulk scoring writes Parquet and requires pyarrow")
+
+        output_path = output_path or DataPaths.FACT_TRIPS_SCORES
+        chunk_size = chunk_size or PredictionConfig.BULK_CHUNK_SIZE
+        workers = PredictionConfig.BULK_WORKERS if workers is None else workers
+        start = time.perf_counter()
+
+        try:
+            # 1. Resident model and a similar-trips index built chunk by chunk
+            bundle = MLSatisfactionPredictionService.resident_model(model_version)
+            index = SimilarTripsIndex.from_chunks(lambda: ColumnarCache.iter_chunks(
+                DataPaths.FACT_TRIPS, chunk_size, BulkScoringService.FEATURES
+            ))
+
+            # 2. Score chunks in this process or in workers, keeping results in input order
+            chunks = ColumnarCache.iter_chunks(
+                DataPaths.FACT_TRIPS, chunk_size, BulkScoringService.INPUT_COLUMNS
+            )
+            if workers > 0:
+                pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context(ExecutionConfig.PROCESS_START_METHOD),
+                    initializer=BulkScoringService._init_worker,
+                    initargs=(bundle, index)
+                )
+                scored = BulkScoringService._score_in_pool(pool, chunks, workers)
+            else:
+                pool = None
+                scored = (BulkScoringService.score_chunk(chunk, bundle, index) for chunk in chunks)
+
+            # 3. Append each scored chunk to a temporary Parquet file
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+            tmp_path = f"{output_path}.{os.getpid()}.tmp"
+            writer = None
+            rows = 0
+            try:
+                for frame in scored:
+                    if writer is None:
+                        table = pa.Table.from_pandas(frame, preserve_index=False)
+                        writer = pq.ParquetWriter(tmp_path, table.schema)
+                    else:
+                        table = pa.Table.from_pandas(frame, schema=writer.schema, preserve_index=False)
+                    writer.write_table(table)
+                    rows += len(frame)
+            finally:
+                if writer is not None:
+                    writer.close()
+                if pool is not None:
+                    pool.shutdown(cancel_futures=True)
+
+            if writer is None:
+                empty = BulkScoringService.score_chunk(
+                    pd.DataFrame(columns=BulkScoringService.INPUT_COLUMNS, dtype='float64'), bundle, index
+                )
+                pq.write_table(pa.Table.from_pandas(empty, preserve_index=False), tmp_path)
+            os.replace(tmp_path, output_path)
+
+            return {
+                "output_path": output_path,
+                "rows": rows,
+                "model_version": bundle['version'],
+                "chunk_size": chunk_size,
+                "workers": workers,
+                "seconds": round(time.perf_counter() - start, 3)
+            }
+
+        except Exception as e:
+            raise Exception(f"Error scoring trips: {str(e)}")
+
+    @staticmethod
+    def _score_in_pool(pool, chunks, workers):
+        # Bound the chunks in flight so memory does not grow with the table
+        max_inflight = workers * PredictionConfig.BULK_INFLIGHT_PER_WORKER
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(pool.submit(BulkScoringService.score_chunk, chunk))
+            if len(pending) >= max_inflight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+if __name__ == "__main__":
+    # Offline step: python -m services.fastapi.bulk_scoring [--workers N] [--chunk-size N] [--output PATH] [--model-version V]
+    import argparse
+    parser = argparse.ArgumentParser(description="Score every trip in fact_trips")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=None)
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--model-version', default=None)
+    args = parser.parse_args()
+    print(BulkScoringService.score_fact_trips(args.output, args.chunk_size, args.workers, args.model_version))
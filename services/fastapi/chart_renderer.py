@@ -0,0 +1,255 @@
+import io
+import os
+import base64
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config.__init__ import ExecutionConfig, RenderConfig
+
+# Plotting stack, imported by _load_backend() in the processes that render
+np = None
+pd = None
+plt = None
+sns = None
+
+class ChartRenderer:
+    """
+    Renders declarative chart specs to base64 PNGs in a pool of worker
+    processes using the Agg backend.
+
+    A spec is a plain dict of picklable values with a 'kind' of 'bar',
+    'grouped_bar', 'heatmap', 'scatter' or 'panels' (a grid of the other
+    kinds), plus optional common keys: title, xlabel, ylabel, figsize,
+    xtick_rotation, xtick_ha, grid (alpha), legend, value_labels (a format
+    string applied to each bar value) and reference_line (axhline kwargs).
+    Services build specs; only the workers import and touch pyplot.
+    """
+    # Bump whenever the drawing code or the specs built by the services change
+    # how a chart looks, so cached charts and responses are not served again
+    SPEC_VERSION = 1
+
+    _pool = None
+    _lock = threading.Lock()
+    _inline_lock = threading.Lock()
+
+    @staticmethod
+    def cache_version():
+        """Spec version and theme, part of the keys of cached charts."""
+        return [ChartRenderer.SPEC_VERSION, RenderConfig.STYLE, RenderConfig.FACECOLOR, RenderConfig.DPI]
+
+    @staticmethod
+    def workers():
+        if RenderConfig.WORKERS is None:
+            return os.cpu_count() or 1
+        return RenderConfig.WORKERS
+
+    @staticmethod
+    def pool():
+        with ChartRenderer._lock:
+            if ChartRenderer._pool is None:
+                ChartRenderer._pool = ProcessPoolExecutor(
+                    max_workers=ChartRenderer.workers(),
+                    mp_context=multiprocessing.get_context(ExecutionConfig.PROCESS_START_METHOD),
+                    initializer=ChartRenderer._load_backend
+                )
+            return ChartRenderer._pool
+
+    @staticmethod
+    def render_many(specs):
+        """
+        Render a {name: spec} dict concurrently and return
+        {name: {"plot", "type", "encoding"}} in the same order.
+        """
+        if ChartRenderer.workers() == 0:
+            with ChartRenderer._inline_lock:
+                rendered = {name: ChartRenderer.render(spec) for name, spec in specs.items()}
+        else:
+            futures = {
+                name: ChartRenderer.pool().submit(ChartRenderer.render, spec)
+                for name, spec in specs.items()
+            }
+            try:
+                rendered = {name: future.result() for name, future in futures.items()}
+            except BrokenProcessPool:
+                # A worker died; start a fresh pool on the next call
+                ChartRenderer.shutdown()
+                raise
+
+        return {
+            name: {"plot": plot, "type": "image/png", "encoding": "base64"}
+            for name, plot in rendered.items()
+        }
+
+    @staticmethod
+    def encoded_bytes(plots):
+        """Total size of the base64 plots returned by render_many."""
+        return sum(len(chart["plot"]) for chart in plots.values())
+
+    @staticmethod
+    def shutdown():
+        with ChartRenderer._lock:
+            if ChartRenderer._pool is not None:
+                ChartRenderer._pool.shutdown(wait=False, cancel_futures=True)
+                ChartRenderer._pool = None
+
+    @staticmethod
+    def _load_backend():
+        """Import numpy, pandas, matplotlib (Agg) and seaborn on first use."""
+        global np, pd, plt, sns
+        if plt is None:
+            import numpy as np
+            import pandas as pd
+            import matplotlib
+            matplotlib.use('Agg')
+            import matplotlib.pyplot as plt
+            import seaborn as sns
+
+    @staticmethod
+    def render(spec):
+        """Draw one spec with the shared theme and return it as base64 PNG."""
+        ChartRenderer._load_backend()
+        with plt.style.context(RenderConfig.STYLE):
+            if spec['kind'] == 'panels':
+                rows, cols = spec['grid']
+                fig, axes = plt.subplots(rows, cols, figsize=spec.get('figsize', (12, 6)),
+                                         facecolor=RenderConfig.FACECOLOR, squeeze=False)
+                axes = axes.ravel()
+                for ax, panel in zip(axes, spec['panels']):
+                    ChartRenderer._draw(fig, ax, panel)
+                for ax in axes[len(spec['panels']):]:
+                    ax.remove()
+            else:
+                fig, ax = plt.subplots(figsize=spec.get('figsize', (12, 6)),
+                                       facecolor=RenderConfig.FACECOLOR)
+                ChartRenderer._draw(fig, ax, spec)
+
+            try:
+                fig.tight_layout()
+                buf = io.BytesIO()
+                fig.savefig(buf, format='png', bbox_inches='tight',
+                            facecolor=RenderConfig.FACECOLOR, dpi=RenderConfig.DPI)
+                return base64.b64encode(buf.getvalue()).decode()
+            finally:
+                plt.close(fig)
+
+    @staticmethod
+    def _draw(fig, ax, spec):
+        draw = {
+            'bar': ChartRenderer._bar,
+            'grouped_bar': ChartRenderer._grouped_bar,
+            'heatmap': ChartRenderer._heatmap,
+            'scatter': ChartRenderer._scatter
+        }.get(spec['kind'])
+        if draw is None:
+            raise ValueError(f"Unsupported chart kind '{spec['kind']}'")
+        draw(fig, ax, spec)
+
+        ax.set_title(spec.get('title', ''), color='white', pad=spec.get('title_pad', 20))
+        ax.set_xlabel(spec.get('xlabel', ''), color='white', labelpad=10)
+        ax.set_ylabel(spec.get('ylabel', ''), color='white', labelpad=10)
+        ax.tick_params(colors='white')
+        if 'xtick_rotation' in spec:
+            plt.setp(ax.get_xticklabels(), rotation=spec['xtick_rotation'],
+                     ha=spec.get('xtick_ha', 'center'))
+        if spec.get('grid') is not None:
+            ax.grid(True, linestyle=spec.get('grid_linestyle', '-'), alpha=spec['grid'])
+        if spec.get('legend'):
+            ax.legend(facecolor=RenderConfig.FACECOLOR, labelcolor='white')
+        if spec.get('reference_line'):
+            ax.axhline(**spec['reference_line'])
+
+    @staticmethod
+    def _colors(colors, count):
+        """Resolve a color, a list of colors or a {'palette', 'range'} dict."""
+        if isinstance(colors, dict):
+            if 'range' in colors:
+                low, high = colors['range']
+                return plt.get_cmap(colors['palette'])(np.linspace(low, high, count))
+            return sns.color_palette(colors['palette'], count)
+        return colors
+
+    @staticmethod
+    def _label_bars(ax, bars, fmt, horizontal=False):
+        for bar in bars:
+            if horizontal:
+                value = bar.get_width()
+                ax.text(value, bar.get_y() + bar.get_height() / 2, fmt.format(value),
+                        ha='left', va='center', color='white')
+            else:
+                value = bar.get_height()
+                ax.text(bar.get_x() + bar.get_width() / 2, value, fmt.format(value),
+                        ha='center', va='bottom', color='white')
+
+    @staticmethod
+    def _bar(fig, ax, spec):
+        categories = spec['categories']
+        colors = ChartRenderer._colors(spec.get('colors'), len(categories))
+        if spec.get('horizontal'):
+            bars = ax.barh(categories, spec['values'], color=colors)
+        else:
+            bars = ax.bar(categories, spec['values'], color=colors, width=spec.get('width', 0.8))
+        if spec.get('value_labels'):
+            ChartRenderer._label_bars(ax, bars, spec['value_labels'], spec.get('horizontal', False))
+
+    @staticmethod
+    def _grouped_bar(fig, ax, spec):
+        categories = spec['categories']
+        series = spec['series']
+        width = spec.get('width', 0.8 / len(series))
+        x = np.arange(len(categories))
+
+        for i, item in enumerate(series):
+            offset = (i - (len(series) - 1) / 2) * width
+            bars = ax.bar(x + offset, item['values'], width,
+                          label=item.get('label'), color=item.get('color'))
+            if spec.get('value_labels'):
+                ChartRenderer._label_bars(ax, bars, spec['value_labels'])
+
+        ax.set_xticks(x)
+        ax.set_xticklabels(categories)
+
+    @staticmethod
+    def _heatmap(fig, ax, spec):
+        data = pd.DataFrame(spec['data'], index=spec['rows'], columns=spec['columns'])
+        data = data.apply(pd.to_numeric)
+        options = {
+            'annot': spec.get('annot', True),
+            'fmt': spec.get('fmt', '.2f'),
+            'cmap': spec.get('cmap', 'YlOrRd'),
+            'square': spec.get('square', False),
+            'ax': ax
+        }
+        for key in ('center', 'vmin', 'vmax'):
+            if spec.get(key) is not None:
+                options[key] = spec[key]
+        if spec.get('annot_size'):
+            options['annot_kws'] = {'size': spec['annot_size']}
+        if spec.get('colorbar_label'):
+            options['cbar_kws'] = {'label': spec['colorbar_label']}
+
+        sns.heatmap(data, **options)
+        if spec.get('xticklabels'):
+            ax.set_xticklabels(spec['xticklabels'])
+
+        colorbar = ax.collections[0].colorbar
+        if colorbar is not None:
+            colorbar.ax.tick_params(colors='white')
+            colorbar.ax.yaxis.label.set_color('white')
+
+    @staticmethod
+    def _scatter(fig, ax, spec):
+        x = np.asarray(spec['x'], dtype=float)
+        y = np.asarray(spec['y'], dtype=float)
+        ax.scatter(x, y, color=spec.get('color', 'goldenrod'),
+                   s=spec.get('size', 50), alpha=spec.get('alpha', 1.0))
+
+        for label, px, py in zip(spec.get('point_labels', []), x, y):
+            ax.annotate(label, (px, py), color='white', xytext=(5, 5),
+                        textcoords='offset points', fontsize=10)
+        if spec.get('trend_line') and len(x) > 1:
+            trend = np.poly1d(np.polyfit(x, y, 1))
+            ax.plot(x, trend(x), 'r--', alpha=0.8)
+        if spec.get('note'):
+            ax.text(0.05, 0.95, spec['note'], transform=ax.transAxes,
+                    verticalalignment='top', color='white')
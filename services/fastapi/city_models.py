@@ -0,0 +1,110 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from config.__init__ import ExecutionConfig, TrainingConfig
+
+class CityModelTrainer:
+    """
+    Fits the satisfaction model for several scopes (the global table and each
+    city_id) in a pool of worker processes.
+
+    Every scope is split into one fit task (scaler, 80/20 split, model, test
+    metrics) and one task per cross-validation fold, and all of them share
+    the pool, so the run takes about as long as the largest scope's fit
+    rather than the sum over cities. Tasks are submitted largest scope first.
+    The fit and the folds reproduce the in-memory train_model: the same
+    train_test_split and the same unshuffled KFold as cross_val_score.
+    """
+    GLOBAL = 'global'
+
+    @staticmethod
+    def workers():
+        return TrainingConfig.CITY_WORKERS or os.cpu_count() or 1
+
+    @staticmethod
+    def fit_scope(features, target, passenger_rating):
+        """Fit scaler and model on one scope; returns them with the test metrics."""
+        from sklearn.model_selection import train_test_split
+        from sklearn.linear_model import LinearRegression
+        from sklearn.preprocessing import StandardScaler
+
+        scaler = StandardScaler()
+        features_scaled = scaler.fit_transform(features)
+        X_train, X_test, y_train, y_test = train_test_split(
+            features_scaled, target, test_size=0.2, random_state=42
+        )
+        model = LinearRegression()
+        model.fit(X_train, y_train)
+        return model, scaler, CityModelTrainer.evaluate_scope(model, scaler, features, target, passenger_rating)
+
+    @staticmethod
+    def evaluate_scope(model, scaler, features, target, passenger_rating):
+        """Test metrics of a fitted scaler and model on one scope, on the same 80/20 split as fit_scope."""
+        from sklearn.model_selection import train_test_split
+        from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+
+        features_scaled = scaler.transform(features)
+        X_train, X_test, y_train, y_test = train_test_split(
+            features_scaled, target, test_size=0.2, random_state=42
+        )
+        y_pred = model.predict(X_test)
+
+        return {
+            "training_rows": int(len(features)),
+            "training_samples": len(X_train),
+            "test_samples": len(X_test),
+            "feature_means": {col: float(value) for col, value in features.mean().items()},
+            "feature_stds": {col: float(value) for col, value in features.std().items()},
+            "r2_score": float(r2_score(y_test, y_pred)),
+            "rmse": float(np.sqrt(mean_squared_error(y_test, y_pred))),
+            "mae": float(mean_absolute_error(y_test, y_pred)),
+            "model_reliability": float(model.score(features_scaled, passenger_rating))
+        }
+
+    @staticmethod
+    def cv_fold_score(features, target, fold, folds):
+        """R2 on one KFold split of a scope, as cross_val_score computes it."""
+        from sklearn.model_selection import KFold
+        from sklearn.linear_model import LinearRegression
+        from sklearn.preprocessing import StandardScaler
+
+        features_scaled = StandardScaler().fit_transform(features)
+        train_index, test_index = list(KFold(n_splits=folds).split(features_scaled))[fold]
+        model = LinearRegression().fit(features_scaled[train_index], target.iloc[train_index])
+        return float(model.score(features_scaled[test_index], target.iloc[test_index]))
+
+    @staticmethod
+    def train(scopes, folds=5, progress=None):
+        """
+        Train every scope of {scope: (features, target, passenger_rating)}.
+        Returns {scope: (model, scaler, evaluation)} with cv_scores included.
+        """
+        report = progress or (lambda stage, fraction: None)
+        order = sorted(scopes, key=lambda scope: len(scopes[scope][0]), reverse=True)
+        fits = {}
+        cv_scores = {scope: [None] * folds for scope in scopes}
+
+        with ProcessPoolExecutor(
+            max_workers=CityModelTrainer.workers(),
+            mp_context=multiprocessing.get_context(ExecutionConfig.PROCESS_START_METHOD)
+        ) as pool:
+            futures = {}
+            for scope in order:
+                features, target, passenger_rating = scopes[scope]
+                futures[pool.submit(CityModelTrainer.fit_scope, features, target, passenger_rating)] = (scope, None)
+                for fold in range(folds):
+                    futures[pool.submit(CityModelTrainer.cv_fold_score, features, target, fold, folds)] = (scope, fold)
+
+            for done, future in enumerate(as_completed(futures), start=1):
+                scope, fold = futures[future]
+                if fold is None:
+                    fits[scope] = future.result()
+                else:
+                    cv_scores[scope][fold] = future.result()
+                report('training_scopes', round(0.1 + 0.8 * done / len(futures), 3))
+
+        return {
+            scope: (model, scaler, dict(evaluation, cv_scores=np.array(cv_scores[scope])))
+            for scope, (model, scaler, evaluation) in fits.items()
+        }
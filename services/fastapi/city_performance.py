@@ -1,25 +1,23 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import io
-import base64
-from config.__init__ import DataPaths
+from services.fastapi.chart_renderer import ChartRenderer
+from services.fastapi.trips_cube import TripsCube
+from services.fastapi.stage_metrics import StageMetrics
 
 class CityPerformanceService:
     @staticmethod
-    def analyze_top_bottom_cities():
+    def analyze_top_bottom_cities(include_plots=True):
         """
         Analyze top and bottom performing cities based on total trips.
         Returns visualization and detailed statistics.
         """
         try:
-            # 1. Data Import using configured paths
-            fact_trips = pd.read_csv(DataPaths.FACT_TRIPS)
-            dim_city = pd.read_csv(DataPaths.DIM_CITY)
+            stages = StageMetrics.stages()
+            # 1. Data Import: trip counts rolled up from the trips cube
+            city_trip_summary = TripsCube.rollup(['city_id', 'city_name'], {'trip_id': 'count'})
+            stages.mark('data_import', rows=len(city_trip_summary))
 
             # 2. Data Preparation
-            city_trip_summary = fact_trips.groupby('city_id').size().reset_index(name='total_trips')
-            city_trip_summary = city_trip_summary.merge(dim_city[['city_id', 'city_name']], on='city_id')
+            city_trip_summary = city_trip_summary.reset_index().rename(columns={'trip_id': 'total_trips'})
+            stages.mark('data_preparation')
 
             # 3. Top and Bottom Cities Analysis
             city_trip_summary_sorted = city_trip_summary.sort_values('total_trips', ascending=False)
@@ -30,61 +28,38 @@ class CityPerformanceService:
 
             top_3_cities['trip_percentage'] = (top_3_cities['total_trips'] / total_trips * 100).round(2)
             bottom_3_cities['trip_percentage'] = (bottom_3_cities['total_trips'] / total_trips * 100).round(2)
+            stages.mark('top_and_bottom_cities_analysis')
 
             # 4. Generate Visualization
-            plt.style.use('dark_background')
-            sns.set_style("darkgrid")
-            
-            plt.figure(figsize=(15, 6), facecolor='#2e2e2e')
-
-            # Bar plot for Top Cities
-            plt.subplot(1, 2, 1)
-            bars1 = sns.barplot(x='city_name', y='total_trips', data=top_3_cities, palette='magma', hue='city_name')
-            plt.title('Top 3 Cities by Total Trips', fontsize=12, color='white', pad=15)
-            plt.xticks(rotation=45, color='white')
-            plt.yticks(color='white')
-            plt.xlabel('City Name', color='white', labelpad=10)
-            plt.ylabel('Total Trips', color='white', labelpad=10)
-
-            # Add value labels on bars
-            for i, bar in enumerate(bars1.patches):
-                bars1.text(bar.get_x() + bar.get_width()/2., 
-                        bar.get_height(), 
-                        f'{int(bar.get_height()):,}', 
-                        ha='center', va='bottom', color='white')
-
-            # Bar plot for Bottom Cities
-            plt.subplot(1, 2, 2)
-            bars2 = sns.barplot(x='city_name', y='total_trips', data=bottom_3_cities, palette='magma', hue='city_name')
-            plt.title('Bottom 3 Cities by Total Trips', fontsize=12, color='white', pad=15)
-            plt.xticks(rotation=45, color='white')
-            plt.yticks(color='white')
-            plt.xlabel('City Name', color='white', labelpad=10)
-            plt.ylabel('Total Trips', color='white', labelpad=10)
-
-            # Add value labels on bars
-            for i, bar in enumerate(bars2.patches):
-                bars2.text(bar.get_x() + bar.get_width()/2., 
-                        bar.get_height(), 
-                        f'{int(bar.get_height()):,}', 
-                        ha='center', va='bottom', color='white')
-
-            plt.tight_layout()
-            
-            # Save plot to bytes
-            buf = io.BytesIO()
-            plt.savefig(buf, format='png', bbox_inches='tight', facecolor='#2e2e2e')
-            buf.seek(0)
-            plot_base64 = base64.b64encode(buf.getvalue()).decode()
-            plt.close()
+            if include_plots:
+                plots = ChartRenderer.render_many({
+                    "visualization": {
+                        'kind': 'panels',
+                        'grid': (1, 2),
+                        'figsize': (15, 6),
+                        'panels': [
+                            {
+                                'kind': 'bar',
+                                'categories': cities['city_name'].tolist(),
+                                'values': cities['total_trips'].tolist(),
+                                'colors': {'palette': 'magma'},
+                                'value_labels': '{:,.0f}',
+                                'title': title,
+                                'xlabel': 'City Name',
+                                'ylabel': 'Total Trips',
+                                'xtick_rotation': 45
+                            }
+                            for cities, title in [
+                                (top_3_cities, 'Top 3 Cities by Total Trips'),
+                                (bottom_3_cities, 'Bottom 3 Cities by Total Trips')
+                            ]
+                        ]
+                    }
+                })
+                stages.mark('generate_visualizations', bytes=ChartRenderer.encoded_bytes(plots))
 
             # 5. Prepare Analysis Results
             analysis_results = {
-                "visualization": {
-                    "plot": plot_base64,
-                    "type": "image/png",
-                    "encoding": "base64"
-                },
                 "top_cities": {
                     "data": top_3_cities[['city_name', 'total_trips', 'trip_percentage']].to_dict('records'),
                     "total_trips": int(top_3_cities['total_trips'].sum()),
@@ -101,7 +76,11 @@ class CityPerformanceService:
                     "total_cities_analyzed": len(city_trip_summary)
                 }
             }
+
+            if include_plots:
+                analysis_results["visualization"] = plots["visualization"]
             
+            stages.mark('prepare_analysis_results')
             return analysis_results
 
         except Exception as e:
@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import pandas as pd
+from config.__init__ import DataPaths, DataSchemas
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional, loads fall back to CSV
+    pa = None
+    pq = None
+
+class ColumnarCache:
+    """
+    Typed Parquet copies of the CSV tables, kept next to each CSV.
+
+    A copy records the (mtime_ns, size) of the CSV it was built from and is
+    treated as stale as soon as the CSV changes. Missing or stale copies are
+    rebuilt from the CSV on the next load.
+    """
+    SOURCE_METADATA_KEY = b'goodcabs.source_signature'
+
+    @staticmethod
+    def available():
+        """Check whether the columnar backend (pyarrow) is installed."""
+        return pq is not None
+
+    @staticmethod
+    def columnar_path(csv_path):
+        """Path of the columnar copy for a CSV table."""
+        return os.path.splitext(csv_path)[0] + DataPaths.COLUMNAR_EXTENSION
+
+    @staticmethod
+    def source_signature(csv_path):
+        stat = os.stat(csv_path)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    @staticmethod
+    def read_typed_csv(csv_path):
+        """Parse a CSV with the dtypes declared in DataSchemas."""
+        columns = pd.read_csv(csv_path, nrows=0).columns
+        dtypes = {col: 'category' for col in DataSchemas.CATEGORICAL if col in columns}
+        dtypes.update({col: 'float32' for col in DataSchemas.FLOAT32 if col in columns})
+        date_columns = [col for col in DataSchemas.DATETIME if col in columns]
+
+        frame = pd.read_csv(csv_path, dtype=dtypes)
+        for col in date_columns:
+            frame[col] = pd.to_datetime(frame[col], format='%Y-%m-%d')
+        return frame
+
+    @staticmethod
+    def is_fresh(csv_path):
+        """Check whether the columnar copy exists and matches the CSV."""
+        columnar_path = ColumnarCache.columnar_path(csv_path)
+        if not ColumnarCache.available() or not os.path.exists(columnar_path):
+            return False
+        try:
+            metadata = pq.read_schema(columnar_path).metadata or {}
+        except (OSError, pa.ArrowException):
+            return False
+        recorded = metadata.get(ColumnarCache.SOURCE_METADATA_KEY)
+        return recorded is not None and \
+            json.loads(recorded) == ColumnarCache.source_signature(csv_path)
+
+    @staticmethod
+    def write(csv_path, frame):
+        """Write the columnar copy atomically, tagged with the CSV signature."""
+        columnar_path = ColumnarCache.columnar_path(csv_path)
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[ColumnarCache.SOURCE_METADATA_KEY] = json.dumps(
+            ColumnarCache.source_signature(csv_path)
+        ).encode()
+        table = table.replace_schema_metadata(metadata)
+
+        tmp_path = f"{columnar_path}.{os.getpid()}.tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, columnar_path)
+        return columnar_path
+
+    @staticmethod
+    def convert(csv_path):
+        """Ingest one CSV into its columnar copy and return the typed frame."""
+        frame = ColumnarCache.read_typed_csv(csv_path)
+        if ColumnarCache.available():
+            ColumnarCache.write(csv_path, frame)
+        return frame
+
+    @staticmethod
+    def load(csv_path):
+        """
+        Load a table through its columnar copy, rebuilding the copy from the
+        CSV when it is missing or stale. Without pyarrow this is a typed CSV read.
+        """
+        if ColumnarCache.is_fresh(csv_path):
+            try:
+                return pq.read_table(ColumnarCache.columnar_path(csv_path)).to_pandas()
+            except (OSError, pa.ArrowException):
+                pass
+
+        try:
+            return ColumnarCache.convert(csv_path)
+        except OSError:
+            # Read-only data directory: serve the typed CSV without caching
+            return ColumnarCache.read_typed_csv(csv_path)
+
+    @staticmethod
+    def iter_chunks(csv_path, chunk_size, columns):
+        """
+        Yield a table as DataFrames of at most chunk_size rows with the given
+        columns: record batches of the columnar copy when it is fresh, typed
+        CSV chunks otherwise. Only one chunk is materialized at a time.
+        """
+        if ColumnarCache.is_fresh(csv_path):
+            parquet_file = pq.ParquetFile(ColumnarCache.columnar_path(csv_path))
+            for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+                yield batch.to_pandas()
+            return
+
+        dtypes = {col: 'float32' for col in DataSchemas.FLOAT32 if col in columns}
+        for chunk in pd.read_csv(csv_path, usecols=columns, dtype=dtypes, chunksize=chunk_size):
+            yield chunk[columns]
+
+    @staticmethod
+    def convert_all(force=False):
+        """Ingest every table in DataPaths.CSV_TABLES, returning timings per table."""
+        report = {}
+        for csv_path in DataPaths.CSV_TABLES:
+            if not os.path.exists(csv_path):
+                report[csv_path] = {"status": "missing"}
+                continue
+            if not force and ColumnarCache.is_fresh(csv_path):
+                report[csv_path] = {"status": "fresh"}
+                continue
+            start = time.perf_counter()
+            frame = ColumnarCache.convert(csv_path)
+            report[csv_path] = {
+                "status": "converted" if ColumnarCache.available() else "csv_only",
+                "rows": len(frame),
+                "seconds": round(time.perf_counter() - start, 3)
+            }
+        return report
+
+if __name__ == "__main__":
+    # Ingest step: python -m services.fastapi.columnar_cache [--force]
+    import sys
+    for path, result in ColumnarCache.convert_all(force='--force' in sys.argv).items():
+        print(f"{path}: {result}")
@@ -1,136 +1,90 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import io
-import base64
-import numpy as np
 from config.__init__ import DataPaths
+from services.fastapi.chart_renderer import ChartRenderer
+from services.fastapi.dataset_store import DatasetStore
+from services.fastapi.stage_metrics import StageMetrics
 
 class DataCollectionAnalysisService:
     @staticmethod
-    def analyze_data_collection_needs():
+    def analyze_data_collection_needs(include_plots=True):
         """
         Analyze current data coverage and recommend additional data collection needs
         """
         try:
+            stages = StageMetrics.stages()
             # 1. Data Import
-            fact_trips = pd.read_csv(DataPaths.FACT_TRIPS)
-            dim_date = pd.read_csv(DataPaths.DIM_DATE)
-            dim_city = pd.read_csv(DataPaths.DIM_CITY)
-            fact_passenger = pd.read_csv(DataPaths.FACT_PASSENGER_SUMMARY)
+            fact_trips = DatasetStore.get(DataPaths.FACT_TRIPS)
+            fact_passenger = DatasetStore.get(DataPaths.FACT_PASSENGER_SUMMARY)
+            stages.mark('data_import', rows=len(fact_trips))
 
-            # 2. Analyze Current Data Coverage
-            trips_analysis = fact_trips.merge(
-                dim_date[['date', 'day_type']], 
-                on='date'
-            )
-            trips_analysis = trips_analysis.merge(
-                dim_city[['city_id', 'city_name']], 
-                on='city_id'
-            )
-
-            # 3. Calculate Data Quality Metrics
+            # 2. Calculate Data Quality Metrics
             data_quality = {
                 "trips_data": {
                     "total_records": len(fact_trips),
                     "null_values": fact_trips.isnull().sum().to_dict(),
-                    "rating_distribution": fact_trips['passenger_rating'].value_counts().to_dict()
+                    "rating_distribution": {
+                        f'{rating:g}': int(count)
+                        for rating, count in fact_trips['passenger_rating'].value_counts().items()
+                    }
                 },
                 "passenger_data": {
                     "total_records": len(fact_passenger),
                     "null_values": fact_passenger.isnull().sum().to_dict()
                 }
             }
+            stages.mark('calculate_data_quality_metrics')
 
-            # 4. Generate Data Coverage Visualizations
-            plt.style.use('dark_background')
-
-            # 4.1 Current Data Coverage Plot
-            fig1, ax1 = plt.subplots(figsize=(12, 6), facecolor='#2e2e2e')
-            
-            # Calculate coverage percentages
-            current_metrics = [
-                ('Trip Details', 100),
-                ('Customer Rating', 100),
-                ('Payment Info', 100),
-                ('Location Data', 100),
-                ('Customer Type', 100),
-                ('Demographics', 0),
-                ('Trip Purpose', 0),
-                ('Wait Times', 0),
-                ('App Usage', 0),
-                ('Cancellations', 0)
-            ]
-            
-            metrics, coverage = zip(*current_metrics)
-            colors = ['green' if c == 100 else 'red' for c in coverage]
-            
-            bars = ax1.barh(metrics, coverage, color=colors)
-            ax1.set_title('Current Data Coverage Analysis')
-            ax1.set_xlabel('Coverage (%)')
-            
-            # Add value labels
-            for bar in bars:
-                width = bar.get_width()
-                ax1.text(width, bar.get_y() + bar.get_height()/2,
-                        f'{width}%', ha='left', va='center')
-
-            plt.tight_layout()
-
-            # Save coverage plot
-            buf1 = io.BytesIO()
-            fig1.savefig(buf1, format='png', bbox_inches='tight', facecolor='#2e2e2e')
-            buf1.seek(0)
-            coverage_plot = base64.b64encode(buf1.getvalue()).decode()
-            plt.close(fig1)
-
-            # 4.2 Data Impact Plot
-            fig2, ax2 = plt.subplots(figsize=(12, 6), facecolor='#2e2e2e')
-            
-            impact_metrics = {
-                'Customer Behavior': 85,
-                'Operational Efficiency': 75,
-                'Market Intelligence': 70,
-                'Service Quality': 80,
-                'Revenue Growth': 65
-            }
-            
-            impact_colors = plt.cm.RdYlGn(np.linspace(0.2, 0.8, len(impact_metrics)))
-            
-            bars = ax2.bar(impact_metrics.keys(), impact_metrics.values(), color=impact_colors)
-            ax2.set_title('Potential Impact of Enhanced Data Collection')
-            ax2.set_ylabel('Impact Score (%)')
-            plt.xticks(rotation=45, ha='right')
-            
-            # Add value labels
-            for bar in bars:
-                height = bar.get_height()
-                ax2.text(bar.get_x() + bar.get_width()/2, height,
-                        f'{height}%', ha='center', va='bottom')
-
-            plt.tight_layout()
+            # 3. Generate Data Coverage Visualizations
+            if include_plots:
+                # Calculate coverage percentages
+                current_metrics = [
+                    ('Trip Details', 100),
+                    ('Customer Rating', 100),
+                    ('Payment Info', 100),
+                    ('Location Data', 100),
+                    ('Customer Type', 100),
+                    ('Demographics', 0),
+                    ('Trip Purpose', 0),
+                    ('Wait Times', 0),
+                    ('App Usage', 0),
+                    ('Cancellations', 0)
+                ]
+                metrics, coverage = zip(*current_metrics)
 
-            # Save impact plot
-            buf2 = io.BytesIO()
-            fig2.savefig(buf2, format='png', bbox_inches='tight', facecolor='#2e2e2e')
-            buf2.seek(0)
-            impact_plot = base64.b64encode(buf2.getvalue()).decode()
-            plt.close(fig2)
+                impact_metrics = {
+                    'Customer Behavior': 85,
+                    'Operational Efficiency': 75,
+                    'Market Intelligence': 70,
+                    'Service Quality': 80,
+                    'Revenue Growth': 65
+                }
 
-            # 5. Prepare Analysis Results
-            analysis_results = {
-                "visualizations": {
+                plots = ChartRenderer.render_many({
                     "data_coverage": {
-                        "plot": coverage_plot,
-                        "type": "image/png",
-                        "encoding": "base64"
+                        'kind': 'bar',
+                        'horizontal': True,
+                        'categories': list(metrics),
+                        'values': list(coverage),
+                        'colors': ['green' if c == 100 else 'red' for c in coverage],
+                        'value_labels': '{:g}%',
+                        'title': 'Current Data Coverage Analysis',
+                        'xlabel': 'Coverage (%)'
                     },
                     "impact_analysis": {
-                        "plot": impact_plot,
-                        "type": "image/png",
-                        "encoding": "base64"
+                        'kind': 'bar',
+                        'categories': list(impact_metrics.keys()),
+                        'values': list(impact_metrics.values()),
+                        'colors': {'palette': 'RdYlGn', 'range': (0.2, 0.8)},
+                        'value_labels': '{:g}%',
+                        'title': 'Potential Impact of Enhanced Data Collection',
+                        'ylabel': 'Impact Score (%)',
+                        'xtick_rotation': 45,
+                        'xtick_ha': 'right'
                     }
-                },
+                })
+                stages.mark('generate_visualizations', bytes=ChartRenderer.encoded_bytes(plots))
+
+            # 4. Prepare Analysis Results
+            analysis_results = {
                 "current_data_quality": data_quality,
                 "recommended_data_collection": {
                     "customer_behavior": {
@@ -291,6 +245,10 @@ class DataCollectionAnalysisService:
                 }
             }
 
+            if include_plots:
+                analysis_results["visualizations"] = plots
+
+            stages.mark('prepare_analysis_results')
             return analysis_results
 
         except Exception as e:
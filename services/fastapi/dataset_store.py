@@ -0,0 +1,151 @@
+import os
+import hashlib
+import threading
+from config.__init__ import DataPaths
+
+class DatasetStore:
+    """
+    Process-wide, load-once registry of the tables listed in DataPaths.
+
+    Every service pulls its DataFrames from here instead of calling
+    pd.read_csv on each request. A table is re-read only when the file's
+    mtime or size changes. Returned frames are shared between requests and
+    must be treated as read-only - copy before adding columns.
+    """
+    _tables = {}
+    _derived = {}
+    _load_locks = {}
+    _lock = threading.Lock()
+    _counters = {'hits': 0, 'misses': 0, 'reloads': 0}
+
+    @staticmethod
+    def file_signature(path):
+        """Return the (mtime_ns, size) pair used to detect changed files."""
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    @staticmethod
+    def _count(counter):
+        with DatasetStore._lock:
+            DatasetStore._counters[counter] += 1
+
+    @staticmethod
+    def _load_lock(path):
+        with DatasetStore._lock:
+            return DatasetStore._load_locks.setdefault(path, threading.Lock())
+
+    @staticmethod
+    def _read(path):
+        # Imported on first load so the store itself stays cheap to import
+        if DataPaths.LOADER_MODE == 'columnar':
+            from services.fastapi.columnar_cache import ColumnarCache
+            return ColumnarCache.load(path)
+        import pandas as pd
+        return pd.read_csv(path)
+
+    @staticmethod
+    def get(path):
+        """
+        Get the DataFrame for a DataPaths table, loading it on first use
+        and reloading it when the underlying file has changed.
+        """
+        signature = DatasetStore.file_signature(path)
+        entry = DatasetStore._tables.get(path)
+        if entry is not None and entry['signature'] == signature:
+            DatasetStore._count('hits')
+            return entry['frame']
+
+        # Serialize loads per table so concurrent requests parse it once
+        with DatasetStore._load_lock(path):
+            signature = DatasetStore.file_signature(path)
+            entry = DatasetStore._tables.get(path)
+            if entry is not None and entry['signature'] == signature:
+                DatasetStore._count('hits')
+                return entry['frame']
+
+            frame = DatasetStore._read(path)
+            DatasetStore._tables[path] = {
+                'frame': frame,
+                'signature': signature,
+                'rows': len(frame)
+            }
+            DatasetStore._count('misses' if entry is None else 'reloads')
+            return frame
+
+    @staticmethod
+    def derived(name, sources, build):
+        """
+        Get a table materialized from other DataPaths tables, building it
+        with build() once per version of its source files.
+        """
+        version = DatasetStore.data_version(sources)
+        entry = DatasetStore._derived.get(name)
+        if entry is not None and entry['version'] == version:
+            DatasetStore._count('hits')
+            return entry['frame']
+
+        with DatasetStore._load_lock(name):
+            version = DatasetStore.data_version(sources)
+            entry = DatasetStore._derived.get(name)
+            if entry is not None and entry['version'] == version:
+                DatasetStore._count('hits')
+                return entry['frame']
+
+            frame = build()
+            DatasetStore._derived[name] = {
+                'frame': frame,
+                'version': version,
+                'rows': len(frame)
+            }
+            DatasetStore._count('misses' if entry is None else 'reloads')
+            return frame
+
+    @staticmethod
+    def data_version(paths=None):
+        """
+        Short hash of the signatures of the given tables (all of
+        DataPaths.CSV_TABLES by default). Changes whenever any of them does.
+        """
+        digest = hashlib.sha1()
+        for path in sorted(paths or DataPaths.CSV_TABLES):
+            try:
+                signature = DatasetStore.file_signature(path)
+            except FileNotFoundError:
+                signature = None
+            digest.update(f"{path}:{signature};".encode())
+        return digest.hexdigest()[:16]
+
+    @staticmethod
+    def invalidate(path=None):
+        """Drop one cached table, or all of them when no path is given."""
+        with DatasetStore._lock:
+            if path is None:
+                DatasetStore._tables.clear()
+                DatasetStore._derived.clear()
+            else:
+                DatasetStore._tables.pop(path, None)
+
+    @staticmethod
+    def stats():
+        """Return hit/miss/reload counters and the currently loaded tables."""
+        with DatasetStore._lock:
+            counters = dict(DatasetStore._counters)
+        return {
+            "counters": counters,
+            "data_version": DatasetStore.data_version(),
+            "tables": {
+                path: {
+                    "rows": int(entry['rows']),
+                    "mtime_ns": int(entry['signature'][0]),
+                    "size_bytes": int(entry['signature'][1])
+                }
+                for path, entry in list(DatasetStore._tables.items())
+            },
+            "derived_tables": {
+                name: dict({
+                    "rows": int(entry['rows']),
+                    "version": entry['version']
+                }, **(entry['frame'].index_stats() if hasattr(entry['frame'], 'index_stats') else {}))
+                for name, entry in list(DatasetStore._derived.items())
+            }
+        }
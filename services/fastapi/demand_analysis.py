@@ -1,36 +1,25 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import io
-import base64
-from config.__init__ import DataPaths
+from services.fastapi.chart_renderer import ChartRenderer
+from services.fastapi.trips_cube import TripsCube
+from services.fastapi.stage_metrics import StageMetrics
 
 class DemandAnalysisService:
     @staticmethod
-    def analyze_monthly_demand():
+    def analyze_monthly_demand(include_plots=True):
         """
         Analyze peak and low demand months for each city.
         Returns visualization and detailed demand metrics.
         """
         try:
-            # 1. Data Import using configured paths
-            trips_df = pd.read_csv(DataPaths.FACT_TRIPS)
-            cities_df = pd.read_csv(DataPaths.DIM_CITY)
-            dates_df = pd.read_csv(DataPaths.DIM_DATE)
-
-            # 2. Merge trips with city and date information
-            trips_analysis = trips_df.merge(cities_df, on='city_id').merge(
-                dates_df[['date', 'month_name', 'start_of_month']], 
-                on='date'
-            )
-
-            # 3. Calculate monthly trips for each city
-            monthly_trips = trips_analysis.groupby(
-                ['city_name', 'start_of_month', 'month_name']
-            )['trip_id'].count().reset_index()
+            stages = StageMetrics.stages()
+            # 1. Calculate monthly trips for each city from the trips cube
+            monthly_trips = TripsCube.rollup(
+                ['city_name', 'start_of_month', 'month_name'],
+                {'trip_id': 'count'}
+            ).reset_index()
             monthly_trips.columns = ['city_name', 'start_of_month', 'month_name', 'total_trips']
+            stages.mark('calculate_monthly_trips')
 
-            # 4. Find peak and low demand months for each city
+            # 2. Find peak and low demand months for each city
             results = []
             for city in monthly_trips['city_name'].unique():
                 city_data = monthly_trips[monthly_trips['city_name'] == city]
@@ -44,57 +33,43 @@ class DemandAnalysisService:
                     'low_month': city_data.loc[low_idx, 'month_name'],
                     'low_trips': int(city_data.loc[low_idx, 'total_trips'])
                 })
+            stages.mark('find_peak_and_low_demand_months')
 
-            # 5. Generate Heatmap Visualization
-            plt.style.use('dark_background')
-            plt.figure(figsize=(15, 8), facecolor='#2e2e2e')
-            
-            pivot_data = monthly_trips.pivot(
-                index='city_name', 
-                columns='month_name', 
-                values='total_trips'
-            )
-            
-            sns.heatmap(
-                pivot_data, 
-                annot=True, 
-                fmt=',', 
-                cmap='YlOrRd',
-                cbar_kws={'label': 'Number of Trips'},
-                annot_kws={'size': 8}
-            )
-            
-            plt.title('Monthly Trip Distribution by City', color='white', pad=20)
-            plt.xlabel('Month', color='white', labelpad=10)
-            plt.ylabel('City', color='white', labelpad=10)
-            plt.xticks(rotation=45, color='white')
-            plt.yticks(color='white')
-            
-            # Customize colorbar
-            plt.gcf().axes[-1].tick_params(colors='white')
-            plt.gcf().axes[-1].yaxis.label.set_color('white')
-            
-            plt.tight_layout()
+            # 3. Generate Heatmap Visualization
+            if include_plots:
+                pivot_data = monthly_trips.pivot(
+                    index='city_name', 
+                    columns='month_name', 
+                    values='total_trips'
+                )
 
-            # Save plot to bytes
-            buf = io.BytesIO()
-            plt.savefig(buf, format='png', bbox_inches='tight', facecolor='#2e2e2e')
-            buf.seek(0)
-            plot_base64 = base64.b64encode(buf.getvalue()).decode()
-            plt.close()
+                plots = ChartRenderer.render_many({
+                    "visualization": {
+                        'kind': 'heatmap',
+                        'data': pivot_data.values.tolist(),
+                        'rows': pivot_data.index.tolist(),
+                        'columns': pivot_data.columns.tolist(),
+                        'fmt': ',',
+                        'cmap': 'YlOrRd',
+                        'colorbar_label': 'Number of Trips',
+                        'annot_size': 8,
+                        'figsize': (15, 8),
+                        'title': 'Monthly Trip Distribution by City',
+                        'xlabel': 'Month',
+                        'ylabel': 'City',
+                        'xtick_rotation': 45
+                    }
+                })
+                stages.mark('generate_visualizations', bytes=ChartRenderer.encoded_bytes(plots))
 
-            # 6. Calculate additional statistics
+            # 4. Calculate additional statistics
             total_monthly_trips = monthly_trips.groupby('month_name')['total_trips'].sum()
             busiest_month = total_monthly_trips.idxmax()
             quietest_month = total_monthly_trips.idxmin()
+            stages.mark('calculate_additional_statistics')
 
-            # 7. Prepare Analysis Results
+            # 5. Prepare Analysis Results
             analysis_results = {
-                "visualization": {
-                    "plot": plot_base64,
-                    "type": "image/png",
-                    "encoding": "base64"
-                },
                 "city_demand_patterns": results,
                 "monthly_distribution": {
                     city: monthly_trips[monthly_trips['city_name'] == city][
@@ -130,6 +105,10 @@ class DemandAnalysisService:
                 }
             }
 
+            if include_plots:
+                analysis_results["visualization"] = plots["visualization"]
+
+            stages.mark('prepare_analysis_results')
             return analysis_results
 
         except Exception as e:
@@ -0,0 +1,115 @@
+import os
+import threading
+
+class DiskCacheTier:
+    """
+    On-disk cache tier shared by worker processes: one file per key under
+    config.DISK_DIR, capped at config.DISK_MAX_BYTES in total.
+
+    Reads refresh a file's mtime, so the mtime orders entries by last use.
+    Each process tracks an estimate of the directory size (scanned on first
+    write, then increased by what it writes); when the estimate passes the
+    cap, the directory is rescanned and the least recently used files are
+    deleted until it is down to PRUNE_TO of the cap. Keys embed the dataset
+    version, so entries of older versions are the first to go.
+    """
+    PRUNE_TO = 0.8
+
+    def __init__(self, config):
+        self.config = config
+        self._bytes = None
+        self._lock = threading.Lock()
+        self._counters = {'pruned_files': 0, 'pruned_bytes': 0}
+
+    def path(self, key):
+        return os.path.join(self.config.DISK_DIR, key[:2], f"{key}.json")
+
+    def read(self, key):
+        """Return the stored bytes of a key, or None."""
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def write(self, key, data):
+        """Store bytes under a key, then prune if the tier is over its cap. Failures are not fatal."""
+        path = self.path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = self._scan_bytes()
+            else:
+                self._bytes += len(data)
+            over = self._bytes > self.config.DISK_MAX_BYTES
+        if over:
+            self.prune()
+
+    def _files(self):
+        files = []
+        for root, _, names in os.walk(self.config.DISK_DIR):
+            for name in names:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime_ns, stat.st_size, path))
+        return files
+
+    def _scan_bytes(self):
+        return sum(size for _, size, _ in self._files())
+
+    def prune(self, max_bytes=None):
+        """Delete least recently used files until the tier holds at most PRUNE_TO of max_bytes."""
+        limit = (self.config.DISK_MAX_BYTES if max_bytes is None else max_bytes) * DiskCacheTier.PRUNE_TO
+        with self._lock:
+            files = sorted(self._files())
+            total = sum(size for _, size, _ in files)
+            for _, size, path in files:
+                if total <= limit:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                self._counters['pruned_files'] += 1
+                self._counters['pruned_bytes'] += size
+            self._bytes = total
+
+    def clear(self):
+        """Delete every stored file."""
+        with self._lock:
+            for _, _, path in self._files():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "disk_dir": self.config.DISK_DIR,
+                "disk_max_bytes": self.config.DISK_MAX_BYTES,
+                "disk_bytes_estimate": self._bytes,
+                "disk_pruned_files": self._counters['pruned_files'],
+                "disk_pruned_bytes": self._counters['pruned_bytes']
+            }
@@ -1,85 +1,63 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import io
-import base64
 from config.__init__ import DataPaths
+from services.fastapi.chart_renderer import ChartRenderer
+from services.fastapi.dataset_store import DatasetStore
+from services.fastapi.trips_cube import TripsCube
+from services.fastapi.stage_metrics import StageMetrics
 
 class FareAnalysisService:
     @staticmethod
-    def analyze_city_fares():
+    def analyze_city_fares(include_plots=True):
         """
         Analyze average fares and distances per city.
         Returns visualization and detailed fare metrics.
         """
         try:
+            stages = StageMetrics.stages()
             # 1. Data Import using configured paths
-            trips_df = pd.read_csv(DataPaths.FACT_TRIPS)
-            cities_df = pd.read_csv(DataPaths.DIM_CITY)
+            cities_df = DatasetStore.get(DataPaths.DIM_CITY)
+            stages.mark('data_import', rows=len(cities_df))
 
             # 2. Calculate average fare and distance per city
-            city_metrics = trips_df.groupby('city_id').agg({
+            city_metrics = TripsCube.rollup('city_id', {
                 'fare_amount': 'mean',
                 'distance_travelled(km)': 'mean'
             }).reset_index()
+            stages.mark('calculate_average_fare_and_distance')
 
             # 3. Merge with city names
             city_metrics = city_metrics.merge(cities_df, on='city_id', how='left')
             city_metrics = city_metrics.sort_values('fare_amount', ascending=False)
+            stages.mark('merge_with_city_names')
 
             # 4. Calculate fare per kilometer
             city_metrics['fare_per_km'] = (
                 city_metrics['fare_amount'] / city_metrics['distance_travelled(km)']
             ).round(2)
+            stages.mark('calculate_fare_per_kilometer')
 
             # 5. Generate Visualization
-            plt.style.use('dark_background')
-            plt.figure(figsize=(12, 8), facecolor='#2e2e2e')
-            
-            plt.scatter(
-                city_metrics['distance_travelled(km)'], 
-                city_metrics['fare_amount'],
-                color='goldenrod', 
-                s=100, 
-                alpha=0.6
-            )
-
-            # Customize the plot
-            plt.xlabel('Average Distance Travelled (km)', color='white', fontsize=12)
-            plt.ylabel('Average Fare Amount', color='white', fontsize=12)
-            plt.title('Average Fare vs Distance Travelled per City', 
-                     color='white', fontsize=14, pad=20)
-
-            # Add city labels
-            for i, city in enumerate(city_metrics['city_name']):
-                plt.annotate(
-                    city,
-                    (city_metrics['distance_travelled(km)'].iloc[i], 
-                     city_metrics['fare_amount'].iloc[i]),
-                    color='white',
-                    xytext=(5, 5),
-                    textcoords='offset points',
-                    fontsize=10
-                )
-
-            # Customize grid and spines
-            plt.grid(True, linestyle='--', alpha=0.3)
-            plt.tick_params(colors='white')
-            plt.tight_layout()
-
-            # Save plot to bytes
-            buf = io.BytesIO()
-            plt.savefig(buf, format='png', bbox_inches='tight', facecolor='#2e2e2e')
-            buf.seek(0)
-            plot_base64 = base64.b64encode(buf.getvalue()).decode()
-            plt.close()
+            if include_plots:
+                plots = ChartRenderer.render_many({
+                    "visualization": {
+                        'kind': 'scatter',
+                        'x': city_metrics['distance_travelled(km)'].tolist(),
+                        'y': city_metrics['fare_amount'].tolist(),
+                        'point_labels': city_metrics['city_name'].tolist(),
+                        'color': 'goldenrod',
+                        'size': 100,
+                        'alpha': 0.6,
+                        'figsize': (12, 8),
+                        'title': 'Average Fare vs Distance Travelled per City',
+                        'xlabel': 'Average Distance Travelled (km)',
+                        'ylabel': 'Average Fare Amount',
+                        'grid': 0.3,
+                        'grid_linestyle': '--'
+                    }
+                })
+                stages.mark('generate_visualizations', bytes=ChartRenderer.encoded_bytes(plots))
 
             # 6. Prepare Analysis Results
             analysis_results = {
-                "visualization": {
-                    "plot": plot_base64,
-                    "type": "image/png",
-                    "encoding": "base64"
-                },
                 "city_metrics": city_metrics[[
                     'city_name', 'fare_amount', 'distance_travelled(km)', 'fare_per_km'
                 ]].round(2).to_dict('records'),
@@ -101,6 +79,10 @@ class FareAnalysisService:
                 ]].sort_values('fare_per_km', ascending=False).to_dict('records')
             }
 
+            if include_plots:
+                analysis_results["visualization"] = plots["visualization"]
+
+            stages.mark('prepare_analysis_results')
             return analysis_results
 
         except Exception as e:
@@ -0,0 +1,50 @@
+import numpy as np
+
+class FoldedLinearModel:
+    """
+    A StandardScaler followed by a LinearRegression, folded into one affine
+    transform: prediction = x . weights + intercept on raw (unscaled) features.
+
+    With z = (x - mean) / scale and y = z . coef + b, the folded weights are
+    coef / scale and the intercept is b - sum(coef * mean / scale). The
+    artifact is plain JSON and inference needs only NumPy.
+    """
+    def __init__(self, features, weights, intercept):
+        self.features = list(features)
+        self.weights = np.asarray(weights, dtype='float64')
+        self.intercept = float(intercept)
+
+    @staticmethod
+    def fold(scaler, model, features):
+        """Fold a fitted StandardScaler and linear model into one transform."""
+        coef = np.asarray(model.coef_, dtype='float64').ravel()
+        scale = np.ones_like(coef) if scaler.scale_ is None else np.asarray(scaler.scale_, dtype='float64')
+        mean = np.zeros_like(coef) if scaler.mean_ is None or not scaler.with_mean \
+            else np.asarray(scaler.mean_, dtype='float64')
+        weights = coef / scale
+        intercept = float(np.ravel(model.intercept_)[0]) - float(np.dot(weights, mean))
+        return FoldedLinearModel(features, weights, intercept)
+
+    def to_dict(self):
+        return {
+            "features": self.features,
+            "weights": self.weights.tolist(),
+            "intercept": self.intercept
+        }
+
+    @staticmethod
+    def from_dict(values):
+        return FoldedLinearModel(values['features'], values['weights'], values['intercept'])
+
+    def predict(self, X):
+        """
+        Predict for a 2-D array of raw features in self.features order. Terms
+        are summed column by column in a fixed order (not with a BLAS matmul,
+        whose summation order depends on the array shape), so a trip scores
+        bit-for-bit the same alone or inside any batch.
+        """
+        X = np.asarray(X, dtype='float64')
+        prediction = np.full(len(X), self.intercept)
+        for column, weight in enumerate(self.weights):
+            prediction += X[:, column] * weight
+        return prediction
@@ -1,55 +1,54 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-import joblib
 import os
-from config.__init__ import DataPaths
+from datetime import datetime, timezone
+from config.__init__ import DataPaths, TrainingConfig
+from services.fastapi.city_models import CityModelTrainer
+from services.fastapi.columnar_cache import ColumnarCache
+from services.fastapi.dataset_store import DatasetStore
+from services.fastapi.model_store import ModelStore
+from services.fastapi.similar_trips_index import SimilarTripsIndex
+from services.fastapi.streaming_regression import MomentAccumulator
 
 class MLSatisfactionPredictionService:
-    MODEL_PATH = "models/satisfaction_predictor.joblib"
-    SCALER_PATH = "models/scaler.joblib"
+    FEATURES = ['distance_travelled(km)', 'fare_amount', 'passenger_rating', 'driver_rating']
     
     @staticmethod
-    def ensure_model_directory():
-        """Ensure the models directory exists"""
-        os.makedirs(os.path.dirname(MLSatisfactionPredictionService.MODEL_PATH), exist_ok=True)
-    
-    @staticmethod
-    def calculate_confidence_score(prediction, similar_trips_data, model_reliability):
+    def calculate_confidence_score(prediction, similar_trips, model_reliability):
         """
         Calculate a comprehensive confidence score based on multiple factors:
         1. Model reliability (R² score)
         2. Similar trips count
         3. Prediction variance in similar trips
         4. Distance from training data mean
+
+        similar_trips is the summary returned by SimilarTripsIndex.query:
+        trip count, and mean/std of the per-trip satisfaction rating.
         """
         # Base confidence from model reliability (30% weight)
         base_confidence = model_reliability * 0.3
         
         # Similar trips confidence (30% weight)
-        similar_trips_count = len(similar_trips_data)
+        similar_trips_count = similar_trips['count']
         similar_trips_score = min(similar_trips_count / 50, 1.0) * 0.3
         
         # Prediction variance confidence (20% weight)
-        if similar_trips_count > 0:
-            variance = np.std(similar_trips_data[['passenger_rating', 'driver_rating']].mean(axis=1))
+        if similar_trips_count > 0 and similar_trips['std'] is not None:
+            variance = similar_trips['std']
             variance_score = (1 - min(variance / 2, 1)) * 0.2
         else:
             variance_score = 0
             
         # Distance from mean confidence (20% weight)
-        if similar_trips_count > 0:
-            mean_satisfaction = similar_trips_data[['passenger_rating', 'driver_rating']].mean().mean()
+        if similar_trips_count > 0 and similar_trips['mean'] is not None:
+            mean_satisfaction = similar_trips['mean']
             distance_from_mean = abs(prediction - mean_satisfaction)
             distance_score = (1 - min(distance_from_mean / 2, 1)) * 0.2
         else:
             distance_score = 0
         
         total_confidence = base_confidence + similar_trips_score + variance_score + distance_score
-        return min(total_confidence * 100, 100)
+        return float(min(total_confidence * 100, 100))
 
     @staticmethod
     def get_satisfaction_status(satisfaction_score, confidence_score):
@@ -89,6 +88,12 @@ class MLSatisfactionPredictionService:
             'reliability_score': round(confidence_score, 2)
         }
 
+    @staticmethod
+    def validate_distances(distances):
+        """Reject trips whose distance is not positive (the insights use the fare per km)."""
+        if np.any(np.asarray(distances, dtype='float64') <= 0):
+            raise ValueError("distance_travelled(km) must be greater than 0")
+
     @staticmethod
     def get_actionable_insights(prediction_input, satisfaction_score):
         """
@@ -98,6 +103,7 @@ class MLSatisfactionPredictionService:
         priority_levels = []
         
         # Analyze fare-distance ratio
+        MLSatisfactionPredictionService.validate_distances(prediction_input['distance_travelled(km)'])
         fare_per_km = prediction_input['fare_amount'] / prediction_input['distance_travelled(km)']
         if fare_per_km > 20:
             insights.append("Fare pricing is above optimal range for the distance")
@@ -134,143 +140,391 @@ class MLSatisfactionPredictionService:
         ]
 
     @staticmethod
-    def train_model():
+    def train_model(progress=None, mode=None, per_city=None):
         """
-        Train the customer satisfaction prediction model with enhanced evaluation
+        Train the customer satisfaction prediction model with enhanced evaluation.
+        progress, if given, is called as progress(stage, fraction) as training
+        moves through its stages. mode is 'in_memory' or 'streaming'
+        (TrainingConfig.MODE by default). per_city (TrainingConfig.PER_CITY by
+        default) also fits one model per city_id, in memory and in parallel.
         """
+        per_city = TrainingConfig.PER_CITY if per_city is None else per_city
+        if per_city:
+            return MLSatisfactionPredictionService.train_model_per_city(progress)
+        mode = mode or TrainingConfig.MODE
+        if mode == 'streaming':
+            return MLSatisfactionPredictionService.train_model_streaming(progress)
+        if mode != 'in_memory':
+            raise Exception(f"Error training satisfaction prediction model: unknown training mode '{mode}'")
+
+        # scikit-learn is only needed to fit; predictions use the folded NumPy model
+        from sklearn.model_selection import cross_val_score
+
+        report = progress or (lambda stage, fraction: None)
         try:
             # Load data
-            fact_trips = pd.read_csv(DataPaths.FACT_TRIPS)
-            
-            # Feature engineering
-            fact_trips['customer_satisfaction'] = (
-                fact_trips['passenger_rating'] + 
-                fact_trips['driver_rating']
-            ) / 2
-
-            # Select features and target
-            features = fact_trips[[
-                'distance_travelled(km)', 
-                'fare_amount', 
-                'passenger_rating', 
-                'driver_rating'
-            ]]
-            target = fact_trips['customer_satisfaction']
-
-            # Handle missing values
-            features = features.dropna()
-            target = target[features.index]
-
-            # Initialize and fit scaler
-            scaler = StandardScaler()
-            features_scaled = scaler.fit_transform(features)
-            
-            # Split data
-            X_train, X_test, y_train, y_test = train_test_split(
-                features_scaled, 
-                target, 
-                test_size=0.2, 
-                random_state=42
+            report('loading_data', 0.0)
+            features, target, passenger_rating = MLSatisfactionPredictionService.training_frame()
+
+            # Scale, split, fit and evaluate on the test split
+            report('fitting', 0.2)
+            model, scaler, evaluation = CityModelTrainer.fit_scope(features, target, passenger_rating)
+
+            # Cross-validation
+            report('cross_validation', 0.4)
+            cv_scores = cross_val_score(model, scaler.transform(features), target, cv=5)
+
+            report('evaluating', 0.7)
+            return MLSatisfactionPredictionService.publish_training(
+                model, scaler, dict(evaluation, training_mode=mode, cv_scores=cv_scores), report
             )
 
-            # Train model
+        except Exception as e:
+            raise Exception(f"Error training satisfaction prediction model: {str(e)}")
+
+    @staticmethod
+    def training_frame(fact_trips=None):
+        """
+        Features, target (mean of passenger and driver rating) and passenger
+        rating of the trips with complete features.
+        """
+        if fact_trips is None:
+            fact_trips = DatasetStore.get(DataPaths.FACT_TRIPS)
+
+        # Feature engineering (kept off the shared frame)
+        customer_satisfaction = (
+            fact_trips['passenger_rating'] + 
+            fact_trips['driver_rating']
+        ) / 2
+
+        # Handle missing values
+        features = fact_trips[MLSatisfactionPredictionService.FEATURES].dropna()
+        return features, customer_satisfaction[features.index], fact_trips.loc[features.index, 'passenger_rating']
+
+    @staticmethod
+    def train_model_per_city(progress=None):
+        """
+        Train the global model and one model per city_id in a process pool,
+        with every cross-validation fold as its own task. Cities with fewer
+        than TrainingConfig.MIN_CITY_ROWS complete trips are left to the
+        global model.
+        """
+        report = progress or (lambda stage, fraction: None)
+        try:
+            # 1. Global and per-city training sets
+            report('loading_data', 0.0)
+            fact_trips = DatasetStore.get(DataPaths.FACT_TRIPS)
+            scopes = {CityModelTrainer.GLOBAL: MLSatisfactionPredictionService.training_frame(fact_trips)}
+            for city_id, city_trips in fact_trips.groupby('city_id', observed=True):
+                features, target, passenger_rating = MLSatisfactionPredictionService.training_frame(city_trips)
+                if len(features) >= TrainingConfig.MIN_CITY_ROWS:
+                    scopes[str(city_id)] = (features, target, passenger_rating)
+
+            # 2. Fit every scope and fold in parallel
+            trained = CityModelTrainer.train(scopes, folds=5, progress=report)
+            model, scaler, evaluation = trained.pop(CityModelTrainer.GLOBAL)
+
+            return MLSatisfactionPredictionService.publish_training(
+                model, scaler, dict(evaluation, training_mode='per_city'), report, cities=trained
+            )
+
+        except Exception as e:
+            raise Exception(f"Error training satisfaction prediction model: {str(e)}")
+
+    @staticmethod
+    def _streaming_folds(features, folds):
+        """
+        Yield (values, fold) for each fact_trips chunk: the complete rows as
+        features, target and passenger rating columns, and each row's random
+        fold. Folds are seeded per chunk, so every pass sees the same ones.
+        """
+        chunks = ColumnarCache.iter_chunks(
+            DataPaths.FACT_TRIPS, TrainingConfig.STREAMING_CHUNK_SIZE, features
+        )
+        for chunk_number, chunk in enumerate(chunks):
+            values = chunk.dropna().to_numpy(dtype='float64')
+            passenger_rating = values[:, features.index('passenger_rating')]
+            driver_rating = values[:, features.index('driver_rating')]
+            values = np.column_stack([values, (passenger_rating + driver_rating) / 2, passenger_rating])
+            keys = np.random.default_rng([TrainingConfig.RANDOM_SEED, chunk_number]).random(len(values))
+            yield values, np.minimum((keys * folds).astype('int64'), folds - 1)
+
+    @staticmethod
+    def train_model_streaming(progress=None):
+        """
+        Train the same scaler + linear model in two passes over fact_trips
+        chunks, with memory bounded by the chunk size.
+
+        Each row is assigned to one of TrainingConfig.CV_FOLDS random folds and
+        its features, target and passenger rating are folded into that fold's
+        MomentAccumulator. The scaler comes from all folds, the model from
+        every fold but the first (the test split), and the cross-validation
+        models from all folds but the one they are scored on. The second pass
+        accumulates the residuals of those fits: squared errors expanded from
+        the moments cancel badly when the fit is close to exact, so test
+        RMSE, MAE, R2, the cv scores and model reliability are measured on
+        the rows themselves.
+        """
+        from sklearn.linear_model import LinearRegression
+        from sklearn.preprocessing import StandardScaler
+
+        report = progress or (lambda stage, fraction: None)
+        features = MLSatisfactionPredictionService.FEATURES
+        # Accumulated columns: the features, the target, the passenger rating
+        x_columns = list(range(len(features)))
+        target_column = len(features)
+        rating_column = len(features) + 1
+        folds = TrainingConfig.CV_FOLDS
+
+        try:
+            # 1. First pass: moments of each fold
+            report('accumulating', 0.0)
+            fold_moments = [MomentAccumulator(len(features) + 2) for _ in range(folds)]
+            for values, fold in MLSatisfactionPredictionService._streaming_folds(features, folds):
+                for k in range(folds):
+                    fold_moments[k].update(values[fold == k])
+
+            everything = MomentAccumulator.combine(fold_moments)
+            if everything.n == 0:
+                raise ValueError("fact_trips has no complete rows to train on")
+
+            # 2. Scaler over all rows, model over the training folds, and
+            # the cross-validation models refit without each fold
+            report('fitting', 0.45)
+            training = MomentAccumulator.combine(fold_moments[1:])
+            coef, intercept = training.fit(x_columns, target_column)
+            fold_fits = [
+                MomentAccumulator.combine(
+                    moments for j, moments in enumerate(fold_moments) if j != k
+                ).fit(x_columns, target_column)
+                for k in range(folds)
+            ]
+
+            scaler = StandardScaler()
+            scaler.mean_ = everything.mean[x_columns]
+            scaler.var_ = everything.variance()[x_columns]
+            scaler.scale_ = np.where(np.sqrt(scaler.var_) < 10 * np.finfo('float64').eps, 1.0, np.sqrt(scaler.var_))
+            scaler.n_samples_seen_ = int(everything.n)
+            scaler.n_features_in_ = len(features)
+            scaler.feature_names_in_ = np.array(features, dtype=object)
+
+            # Same fit expressed on standardized features
             model = LinearRegression()
-            model.fit(X_train, y_train)
-            
-            # Cross-validation
-            cv_scores = cross_val_score(model, features_scaled, target, cv=5)
-
-            # Predictions and metrics
-            y_pred = model.predict(X_test)
-            rmse = mean_squared_error(y_test, y_pred, squared=False)
-            mae = mean_absolute_error(y_test, y_pred)
-            r2 = r2_score(y_test, y_pred)
-
-            # Save model and scaler
-            MLSatisfactionPredictionService.ensure_model_directory()
-            joblib.dump(model, MLSatisfactionPredictionService.MODEL_PATH)
-            joblib.dump(scaler, MLSatisfactionPredictionService.SCALER_PATH)
-
-            # Prepare comprehensive evaluation metrics
-            evaluation_metrics = {
-                'rmse': float(rmse),
-                'mae': float(mae),
-                'r2_score': float(r2),
-                'cv_mean_score': float(np.mean(cv_scores)),
-                'cv_std_score': float(np.std(cv_scores)),
-                'model_reliability': float(r2)
+            model.coef_ = coef * scaler.scale_
+            model.intercept_ = intercept + float(coef @ scaler.mean_)
+            model.n_features_in_ = len(features)
+
+            # 3. Second pass: residuals of the model on the test fold and on
+            # all rows (against the passenger rating), and of each
+            # cross-validation model on its held-out fold
+            report('evaluating', 0.5)
+            test_squared, test_absolute, rating_squared = 0.0, 0.0, 0.0
+            fold_squared = np.zeros(folds)
+            for values, fold in MLSatisfactionPredictionService._streaming_folds(features, folds):
+                prediction = values[:, x_columns] @ coef + intercept
+                residual = values[:, target_column] - prediction
+                test_squared += float(np.sum(residual[fold == 0] ** 2))
+                test_absolute += float(np.sum(np.abs(residual[fold == 0])))
+                rating_squared += float(np.sum((values[:, rating_column] - prediction) ** 2))
+                for k, (fold_coef, fold_intercept) in enumerate(fold_fits):
+                    held_out = values[fold == k]
+                    fold_residual = held_out[:, target_column] - held_out[:, x_columns] @ fold_coef - fold_intercept
+                    fold_squared[k] += float(np.sum(fold_residual ** 2))
+
+            test = fold_moments[0]
+            return MLSatisfactionPredictionService.publish_training(model, scaler, {
+                "training_mode": 'streaming',
+                "training_rows": int(everything.n),
+                "training_samples": int(training.n),
+                "test_samples": int(test.n),
+                "feature_means": dict(zip(features, everything.mean[x_columns].tolist())),
+                "feature_stds": dict(zip(features, np.sqrt(everything.variance(ddof=1)[x_columns]).tolist())),
+                "r2_score": float(test.r2(test_squared, target_column)),
+                "cv_scores": np.array([
+                    fold_moments[k].r2(fold_squared[k], target_column) for k in range(folds)
+                ]),
+                "rmse": float(np.sqrt(test_squared / test.n)),
+                "mae": float(test_absolute / test.n),
+                "model_reliability": float(everything.r2(rating_squared, rating_column))
+            }, report)
+
+        except Exception as e:
+            raise Exception(f"Error training satisfaction prediction model: {str(e)}")
+
+    @staticmethod
+    def publish_training(model, scaler, evaluation, report, cities=None):
+        """
+        Publish a fitted model and scaler as the new current version and
+        build the training report from its evaluation statistics. cities maps
+        city_id to the (model, scaler, evaluation) of its own model.
+        """
+        features = MLSatisfactionPredictionService.FEATURES
+        cv_scores = evaluation['cv_scores']
+        cities = cities or {}
+
+        def city_metadata(city_evaluation):
+            return {
+                "training_rows": city_evaluation['training_rows'],
+                "r2_score": city_evaluation['r2_score'],
+                "cv_mean_score": float(np.mean(city_evaluation['cv_scores'])),
+                "cv_std_score": float(np.std(city_evaluation['cv_scores'])),
+                "rmse": city_evaluation['rmse'],
+                "mae": city_evaluation['mae'],
+                "model_reliability": city_evaluation['model_reliability']
+            }
+
+        # Reliability statistics, computed once here and read by every prediction
+        metadata = {
+            "trained_at": datetime.now(timezone.utc).isoformat(),
+            "training_mode": evaluation['training_mode'],
+            "data_version": DatasetStore.data_version([DataPaths.FACT_TRIPS]),
+            "training_rows": evaluation['training_rows'],
+            "features": features,
+            "feature_means": evaluation['feature_means'],
+            "feature_stds": evaluation['feature_stds'],
+            "r2_score": evaluation['r2_score'],
+            "cv_mean_score": float(np.mean(cv_scores)),
+            "cv_std_score": float(np.std(cv_scores)),
+            "rmse": evaluation['rmse'],
+            "mae": evaluation['mae'],
+            "model_reliability": evaluation['model_reliability'],
+            "city_models": sorted(cities)
+        }
+
+        # Publish model, scaler and metadata as a new current version
+        report('saving', 0.9)
+        published = ModelStore.publish({
+            'model': model,
+            'scaler': scaler,
+            'metadata': metadata,
+            'cities': {
+                city_id: {'model': city_model, 'scaler': city_scaler, 'metadata': city_metadata(city_evaluation)}
+                for city_id, (city_model, city_scaler, city_evaluation) in cities.items()
             }
+        })
 
-            # Feature importance analysis
-            feature_importance = pd.DataFrame({
-                'feature': features.columns,
-                'importance': np.abs(model.coef_)
-            }).sort_values('importance', ascending=False)
-
-            training_results = {
-                "model_performance": evaluation_metrics,
-                "feature_importance": [
-                    {
-                        "feature": row['feature'],
-                        "importance": float(row['importance']),
-                        "impact_level": "High" if row['importance'] > np.mean(model.coef_) else "Medium"
-                    }
-                    for _, row in feature_importance.iterrows()
-                ],
-                "training_metadata": {
-                    "total_samples": len(features),
-                    "training_samples": len(X_train),
-                    "test_samples": len(X_test),
-                    "model_type": "Linear Regression",
-                    "features_used": features.columns.tolist(),
-                    "cross_validation_folds": 5
+        # Prepare comprehensive evaluation metrics
+        evaluation_metrics = {
+            'rmse': evaluation['rmse'],
+            'mae': evaluation['mae'],
+            'r2_score': evaluation['r2_score'],
+            'cv_mean_score': float(np.mean(cv_scores)),
+            'cv_std_score': float(np.std(cv_scores)),
+            'model_reliability': evaluation['r2_score']
+        }
+
+        # Feature importance analysis
+        feature_importance = pd.DataFrame({
+            'feature': features,
+            'importance': np.abs(model.coef_)
+        }).sort_values('importance', ascending=False)
+
+        return {
+            "model_performance": evaluation_metrics,
+            "feature_importance": [
+                {
+                    "feature": row['feature'],
+                    "importance": float(row['importance']),
+                    "impact_level": "High" if row['importance'] > np.mean(model.coef_) else "Medium"
                 }
+                for _, row in feature_importance.iterrows()
+            ],
+            "training_metadata": {
+                "total_samples": evaluation['training_rows'],
+                "training_samples": evaluation['training_samples'],
+                "test_samples": evaluation['test_samples'],
+                "model_type": "Linear Regression",
+                "training_mode": evaluation['training_mode'],
+                "features_used": features,
+                "cross_validation_folds": len(cv_scores),
+                "model_version": published['version']
+            },
+            "city_models": {
+                city_id: city['metadata'] for city_id, city in sorted(published['cities'].items())
             }
+        }
 
-            return training_results
+    @staticmethod
+    def import_legacy_model():
+        """
+        Publish the shipped models/satisfaction_predictor.joblib and
+        scaler.joblib as the registry's first version when nothing is
+        published yet. The model is not refitted: it is evaluated on the
+        current trips (test split and cross-validation as in train_model) to
+        fill in its metadata. Runs under the registry lock, so concurrent
+        callers import once. Returns the current version, or None when
+        nothing is published and there are no legacy artifacts.
+        """
+        with ModelStore.exclusive():
+            if ModelStore.available():
+                return ModelStore.current_version()
+            if not (os.path.exists(DataPaths.SATISFACTION_MODEL) and os.path.exists(DataPaths.SATISFACTION_SCALER)):
+                return None
 
-        except Exception as e:
-            raise Exception(f"Error training satisfaction prediction model: {str(e)}")
+            import joblib
+            from sklearn.linear_model import LinearRegression
+            from sklearn.model_selection import cross_val_score
+            try:
+                model = joblib.load(DataPaths.SATISFACTION_MODEL)
+                scaler = joblib.load(DataPaths.SATISFACTION_SCALER)
+                features, target, passenger_rating = MLSatisfactionPredictionService.training_frame()
+                evaluation = CityModelTrainer.evaluate_scope(model, scaler, features, target, passenger_rating)
+                # A fresh estimator: pickles from older scikit-learn releases cannot be cloned
+                cv_scores = cross_val_score(LinearRegression(), scaler.transform(features), target, cv=5)
+                results = MLSatisfactionPredictionService.publish_training(
+                    model, scaler, dict(evaluation, training_mode='legacy_import', cv_scores=cv_scores),
+                    lambda stage, fraction: None
+                )
+            except Exception as e:
+                raise Exception(f"Error importing legacy satisfaction model: {str(e)}")
+            return results['training_metadata']['model_version']
+
+    @staticmethod
+    def resident_model(model_version=None):
+        """
+        Get the resident bundle of a model version (the current one by
+        default), importing the legacy artifacts first if nothing is
+        published. Raises LookupError when there is still no model: training
+        goes through the training jobs, never inline in a prediction.
+        """
+        if model_version is None and not ModelStore.available():
+            MLSatisfactionPredictionService.import_legacy_model()
+        return ModelStore.get(model_version)
 
     @staticmethod
-    def predict_satisfaction(prediction_input):
+    def predict_satisfaction(prediction_input, model_version=None):
         """
-        Predict customer satisfaction with comprehensive analysis
+        Predict customer satisfaction with comprehensive analysis, using the
+        current model version or the pinned model_version. Trips with a
+        city_id that has its own model in the version are scored with it.
         """
         try:
-            # Check if model exists, if not, train it first
-            if not os.path.exists(MLSatisfactionPredictionService.MODEL_PATH) or \
-               not os.path.exists(MLSatisfactionPredictionService.SCALER_PATH):
-                print("Model not found. Training new model...")
-                MLSatisfactionPredictionService.train_model()
-                print("Model training completed.")
-
-            # Load the trained model and scaler
-            model = joblib.load(MLSatisfactionPredictionService.MODEL_PATH)
-            scaler = joblib.load(MLSatisfactionPredictionService.SCALER_PATH)
-
-            # Prepare input data
-            input_features = ['distance_travelled(km)', 'fare_amount', 'passenger_rating', 'driver_rating']
-            input_data = pd.DataFrame([prediction_input])[input_features]
-            input_scaled = scaler.transform(input_data)
-            
-            # Make prediction
-            prediction = model.predict(input_scaled)[0]
+            MLSatisfactionPredictionService.validate_distances(prediction_input['distance_travelled(km)'])
+
+            # Use the resident folded model and metadata of the version, or of its city
+            bundle = MLSatisfactionPredictionService.resident_model(model_version)
+            city_id = prediction_input.get('city_id')
+            scope = bundle['cities'].get(city_id) if city_id is not None else None
+            predictor = (scope or bundle)['predictor']
+            metadata = (scope or bundle)['metadata']
+
+            # Make prediction (scaling is folded into the weights)
+            prediction = float(predictor.predict(
+                [[prediction_input[feature] for feature in predictor.features]]
+            )[0])
             satisfaction_percentage = (prediction / 10) * 100
 
-            # Get similar trips for confidence calculation
-            fact_trips = pd.read_csv(DataPaths.FACT_TRIPS)
-            similar_trips = fact_trips[
-                (abs(fact_trips['distance_travelled(km)'] - prediction_input['distance_travelled(km)']) <= 2) &
-                (abs(fact_trips['fare_amount'] - prediction_input['fare_amount']) <= 50)
-            ]
+            # Summarize similar trips (distance within 2 km, fare within 50) from the prebuilt index
+            similar_trips = SimilarTripsIndex.get().query(
+                prediction_input['distance_travelled(km)'],
+                prediction_input['fare_amount']
+            )
             
             # Calculate confidence score
             confidence_score = MLSatisfactionPredictionService.calculate_confidence_score(
                 prediction,
                 similar_trips,
-                model.score(scaler.transform(fact_trips[input_features].dropna()),
-                fact_trips['passenger_rating'].dropna())
+                metadata['model_reliability']
             )
 
             # Get satisfaction status
@@ -294,7 +548,7 @@ class MLSatisfactionPredictionService:
                     "reliability_score": status_info['reliability_score']
                 },
                 "analysis": {
-                    "similar_trips_count": int(len(similar_trips)),
+                    "similar_trips_count": similar_trips['count'],
                     "market_position": "Above Average" if satisfaction_percentage > 80 else "Below Average",
                     "trend": "Positive" if prediction_input['driver_rating'] >= 4.5 and prediction_input['passenger_rating'] >= 4.5 else "Needs Improvement"
                 },
@@ -302,10 +556,151 @@ class MLSatisfactionPredictionService:
                 "recommendations": {
                     "immediate_actions": [insight for insight in insights if insight['priority'] in ['Critical', 'High']],
                     "long_term_improvements": [insight for insight in insights if insight['priority'] in ['Medium', 'Low']]
-                }
+                },
+                "model_version": bundle['version'],
+                "model_scope": city_id if scope else CityModelTrainer.GLOBAL
             }
 
             return prediction_results
 
         except Exception as e:
             raise Exception(f"Error predicting satisfaction: {str(e)}")
+
+    @staticmethod
+    def score_frame(input_data, bundle, similar_trips_index):
+        """
+        Vectorized scoring of a DataFrame of trip features: one matrix-vector
+        product with the folded model (per city for rows whose optional
+        city_id column names a city model of the version), then similar
+        trips, confidence, status and confidence level with the same formulas
+        and thresholds as the single-trip path. Returns a DataFrame aligned
+        with input_data.
+        """
+        predictor = bundle['predictor']
+        features = input_data[predictor.features].to_numpy(dtype='float64')
+
+        # 1. Score all trips at once, then rescore the rows of each city model
+        predictions = predictor.predict(features)
+        model_reliability = np.full(len(input_data), bundle['metadata']['model_reliability'])
+        model_scope = np.full(len(input_data), CityModelTrainer.GLOBAL, dtype=object)
+        if bundle['cities'] and 'city_id' in input_data:
+            city_ids = input_data['city_id'].astype('object').to_numpy()
+            for city_id, city in bundle['cities'].items():
+                rows = city_ids == city_id
+                if rows.any():
+                    predictions[rows] = city['predictor'].predict(features[rows])
+                    model_reliability[rows] = city['metadata']['model_reliability']
+                    model_scope[rows] = city_id
+        satisfaction = (predictions / 10) * 100
+
+        # 2. Similar trips and confidence (same weights as calculate_confidence_score)
+        counts, means, stds = similar_trips_index.query_many(
+            input_data['distance_travelled(km)'].to_numpy(dtype='float64'),
+            input_data['fare_amount'].to_numpy(dtype='float64')
+        )
+        has_std = (counts > 0) & ~np.isnan(stds)
+        has_mean = (counts > 0) & ~np.isnan(means)
+        confidence = (
+            model_reliability * 0.3 +
+            np.minimum(counts / 50, 1.0) * 0.3 +
+            np.where(has_std, (1 - np.minimum(np.nan_to_num(stds) / 2, 1)) * 0.2, 0) +
+            np.where(has_mean, (1 - np.minimum(np.abs(predictions - np.nan_to_num(means)) / 2, 1)) * 0.2, 0)
+        )
+        confidence = np.minimum(confidence * 100, 100)
+
+        # 3. Status and confidence level (same thresholds as get_satisfaction_status)
+        status = np.select(
+            [satisfaction >= 90, satisfaction >= 85, satisfaction >= 80, satisfaction >= 75,
+             satisfaction >= 70, satisfaction >= 65, satisfaction >= 60],
+            ['Exceptional', 'Excellent', 'Very Good', 'Good',
+             'Satisfactory', 'Needs Attention', 'At Risk'],
+            default='Critical'
+        )
+        confidence_level = np.select(
+            [confidence >= 90, confidence >= 70],
+            ['High Confidence', 'Moderate Confidence'],
+            default='Low Confidence'
+        )
+
+        return pd.DataFrame({
+            'satisfaction_score': satisfaction,
+            'confidence_score': confidence,
+            'status': status,
+            'confidence_level': confidence_level,
+            'similar_trips_count': counts,
+            'model_scope': model_scope
+        }, index=input_data.index)
+
+    @staticmethod
+    def predict_satisfaction_batch(prediction_inputs, model_version=None):
+        """
+        Predict customer satisfaction for a list of trips in one pass.
+        Scoring and insight rules are computed column-wise; each result
+        matches predict_satisfaction.
+        """
+        try:
+            input_features = ['distance_travelled(km)', 'fare_amount', 'passenger_rating', 'driver_rating', 'city_id']
+            input_data = pd.DataFrame(prediction_inputs, columns=input_features)
+            distance = input_data['distance_travelled(km)'].to_numpy(dtype='float64')
+            MLSatisfactionPredictionService.validate_distances(distance)
+
+            bundle = MLSatisfactionPredictionService.resident_model(model_version)
+            scores = MLSatisfactionPredictionService.score_frame(
+                input_data, bundle, SimilarTripsIndex.get()
+            )
+            passenger_rating = input_data['passenger_rating'].to_numpy(dtype='float64')
+            driver_rating = input_data['driver_rating'].to_numpy(dtype='float64')
+            satisfaction = scores['satisfaction_score'].to_numpy()
+
+            # Insight rules (same rules as get_actionable_insights), evaluated per column
+            fare_per_km = input_data['fare_amount'].to_numpy(dtype='float64') / distance
+            rules = [
+                (fare_per_km > 20, "Fare pricing is above optimal range for the distance", "High"),
+                (fare_per_km < 8, "Fare pricing is below optimal range for the distance", "Medium"),
+                (driver_rating < 4.5, "Driver performance requires improvement", "High"),
+                (passenger_rating < 4.5, "Consider customer experience enhancement measures", "Medium"),
+                (distance > 30, "Long-distance trip: Consider comfort optimization", "Low"),
+                (satisfaction < 75, "Implement immediate customer satisfaction improvement measures", "Critical")
+            ]
+            insight_items = [
+                {
+                    "insight": insight,
+                    "priority": priority,
+                    "impact": "High" if priority in ["Critical", "High"] else "Medium"
+                }
+                for _, insight, priority in rules
+            ]
+            fired = np.column_stack([mask for mask, _, _ in rules])
+            positive_trend = (driver_rating >= 4.5) & (passenger_rating >= 4.5)
+
+            # Assemble per-trip results
+            results = []
+            for i, row in enumerate(scores.itertuples(index=False)):
+                insights = [insight_items[r] for r in np.flatnonzero(fired[i])]
+                score = float(row.satisfaction_score)
+                results.append({
+                    "prediction": {
+                        "satisfaction_score": score,
+                        "status": row.status,
+                        "confidence_level": row.confidence_level,
+                        "industry_percentile": min(round(score), 100),
+                        "reliability_score": round(float(row.confidence_score), 2)
+                    },
+                    "analysis": {
+                        "similar_trips_count": int(row.similar_trips_count),
+                        "market_position": "Above Average" if score > 80 else "Below Average",
+                        "trend": "Positive" if positive_trend[i] else "Needs Improvement"
+                    },
+                    "insights": insights,
+                    "recommendations": {
+                        "immediate_actions": [insight for insight in insights if insight['priority'] in ['Critical', 'High']],
+                        "long_term_improvements": [insight for insight in insights if insight['priority'] in ['Medium', 'Low']]
+                    },
+                    "model_version": bundle['version'],
+                    "model_scope": row.model_scope
+                })
+
+            return results
+
+        except Exception as e:
+            raise Exception(f"Error predicting satisfaction batch: {str(e)}")
@@ -1,10 +1,6 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import io
-import base64
-import numpy as np
-from config.__init__ import DataPaths
+from services.fastapi.chart_renderer import ChartRenderer
+from services.fastapi.trips_cube import TripsCube
+from services.fastapi.stage_metrics import StageMetrics
 
 class MobilityTrendsAnalysisService:
     # Constants for environmental calculations
@@ -17,22 +13,14 @@ class MobilityTrendsAnalysisService:
     FUEL_COST_PER_KM = 0.12  # USD/km for regular fuel
 
     @staticmethod
-    def analyze_mobility_trends():
+    def analyze_mobility_trends(include_plots=True):
         """
         Analyze mobility trends and potential impact of EV adoption
         """
         try:
-            # 1. Data Import
-            fact_trips = pd.read_csv(DataPaths.FACT_TRIPS)
-            dim_city = pd.read_csv(DataPaths.DIM_CITY)
-
-            # 2. City-wise Analysis
-            city_metrics = fact_trips.merge(
-                dim_city[['city_id', 'city_name']], 
-                on='city_id'
-            )
-            
-            city_analysis = city_metrics.groupby('city_name').agg({
+            stages = StageMetrics.stages()
+            # 1. City-wise Analysis rolled up from the trips cube
+            city_analysis = TripsCube.rollup('city_name', {
                 'distance_travelled(km)': ['mean', 'sum', 'count'],
                 'fare_amount': ['mean', 'sum'],
                 'trip_id': 'count'
@@ -43,8 +31,9 @@ class MobilityTrendsAnalysisService:
                 'avg_distance', 'total_distance', 'trip_count',
                 'avg_fare', 'total_fare', 'total_trips'
             ]
+            stages.mark('city_wise_analysis')
 
-            # 3. Environmental Impact Calculations
+            # 2. Environmental Impact Calculations
             city_analysis['current_carbon_kg'] = (
                 city_analysis['total_distance'] * 
                 MobilityTrendsAnalysisService.CURRENT_CARBON_PER_KM
@@ -59,8 +48,9 @@ class MobilityTrendsAnalysisService:
                 city_analysis['current_carbon_kg'] - 
                 city_analysis['ev_carbon_kg']
             ).round(2)
+            stages.mark('environmental_impact_calculations')
 
-            # 4. Economic Impact Calculations
+            # 3. Economic Impact Calculations
             city_analysis['current_fuel_cost'] = (
                 city_analysis['total_distance'] * 
                 MobilityTrendsAnalysisService.FUEL_COST_PER_KM
@@ -86,91 +76,53 @@ class MobilityTrendsAnalysisService:
                 city_analysis['estimated_fleet_size'] * 
                 MobilityTrendsAnalysisService.EV_COST_PREMIUM
             ).round(2)
+            stages.mark('economic_impact_calculations')
+
+            # 4. Generate Visualizations
+            if include_plots:
+                # Investment vs annual savings, in thousands
+                investment = city_analysis['ev_investment_needed'] / 1000
+                annual_savings = (
+                    (city_analysis['current_fuel_cost'] - city_analysis['ev_energy_cost'] + 
+                     city_analysis['maintenance_savings']) / 1000
+                )
+
+                plots = ChartRenderer.render_many({
+                    "emissions_comparison": {
+                        'kind': 'grouped_bar',
+                        'categories': city_analysis.index.tolist(),
+                        'series': [
+                            {'label': 'Current Emissions', 'values': city_analysis['current_carbon_kg'].tolist(), 'color': 'red'},
+                            {'label': 'EV Emissions', 'values': city_analysis['ev_carbon_kg'].tolist(), 'color': 'green'}
+                        ],
+                        'width': 0.35,
+                        'value_labels': '{:,.0f}',
+                        'title': 'Current vs EV Carbon Emissions by City',
+                        'xlabel': 'City',
+                        'ylabel': 'Carbon Emissions (kg CO2)',
+                        'xtick_rotation': 45,
+                        'xtick_ha': 'right',
+                        'legend': True
+                    },
+                    "cost_analysis": {
+                        'kind': 'grouped_bar',
+                        'categories': city_analysis.index.tolist(),
+                        'series': [
+                            {'label': 'Investment Needed (K USD)', 'values': investment.tolist()},
+                            {'label': 'Annual Savings (K USD)', 'values': annual_savings.tolist()}
+                        ],
+                        'width': 0.35,
+                        'title': 'EV Investment vs Annual Savings by City',
+                        'xlabel': 'City',
+                        'ylabel': 'Amount (Thousand USD)',
+                        'xtick_rotation': 45,
+                        'xtick_ha': 'right',
+                        'legend': True
+                    }
+                })
+                stages.mark('generate_visualizations', bytes=ChartRenderer.encoded_bytes(plots))
 
-            # 5. Generate Visualizations
-            plt.style.use('dark_background')
-
-            # 5.1 Carbon Emissions Comparison
-            fig1, ax1 = plt.subplots(figsize=(12, 6), facecolor='#2e2e2e')
-            x = range(len(city_analysis.index))
-            width = 0.35
-
-            current_emissions = ax1.bar(
-                x, 
-                city_analysis['current_carbon_kg'], 
-                width, 
-                label='Current Emissions',
-                color='red'
-            )
-            ev_emissions = ax1.bar(
-                [i + width for i in x], 
-                city_analysis['ev_carbon_kg'], 
-                width, 
-                label='EV Emissions',
-                color='green'
-            )
-
-            ax1.set_title('Current vs EV Carbon Emissions by City')
-            ax1.set_xlabel('City')
-            ax1.set_ylabel('Carbon Emissions (kg CO2)')
-            ax1.set_xticks([i + width/2 for i in x])
-            ax1.set_xticklabels(city_analysis.index, rotation=45, ha='right')
-            ax1.legend()
-
-            # Add value labels
-            for bars in [current_emissions, ev_emissions]:
-                for bar in bars:
-                    height = bar.get_height()
-                    ax1.text(
-                        bar.get_x() + bar.get_width()/2.,
-                        height,
-                        f'{int(height):,}',
-                        ha='center', 
-                        va='bottom'
-                    )
-
-            plt.tight_layout()
-
-            # Save emissions plot
-            buf1 = io.BytesIO()
-            fig1.savefig(buf1, format='png', bbox_inches='tight', facecolor='#2e2e2e')
-            buf1.seek(0)
-            emissions_plot = base64.b64encode(buf1.getvalue()).decode()
-            plt.close(fig1)
-
-            # 5.2 Cost Analysis Plot
-            fig2, ax2 = plt.subplots(figsize=(12, 6), facecolor='#2e2e2e')
-            
-            # Create investment vs savings comparison
-            investment = city_analysis['ev_investment_needed'] / 1000  # Convert to thousands
-            annual_savings = (
-                (city_analysis['current_fuel_cost'] - city_analysis['ev_energy_cost'] + 
-                 city_analysis['maintenance_savings']) / 1000  # Convert to thousands
-            )
-            
-            x = np.arange(len(city_analysis.index))
-            width = 0.35
-
-            ax2.bar(x - width/2, investment, width, label='Investment Needed (K USD)')
-            ax2.bar(x + width/2, annual_savings, width, label='Annual Savings (K USD)')
-
-            ax2.set_title('EV Investment vs Annual Savings by City')
-            ax2.set_xlabel('City')
-            ax2.set_ylabel('Amount (Thousand USD)')
-            ax2.set_xticks(x)
-            ax2.set_xticklabels(city_analysis.index, rotation=45, ha='right')
-            ax2.legend()
-
-            plt.tight_layout()
-
-            # Save cost analysis plot
-            buf2 = io.BytesIO()
-            fig2.savefig(buf2, format='png', bbox_inches='tight', facecolor='#2e2e2e')
-            buf2.seek(0)
-            cost_plot = base64.b64encode(buf2.getvalue()).decode()
-            plt.close(fig2)
-
-            # 6. Prepare Analysis Results
+            # 5. Prepare Analysis Results
             total_current_emissions = city_analysis['current_carbon_kg'].sum()
             total_ev_emissions = city_analysis['ev_carbon_kg'].sum()
             total_carbon_savings = city_analysis['carbon_savings_kg'].sum()
@@ -184,18 +136,6 @@ class MobilityTrendsAnalysisService:
             payback_years = total_investment / total_annual_savings
 
             analysis_results = {
-                "visualizations": {
-                    "emissions_comparison": {
-                        "plot": emissions_plot,
-                        "type": "image/png",
-                        "encoding": "base64"
-                    },
-                    "cost_analysis": {
-                        "plot": cost_plot,
-                        "type": "image/png",
-                        "encoding": "base64"
-                    }
-                },
                 "environmental_impact": {
                     "total_current_emissions_kg": float(total_current_emissions),
                     "total_ev_emissions_kg": float(total_ev_emissions),
@@ -251,6 +191,10 @@ class MobilityTrendsAnalysisService:
                 }
             }
 
+            if include_plots:
+                analysis_results["visualizations"] = plots
+
+            stages.mark('prepare_analysis_results')
             return analysis_results
 
         except Exception as e:
@@ -0,0 +1,336 @@
+import os
+import re
+import json
+import uuid
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from config.__init__ import DataPaths, ModelRegistryConfig
+from services.fastapi.linear_model import FoldedLinearModel
+
+try:
+    import fcntl
+except ImportError:  # no fcntl (Windows), seeding is only serialized within a process
+    fcntl = None
+
+class ModelStore:
+    """
+    Local registry of satisfaction model versions, plus the in-memory copies
+    served by this process.
+
+    Each version is one immutable joblib file bundling model, scaler and
+    metadata, so a model can never be paired with another version's scaler.
+    Next to it are a JSON copy of the metadata and the scaler and model
+    folded into one linear transform (FoldedLinearModel), plus the folded
+    per-city models when the version has them. Serving reads only these
+    JSON files and needs neither joblib nor scikit-learn; the
+    fitted estimators are unpickled only by estimators(). A CURRENT file names
+    the version served by default; it is replaced atomically, and every get()
+    compares its (inode, mtime_ns, size) with the pointer last read, so a
+    version published by another process is swapped in on the next request.
+    Requests already holding a bundle finish on it. Any retained version can
+    be requested explicitly (pinned) for side-by-side comparisons.
+    """
+    REGISTRY_DIR = DataPaths.MODEL_REGISTRY
+    CURRENT_POINTER = os.path.join(DataPaths.MODEL_REGISTRY, 'CURRENT')
+    ARTIFACTS = ['model', 'scaler', 'metadata']
+    # Versions are named by publish(): UTC timestamp, then a random suffix
+    VERSION_PATTERN = re.compile(r'\d{8}T\d{12}Z-[0-9a-f]{6}')
+
+    _bundles = OrderedDict()
+    _pointer = {'signature': None, 'version': None}
+    _lock = threading.Lock()
+    _load_lock = threading.Lock()
+    _seed_lock = threading.Lock()
+    _counters = {'hits': 0, 'loads': 0, 'swaps': 0, 'published': 0}
+
+    @staticmethod
+    def _count(counter):
+        with ModelStore._lock:
+            ModelStore._counters[counter] += 1
+
+    @staticmethod
+    def bundle_path(version):
+        return os.path.join(ModelStore.REGISTRY_DIR, f"{version}.joblib")
+
+    @staticmethod
+    def metadata_path(version):
+        return os.path.join(ModelStore.REGISTRY_DIR, f"{version}.json")
+
+    @staticmethod
+    def linear_path(version):
+        return os.path.join(ModelStore.REGISTRY_DIR, f"{version}.linear.json")
+
+    @staticmethod
+    def cities_path(version):
+        return os.path.join(ModelStore.REGISTRY_DIR, f"{version}.cities.json")
+
+    @staticmethod
+    def _read_cities(version):
+        path = ModelStore.cities_path(version)
+        if not os.path.exists(path):
+            return {}
+        return {
+            city_id: {
+                'predictor': FoldedLinearModel.from_dict(city['predictor']),
+                'metadata': city['metadata']
+            }
+            for city_id, city in ModelStore._read_json(path).items()
+        }
+
+    @staticmethod
+    def _read_json(path):
+        with open(path) as f:
+            return json.load(f)
+
+    @staticmethod
+    def _pointer_signature():
+        try:
+            stat = os.stat(ModelStore.CURRENT_POINTER)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    @staticmethod
+    def current_version():
+        """Version named by the CURRENT pointer, or None if nothing is published."""
+        signature = ModelStore._pointer_signature()
+        pointer = ModelStore._pointer
+        if signature == pointer['signature']:
+            return pointer['version']
+
+        version = None
+        if signature is not None:
+            with open(ModelStore.CURRENT_POINTER) as f:
+                version = f.read().strip() or None
+        if pointer['signature'] is not None and version != pointer['version']:
+            ModelStore._count('swaps')
+        ModelStore._pointer = {'signature': signature, 'version': version}
+        return version
+
+    @staticmethod
+    def valid_version(version):
+        """Whether version is a name publish() could have given, so it is safe in a path."""
+        return isinstance(version, str) and ModelStore.VERSION_PATTERN.fullmatch(version) is not None
+
+    @staticmethod
+    def has_version(version):
+        return ModelStore.valid_version(version) and os.path.exists(ModelStore.bundle_path(version))
+
+    @staticmethod
+    def available():
+        """Check whether a current version is published."""
+        version = ModelStore.current_version()
+        return version is not None and ModelStore.has_version(version)
+
+    @staticmethod
+    @contextmanager
+    def exclusive():
+        """
+        Hold the registry's lock for publishing its first version, across
+        threads and, where fcntl exists, across processes.
+        """
+        with ModelStore._seed_lock:
+            os.makedirs(ModelStore.REGISTRY_DIR, exist_ok=True)
+            with open(os.path.join(ModelStore.REGISTRY_DIR, '.lock'), 'w') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                yield
+
+    @staticmethod
+    def _install(version, bundle):
+        # Keep the current version and the most recently used pinned ones resident
+        ModelStore._bundles[version] = bundle
+        ModelStore._bundles.move_to_end(version)
+        current = ModelStore._pointer['version']
+        for resident in list(ModelStore._bundles):
+            if len(ModelStore._bundles) <= ModelRegistryConfig.RESIDENT_VERSIONS:
+                break
+            if resident not in (version, current):
+                del ModelStore._bundles[resident]
+
+    @staticmethod
+    def get(version=None):
+        """
+        Get the {'predictor', 'metadata', 'cities', 'version'} bundle of a
+        version, the current one by default, loading it on first use.
+        predictor is the version's FoldedLinearModel; cities maps city_id to
+        {'predictor', 'metadata'} for versions trained per city.
+        """
+        version = version or ModelStore.current_version()
+        if version is None:
+            raise LookupError("No satisfaction model version has been published")
+
+        bundle = ModelStore._bundles.get(version)
+        if bundle is not None:
+            ModelStore._count('hits')
+            return bundle
+
+        # Serialize loads so concurrent requests read a version once
+        with ModelStore._load_lock:
+            bundle = ModelStore._bundles.get(version)
+            if bundle is not None:
+                ModelStore._count('hits')
+                return bundle
+            if not ModelStore.has_version(version):
+                raise LookupError(f"Model version '{version}' not found")
+
+            bundle = {
+                'predictor': FoldedLinearModel.from_dict(ModelStore._read_json(ModelStore.linear_path(version))),
+                'metadata': ModelStore._read_json(ModelStore.metadata_path(version)),
+                'cities': ModelStore._read_cities(version),
+                'version': version,
+                'loaded_at': time.time()
+            }
+            ModelStore._install(version, bundle)
+            ModelStore._count('loads')
+            return bundle
+
+    @staticmethod
+    def estimators(version=None):
+        """Unpickle the fitted {'model', 'scaler', 'metadata', 'cities'} of a version (imports scikit-learn)."""
+        import joblib
+        version = version or ModelStore.current_version()
+        if version is None or not ModelStore.has_version(version):
+            raise LookupError(f"Model version '{version}' not found")
+        return joblib.load(ModelStore.bundle_path(version))
+
+    @staticmethod
+    def _write_json(path, values):
+        def write(tmp_path):
+            with open(tmp_path, 'w') as f:
+                json.dump(values, f, indent=2)
+        ModelStore._write_atomic(path, write)
+
+    @staticmethod
+    def _write_atomic(path, write):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        write(tmp_path)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def activate(version):
+        """Point CURRENT at a published version (also used for rollbacks)."""
+        if not ModelStore.has_version(version):
+            raise LookupError(f"Model version '{version}' not found")
+
+        def write(path):
+            with open(path, 'w') as f:
+                f.write(version)
+        ModelStore._write_atomic(ModelStore.CURRENT_POINTER, write)
+        return ModelStore.current_version()
+
+    @staticmethod
+    def publish(artifacts, activate=True):
+        """
+        Store model, scaler and metadata as a new immutable version and, by
+        default, make it current. An optional 'cities' artifact maps city_id
+        to its own {'model', 'scaler', 'metadata'}. Returns the resident
+        bundle of the version.
+        """
+        import joblib
+        os.makedirs(ModelStore.REGISTRY_DIR, exist_ok=True)
+        version = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')}-{uuid.uuid4().hex[:6]}"
+        cities = artifacts.get('cities') or {}
+        artifacts = dict({name: artifacts[name] for name in ModelStore.ARTIFACTS}, cities=cities)
+        predictor = FoldedLinearModel.fold(
+            artifacts['scaler'], artifacts['model'], artifacts['metadata']['features']
+        )
+        city_bundles = {
+            city_id: {
+                'predictor': FoldedLinearModel.fold(city['scaler'], city['model'], artifacts['metadata']['features']),
+                'metadata': city['metadata']
+            }
+            for city_id, city in cities.items()
+        }
+
+        # 1. Serving files (metadata, folded model), then the joblib bundle,
+        # whose presence marks the version as published; none changes again
+        ModelStore._write_json(ModelStore.metadata_path(version), artifacts['metadata'])
+        ModelStore._write_json(ModelStore.linear_path(version), predictor.to_dict())
+        if city_bundles:
+            ModelStore._write_json(ModelStore.cities_path(version), {
+                city_id: {'predictor': city['predictor'].to_dict(), 'metadata': city['metadata']}
+                for city_id, city in city_bundles.items()
+            })
+        ModelStore._write_atomic(ModelStore.bundle_path(version), lambda path: joblib.dump(artifacts, path))
+        ModelStore._count('published')
+
+        # 2. Swap the pointer and install the bundle in this process
+        bundle = {
+            'predictor': predictor,
+            'metadata': artifacts['metadata'],
+            'cities': city_bundles,
+            'version': version,
+            'loaded_at': time.time()
+        }
+        with ModelStore._load_lock:
+            if activate:
+                ModelStore.activate(version)
+            ModelStore._install(version, bundle)
+
+        ModelStore.prune()
+        return bundle
+
+    @staticmethod
+    def prune():
+        """Delete the oldest versions beyond ModelRegistryConfig.RETAINED_VERSIONS, never the current one."""
+        current = ModelStore.current_version()
+        versions = [entry['version'] for entry in ModelStore.versions()]
+        for version in versions[ModelRegistryConfig.RETAINED_VERSIONS:]:
+            if version == current:
+                continue
+            for path in (
+                ModelStore.bundle_path(version),
+                ModelStore.metadata_path(version),
+                ModelStore.linear_path(version),
+                ModelStore.cities_path(version)
+            ):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    @staticmethod
+    def versions():
+        """Published versions, newest first, with their training metadata."""
+        if not os.path.isdir(ModelStore.REGISTRY_DIR):
+            return []
+        current = ModelStore.current_version()
+        names = sorted(
+            (
+                name[:-len('.joblib')] for name in os.listdir(ModelStore.REGISTRY_DIR)
+                if name.endswith('.joblib') and ModelStore.valid_version(name[:-len('.joblib')])
+            ),
+            reverse=True
+        )
+        versions = []
+        for version in names:
+            try:
+                metadata = ModelStore._read_json(ModelStore.metadata_path(version))
+            except (OSError, ValueError):
+                metadata = None
+            versions.append({
+                "version": version,
+                "current": version == current,
+                "resident": version in ModelStore._bundles,
+                "metadata": metadata
+            })
+        return versions
+
+    @staticmethod
+    def stats():
+        """Return load/swap counters, the current version and the resident versions."""
+        with ModelStore._lock:
+            counters = dict(ModelStore._counters)
+        return {
+            "counters": counters,
+            "registry": ModelStore.REGISTRY_DIR,
+            "current_version": ModelStore.current_version(),
+            "resident_versions": {
+                version: {"loaded_at": bundle['loaded_at']}
+                for version, bundle in list(ModelStore._bundles.items())
+            }
+        }
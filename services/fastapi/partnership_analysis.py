@@ -1,10 +1,9 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import io
-import base64
-import numpy as np
 from config.__init__ import DataPaths
+from services.fastapi.chart_renderer import ChartRenderer
+from services.fastapi.dataset_store import DatasetStore
+from services.fastapi.trips_cube import TripsCube
+from services.fastapi.stage_metrics import StageMetrics
 
 class PartnershipAnalysisService:
     # Constants for partnership scoring
@@ -19,38 +18,30 @@ class PartnershipAnalysisService:
     EVENT_COMMISSION_RATE = 0.12  # 12% commission on event-referred rides
     
     @staticmethod
-    def analyze_partnership_opportunities():
+    def analyze_partnership_opportunities(include_plots=True):
         """
         Analyze potential partnership opportunities with local businesses
         """
         try:
+            stages = StageMetrics.stages()
             # 1. Data Import
-            fact_trips = pd.read_csv(DataPaths.FACT_TRIPS)
-            dim_date = pd.read_csv(DataPaths.DIM_DATE)
-            dim_city = pd.read_csv(DataPaths.DIM_CITY)
-            fact_passenger = pd.read_csv(DataPaths.FACT_PASSENGER_SUMMARY)
+            dim_city = DatasetStore.get(DataPaths.DIM_CITY)
+            fact_passenger = DatasetStore.get(DataPaths.FACT_PASSENGER_SUMMARY)
+            stages.mark('data_import', rows=len(fact_passenger))
 
-            # 2. Basic Analysis Setup
-            trips_analysis = fact_trips.merge(
-                dim_date[['date', 'day_type', 'month_name']], 
-                on='date'
-            )
-            trips_analysis = trips_analysis.merge(
-                dim_city[['city_id', 'city_name']], 
-                on='city_id'
-            )
+            # 2. Basic Analysis Setup: trip volumes by city and day type from the trips cube
+            day_type_volume = TripsCube.rollup(
+                ['city_name', 'day_type'],
+                {'trip_id': 'count'}
+            )['trip_id'].unstack('day_type')
+            stages.mark('basic_analysis_setup')
 
             # 3. Calculate Partnership Metrics
             partnership_metrics = pd.DataFrame()
 
             # 3.1 Weekend vs Weekday Analysis
-            weekend_volume = trips_analysis[
-                trips_analysis['day_type'] == 'Weekend'
-            ].groupby('city_name')['trip_id'].count()
-            
-            weekday_volume = trips_analysis[
-                trips_analysis['day_type'] == 'Weekday'
-            ].groupby('city_name')['trip_id'].count()
+            weekend_volume = day_type_volume['Weekend']
+            weekday_volume = day_type_volume['Weekday']
             
             partnership_metrics['weekend_ratio'] = (
                 weekend_volume / weekday_volume * 100
@@ -71,7 +62,7 @@ class PartnershipAnalysisService:
             ).round(2)
 
             # 3.3 Trip Metrics
-            avg_metrics = trips_analysis.groupby('city_name').agg({
+            avg_metrics = TripsCube.rollup('city_name', {
                 'fare_amount': 'mean',
                 'distance_travelled(km)': 'mean',
                 'passenger_rating': 'mean'
@@ -92,14 +83,17 @@ class PartnershipAnalysisService:
                 'partnership_score', 
                 ascending=False
             )
+            stages.mark('calculate_partnership_metrics')
 
             # 4. Monthly Trend Analysis
-            monthly_trends = trips_analysis.groupby(
-                ['city_name', 'month_name']
-            )['trip_id'].count().unstack()
+            monthly_trends = TripsCube.rollup(
+                ['city_name', 'month_name'],
+                {'trip_id': 'count'}
+            )['trip_id'].unstack()
+            stages.mark('monthly_trend_analysis')
 
             # 5. Revenue Projections
-            city_revenue = trips_analysis.groupby('city_name').agg({
+            city_revenue = TripsCube.rollup('city_name', {
                 'fare_amount': 'sum'
             })
 
@@ -118,74 +112,41 @@ class PartnershipAnalysisService:
                 city_revenue['fare_amount'] * 
                 PartnershipAnalysisService.EVENT_COMMISSION_RATE
             ).round(2)
+            stages.mark('revenue_projections')
 
             # 6. Generate Visualizations
-            plt.style.use('dark_background')
-
-            # 6.1 Partnership Score Plot
-            fig1, ax1 = plt.subplots(figsize=(12, 6), facecolor='#2e2e2e')
-            
-            bars = ax1.bar(
-                partnership_metrics.index,
-                partnership_metrics['partnership_score'],
-                color=plt.cm.RdYlGn(
-                    np.linspace(0.2, 0.8, len(partnership_metrics))
-                )
-            )
-
-            ax1.set_title('Partnership Potential Score by City')
-            ax1.set_xlabel('City')
-            ax1.set_ylabel('Partnership Score')
-            plt.xticks(rotation=45, ha='right')
-
-            # Add value labels
-            for bar in bars:
-                height = bar.get_height()
-                ax1.text(
-                    bar.get_x() + bar.get_width()/2.,
-                    height,
-                    f'{height:.1f}',
-                    ha='center',
-                    va='bottom'
-                )
-
-            plt.tight_layout()
-
-            # Save partnership score plot
-            buf1 = io.BytesIO()
-            fig1.savefig(buf1, format='png', bbox_inches='tight', facecolor='#2e2e2e')
-            buf1.seek(0)
-            score_plot = base64.b64encode(buf1.getvalue()).decode()
-            plt.close(fig1)
-
-            # 6.2 Revenue Projection Plot
-            fig2, ax2 = plt.subplots(figsize=(12, 6), facecolor='#2e2e2e')
-            
-            x = np.arange(len(partnership_metrics.index))
-            width = 0.25
-
-            ax2.bar(x - width, partnership_metrics['hotel_revenue']/1000, 
-                   width, label='Hotel Partnerships')
-            ax2.bar(x, partnership_metrics['mall_revenue']/1000, 
-                   width, label='Mall Partnerships')
-            ax2.bar(x + width, partnership_metrics['event_revenue']/1000, 
-                   width, label='Event Partnerships')
-
-            ax2.set_title('Projected Annual Revenue from Partnerships')
-            ax2.set_xlabel('City')
-            ax2.set_ylabel('Projected Revenue (Thousand USD)')
-            ax2.set_xticks(x)
-            ax2.set_xticklabels(partnership_metrics.index, rotation=45, ha='right')
-            ax2.legend()
-
-            plt.tight_layout()
-
-            # Save revenue projection plot
-            buf2 = io.BytesIO()
-            fig2.savefig(buf2, format='png', bbox_inches='tight', facecolor='#2e2e2e')
-            buf2.seek(0)
-            revenue_plot = base64.b64encode(buf2.getvalue()).decode()
-            plt.close(fig2)
+            if include_plots:
+                plots = ChartRenderer.render_many({
+                    "partnership_scores": {
+                        'kind': 'bar',
+                        'categories': partnership_metrics.index.tolist(),
+                        'values': partnership_metrics['partnership_score'].tolist(),
+                        'colors': {'palette': 'RdYlGn', 'range': (0.2, 0.8)},
+                        'value_labels': '{:.1f}',
+                        'title': 'Partnership Potential Score by City',
+                        'xlabel': 'City',
+                        'ylabel': 'Partnership Score',
+                        'xtick_rotation': 45,
+                        'xtick_ha': 'right'
+                    },
+                    "revenue_projections": {
+                        'kind': 'grouped_bar',
+                        'categories': partnership_metrics.index.tolist(),
+                        'series': [
+                            {'label': 'Hotel Partnerships', 'values': (partnership_metrics['hotel_revenue'] / 1000).tolist()},
+                            {'label': 'Mall Partnerships', 'values': (partnership_metrics['mall_revenue'] / 1000).tolist()},
+                            {'label': 'Event Partnerships', 'values': (partnership_metrics['event_revenue'] / 1000).tolist()}
+                        ],
+                        'width': 0.25,
+                        'title': 'Projected Annual Revenue from Partnerships',
+                        'xlabel': 'City',
+                        'ylabel': 'Projected Revenue (Thousand USD)',
+                        'xtick_rotation': 45,
+                        'xtick_ha': 'right',
+                        'legend': True
+                    }
+                })
+                stages.mark('generate_visualizations', bytes=ChartRenderer.encoded_bytes(plots))
 
             # 7. Prepare Analysis Results
             total_potential_revenue = (
@@ -195,18 +156,6 @@ class PartnershipAnalysisService:
             )
 
             analysis_results = {
-                "visualizations": {
-                    "partnership_scores": {
-                        "plot": score_plot,
-                        "type": "image/png",
-                        "encoding": "base64"
-                    },
-                    "revenue_projections": {
-                        "plot": revenue_plot,
-                        "type": "image/png",
-                        "encoding": "base64"
-                    }
-                },
                 "partnership_metrics": {
                     "city_scores": [
                         {
@@ -272,6 +221,10 @@ class PartnershipAnalysisService:
                 }
             }
 
+            if include_plots:
+                analysis_results["visualizations"] = plots
+
+            stages.mark('prepare_analysis_results')
             return analysis_results
 
         except Exception as e:
@@ -0,0 +1,103 @@
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from config.__init__ import PlotCacheConfig
+from services.fastapi.chart_renderer import ChartRenderer
+from services.fastapi.dataset_store import DatasetStore
+from services.fastapi.disk_cache import DiskCacheTier
+
+class PlotCache:
+    """
+    Content-addressed cache of rendered analysis charts.
+
+    Entries are keyed by a hash of the dataset version, the chart spec version
+    and theme, the analysis name and the plot parameters, so a key never
+    needs invalidating - a data or chart change simply produces new keys.
+    Lookups go through a bounded in-memory LRU tier and then an on-disk tier
+    capped by size (DiskCacheTier); disk hits are promoted back into memory.
+    """
+    _disk = DiskCacheTier(PlotCacheConfig)
+    _memory = OrderedDict()
+    _lock = threading.Lock()
+    _counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0}
+
+    @staticmethod
+    def key(name, params=None):
+        """Cache key (also used as the HTTP ETag) for an analysis' charts."""
+        payload = json.dumps({
+            "data_version": DatasetStore.data_version(),
+            "renderer": ChartRenderer.cache_version(),
+            "analysis": name,
+            "params": params or {}
+        }, sort_keys=True)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    @staticmethod
+    def _count(counter):
+        with PlotCache._lock:
+            PlotCache._counters[counter] += 1
+
+    @staticmethod
+    def _remember(key, plots):
+        with PlotCache._lock:
+            PlotCache._memory[key] = plots
+            PlotCache._memory.move_to_end(key)
+            while len(PlotCache._memory) > PlotCacheConfig.MEMORY_ENTRIES:
+                PlotCache._memory.popitem(last=False)
+
+    @staticmethod
+    def get(key):
+        """Return the cached charts for a key, or None."""
+        if not PlotCacheConfig.ENABLED:
+            return None
+
+        with PlotCache._lock:
+            plots = PlotCache._memory.get(key)
+            if plots is not None:
+                PlotCache._memory.move_to_end(key)
+                PlotCache._counters['memory_hits'] += 1
+                return plots
+
+        data = PlotCache._disk.read(key)
+        try:
+            plots = json.loads(data) if data is not None else None
+        except ValueError:
+            plots = None
+        if plots is None:
+            PlotCache._count('misses')
+            return None
+
+        PlotCache._remember(key, plots)
+        PlotCache._count('disk_hits')
+        return plots
+
+    @staticmethod
+    def put(key, plots):
+        """Store rendered charts in both tiers. Disk failures are not fatal."""
+        if not PlotCacheConfig.ENABLED:
+            return
+        PlotCache._remember(key, plots)
+        PlotCache._count('stores')
+
+        PlotCache._disk.write(key, json.dumps(plots).encode())
+
+    @staticmethod
+    def clear(disk=False):
+        """Empty the memory tier, and the disk tier too when disk=True."""
+        with PlotCache._lock:
+            PlotCache._memory.clear()
+        if disk:
+            PlotCache._disk.clear()
+
+    @staticmethod
+    def stats():
+        """Return hit/miss counters and the size of both tiers."""
+        with PlotCache._lock:
+            stats = {
+                "enabled": PlotCacheConfig.ENABLED,
+                "counters": dict(PlotCache._counters),
+                "memory_entries": len(PlotCache._memory),
+                "memory_capacity": PlotCacheConfig.MEMORY_ENTRIES
+            }
+        return dict(stats, **PlotCache._disk.stats())
@@ -1,29 +1,31 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import io
-import base64
 from config.__init__ import DataPaths
+from services.fastapi.chart_renderer import ChartRenderer
+from services.fastapi.dataset_store import DatasetStore
+from services.fastapi.stage_metrics import StageMetrics
 
 class RepeatPassengerAnalysisService:
     @staticmethod
-    def analyze_passenger_frequency():
+    def analyze_passenger_frequency(include_plots=True):
         """
         Analyze repeat passenger frequency patterns across cities.
         Returns visualizations and detailed frequency metrics.
         """
         try:
+            stages = StageMetrics.stages()
             # 1. Data Import using configured paths
-            repeat_dist = pd.read_csv(DataPaths.DIM_REPEAT_TRIP_DISTRIBUTION)
-            cities_df = pd.read_csv(DataPaths.DIM_CITY)
+            repeat_dist = DatasetStore.get(DataPaths.DIM_REPEAT_TRIP_DISTRIBUTION)
+            cities_df = DatasetStore.get(DataPaths.DIM_CITY)
+            stages.mark('data_import', rows=len(repeat_dist))
 
             # 2. Merge data and prepare
             trip_freq = repeat_dist.merge(cities_df, on='city_id')
             trip_freq['trip_number'] = trip_freq['trip_count'].str.extract(r'(\d+)').astype(int)
             trip_freq = trip_freq.sort_values('trip_number')
+            stages.mark('merge_data_and_prepare')
 
             # 3. Calculate total repeat passengers per city
             city_totals = trip_freq.groupby('city_name')['repeat_passenger_count'].sum().reset_index()
+            stages.mark('calculate_total_repeat_passengers')
 
             # 4. Calculate percentage distribution
             trip_freq_pct = trip_freq.merge(city_totals, on='city_name', suffixes=('', '_total'))
@@ -31,6 +33,7 @@ class RepeatPassengerAnalysisService:
                 trip_freq_pct['repeat_passenger_count'] / 
                 trip_freq_pct['repeat_passenger_count_total'] * 100
             ).round(2)
+            stages.mark('calculate_percentage_distribution')
 
             # 5. Analyze high frequency patterns (5 or more trips)
             high_freq_analysis = trip_freq_pct[trip_freq_pct['trip_number'] >= 5].groupby('city_name').agg({
@@ -41,6 +44,7 @@ class RepeatPassengerAnalysisService:
                     x['repeat_passenger_count'] / x['repeat_passenger_count_total'] * 100
                 ).round(2)
             ).sort_values('high_freq_percentage', ascending=False)
+            stages.mark('analyze_high_frequency_patterns')
 
             # 6. Create frequency distribution table
             freq_dist = trip_freq_pct.pivot_table(
@@ -49,66 +53,38 @@ class RepeatPassengerAnalysisService:
                 values='percentage',
                 aggfunc='mean'
             ).round(2)
+            stages.mark('create_frequency_distribution_table')
 
-            # 7. Generate Heatmap Visualization
-            plt.style.use('dark_background')
-            plt.figure(figsize=(15, 8), facecolor='#2e2e2e')
-            
-            sns.heatmap(
-                freq_dist,
-                annot=True,
-                fmt='.1f',
-                cmap='YlOrRd',
-                cbar_kws={'label': 'Percentage of Repeat Passengers'}
-            )
-            
-            plt.title('Trip Frequency Distribution Patterns by City', 
-                     color='white', pad=20)
-            plt.xlabel('Number of Trips per Month', color='white', labelpad=10)
-            plt.ylabel('City', color='white', labelpad=10)
-            
-            # Customize ticks and colorbar
-            plt.tick_params(colors='white')
-            plt.gcf().axes[-1].tick_params(colors='white')
-            plt.gcf().axes[-1].yaxis.label.set_color('white')
-            
-            plt.tight_layout()
-
-            # Save heatmap to bytes
-            buf1 = io.BytesIO()
-            plt.savefig(buf1, format='png', bbox_inches='tight', facecolor='#2e2e2e')
-            buf1.seek(0)
-            heatmap_base64 = base64.b64encode(buf1.getvalue()).decode()
-            plt.close()
-
-            # 8. Generate Bar Plot for High-Frequency Passengers
-            plt.figure(figsize=(12, 6), facecolor='#2e2e2e')
-            high_freq_analysis['high_freq_percentage'].plot(
-                kind='bar',
-                color='#00FF7F',
-                width=0.8
-            )
-            
-            plt.title('Percentage of High-Frequency Repeat Passengers (5+ trips) by City', 
-                     color='white', pad=20)
-            plt.xlabel('City', color='white', labelpad=10)
-            plt.ylabel('Percentage of Total Repeat Passengers', color='white', labelpad=10)
-            plt.grid(True, alpha=0.2)
-            
-            # Customize ticks
-            plt.xticks(rotation=45, color='white')
-            plt.yticks(color='white')
-            
-            plt.tight_layout()
-
-            # Save bar plot to bytes
-            buf2 = io.BytesIO()
-            plt.savefig(buf2, format='png', bbox_inches='tight', facecolor='#2e2e2e')
-            buf2.seek(0)
-            barplot_base64 = base64.b64encode(buf2.getvalue()).decode()
-            plt.close()
-
-            # 9. Calculate additional statistics
+            # 7. Generate Heatmap and High-Frequency Bar Plot Visualizations
+            if include_plots:
+                plots = ChartRenderer.render_many({
+                    "frequency_heatmap": {
+                        'kind': 'heatmap',
+                        'data': freq_dist.values.tolist(),
+                        'rows': freq_dist.index.tolist(),
+                        'columns': freq_dist.columns.tolist(),
+                        'fmt': '.1f',
+                        'cmap': 'YlOrRd',
+                        'colorbar_label': 'Percentage of Repeat Passengers',
+                        'figsize': (15, 8),
+                        'title': 'Trip Frequency Distribution Patterns by City',
+                        'xlabel': 'Number of Trips per Month',
+                        'ylabel': 'City'
+                    },
+                    "high_frequency_barplot": {
+                        'kind': 'bar',
+                        'categories': high_freq_analysis.index.tolist(),
+                        'values': high_freq_analysis['high_freq_percentage'].tolist(),
+                        'colors': '#00FF7F',
+                        'title': 'Percentage of High-Frequency Repeat Passengers (5+ trips) by City',
+                        'xlabel': 'City',
+                        'ylabel': 'Percentage of Total Repeat Passengers',
+                        'xtick_rotation': 45,
+                        'grid': 0.2
+                    }
+                })
+                stages.mark('generate_visualizations', bytes=ChartRenderer.encoded_bytes(plots))
+            # 8. Calculate additional statistics
             total_stats = {
                 'total_repeat_passengers': int(city_totals['repeat_passenger_count'].sum()),
                 'high_freq_passengers': int(high_freq_analysis['repeat_passenger_count'].sum()),
@@ -117,21 +93,10 @@ class RepeatPassengerAnalysisService:
                      city_totals['repeat_passenger_count'].sum() * 100).round(2)
                 )
             }
+            stages.mark('calculate_additional_statistics')
 
-            # 10. Prepare Analysis Results
+            # 9. Prepare Analysis Results
             analysis_results = {
-                "visualizations": {
-                    "frequency_heatmap": {
-                        "plot": heatmap_base64,
-                        "type": "image/png",
-                        "encoding": "base64"
-                    },
-                    "high_frequency_barplot": {
-                        "plot": barplot_base64,
-                        "type": "image/png",
-                        "encoding": "base64"
-                    }
-                },
                 "frequency_distribution": {
                     city: freq_dist.loc[city].dropna().to_dict()
                     for city in freq_dist.index
@@ -157,6 +122,10 @@ class RepeatPassengerAnalysisService:
                 }
             }
 
+            if include_plots:
+                analysis_results["visualizations"] = plots
+
+            stages.mark('prepare_analysis_results')
             return analysis_results
 
         except Exception as e:
@@ -0,0 +1,129 @@
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from config.__init__ import ResponseCacheConfig
+from services.fastapi.chart_renderer import ChartRenderer
+from services.fastapi.dataset_store import DatasetStore
+from services.fastapi.disk_cache import DiskCacheTier
+
+class ResponseCache:
+    """
+    Cache of serialized analysis responses.
+
+    Keys hash the route, its normalized query parameters, the dataset
+    version (the signatures of every CSV table) and the chart spec version,
+    so any change under csv_files/ or to the embedded charts produces new
+    keys and old entries are never served. The memory tier is an LRU bounded
+    by the total size of the stored bodies; when the dataset version moves
+    on, entries of older versions are dropped from it. The optional disk
+    tier is shared by worker processes and capped by size (DiskCacheTier).
+    """
+    _disk = DiskCacheTier(ResponseCacheConfig)
+    _memory = OrderedDict()
+    _memory_bytes = 0
+    _data_version = None
+    _lock = threading.Lock()
+    _counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+    @staticmethod
+    def key(route, params=None, data_version=None):
+        """Cache key (also used as the HTTP ETag) for a route and its parameters."""
+        payload = json.dumps({
+            "data_version": data_version or DatasetStore.data_version(),
+            "renderer": ChartRenderer.cache_version(),
+            "route": route,
+            "params": params or {}
+        }, sort_keys=True)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    @staticmethod
+    def _drop(key):
+        body = ResponseCache._memory.pop(key)
+        ResponseCache._memory_bytes -= len(body)
+
+    @staticmethod
+    def _remember(key, body, data_version):
+        if len(body) > ResponseCacheConfig.MAX_ENTRY_BYTES:
+            return
+        with ResponseCache._lock:
+            # A new dataset version makes every older entry unreachable
+            if data_version != ResponseCache._data_version:
+                ResponseCache._memory.clear()
+                ResponseCache._memory_bytes = 0
+                ResponseCache._data_version = data_version
+            if key in ResponseCache._memory:
+                ResponseCache._drop(key)
+            ResponseCache._memory[key] = body
+            ResponseCache._memory_bytes += len(body)
+            while ResponseCache._memory_bytes > ResponseCacheConfig.MEMORY_BYTES:
+                ResponseCache._drop(next(iter(ResponseCache._memory)))
+                ResponseCache._counters['evictions'] += 1
+
+    @staticmethod
+    def get(key):
+        """Return the cached response body (bytes) for a key, or None."""
+        if not ResponseCacheConfig.ENABLED:
+            return None
+
+        with ResponseCache._lock:
+            body = ResponseCache._memory.get(key)
+            if body is not None:
+                ResponseCache._memory.move_to_end(key)
+                ResponseCache._counters['memory_hits'] += 1
+                return body
+
+        if ResponseCacheConfig.DISK_ENABLED:
+            body = ResponseCache._disk.read(key)
+            if body is not None:
+                ResponseCache._remember(key, body, DatasetStore.data_version())
+                with ResponseCache._lock:
+                    ResponseCache._counters['disk_hits'] += 1
+                return body
+
+        with ResponseCache._lock:
+            ResponseCache._counters['misses'] += 1
+        return None
+
+    @staticmethod
+    def put(key, body, data_version=None):
+        """
+        Store a response body in both tiers. data_version is the version the
+        key was built with; a body computed while the data changed is not
+        stored. Disk failures are not fatal.
+        """
+        if not ResponseCacheConfig.ENABLED:
+            return
+        current_version = DatasetStore.data_version()
+        if data_version is not None and data_version != current_version:
+            return
+        ResponseCache._remember(key, body, current_version)
+        with ResponseCache._lock:
+            ResponseCache._counters['stores'] += 1
+
+        if ResponseCacheConfig.DISK_ENABLED:
+            ResponseCache._disk.write(key, body)
+
+    @staticmethod
+    def clear(disk=False):
+        """Empty the memory tier, and the disk tier too when disk=True."""
+        with ResponseCache._lock:
+            ResponseCache._memory.clear()
+            ResponseCache._memory_bytes = 0
+        if disk:
+            ResponseCache._disk.clear()
+
+    @staticmethod
+    def stats():
+        """Return hit/miss counters and the occupancy of both tiers."""
+        with ResponseCache._lock:
+            stats = {
+                "enabled": ResponseCacheConfig.ENABLED,
+                "counters": dict(ResponseCache._counters),
+                "data_version": ResponseCache._data_version,
+                "memory_entries": len(ResponseCache._memory),
+                "memory_bytes": ResponseCache._memory_bytes,
+                "memory_capacity_bytes": ResponseCacheConfig.MEMORY_BYTES,
+                "disk_enabled": ResponseCacheConfig.DISK_ENABLED
+            }
+        return dict(stats, **ResponseCache._disk.stats())
@@ -1,40 +1,42 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import io
-import base64
 from config.__init__ import DataPaths
+from services.fastapi.chart_renderer import ChartRenderer
+from services.fastapi.dataset_store import DatasetStore
+from services.fastapi.stage_metrics import StageMetrics
 
 class RPRAnalysisService:
     @staticmethod
-    def analyze_rpr():
+    def analyze_rpr(include_plots=True):
         """
         Analyze Repeat Passenger Rate (RPR%) by city and month.
         Returns visualizations and detailed metrics for both city and monthly analysis.
         """
         try:
+            stages = StageMetrics.stages()
             # 1. Data Import
-            fact_passenger = pd.read_csv(DataPaths.FACT_PASSENGER_SUMMARY)
-            dim_city = pd.read_csv(DataPaths.DIM_CITY)
-            dim_date = pd.read_csv(DataPaths.DIM_DATE)
+            fact_passenger = DatasetStore.get(DataPaths.FACT_PASSENGER_SUMMARY).copy()
+            dim_city = DatasetStore.get(DataPaths.DIM_CITY)
+            dim_date = DatasetStore.get(DataPaths.DIM_DATE)
+            stages.mark('data_import', rows=len(fact_passenger))
 
             # 2. Calculate RPR%
             fact_passenger['RPR%'] = (fact_passenger['repeat_passengers'] / 
                                     fact_passenger['total_passengers'] * 100).round(2)
+            stages.mark('calculate_rpr')
 
             # 3. City-wise Analysis
-            city_rpr = fact_passenger.groupby('city_id')['RPR%'].mean().round(2).reset_index()
+            city_rpr = fact_passenger.groupby('city_id', observed=True)['RPR%'].mean().round(2).reset_index()
             city_rpr = city_rpr.merge(dim_city[['city_id', 'city_name']], on='city_id')
             city_rpr_sorted = city_rpr.sort_values('RPR%', ascending=False)
 
             # Get detailed city metrics including total passengers
-            city_metrics = fact_passenger.groupby('city_id').agg({
+            city_metrics = fact_passenger.groupby('city_id', observed=True).agg({
                 'RPR%': 'mean',
                 'total_passengers': 'sum',
                 'repeat_passengers': 'sum'
             }).round(2).reset_index()
             city_metrics = city_metrics.merge(dim_city[['city_id', 'city_name']], on='city_id')
             city_metrics_sorted = city_metrics.sort_values('RPR%', ascending=False)
+            stages.mark('city_wise_analysis')
 
             # 4. Monthly Analysis
             month_mapping = dim_date[['start_of_month', 'month_name']].drop_duplicates()
@@ -48,67 +50,38 @@ class RPRAnalysisService:
                 'repeat_passengers': 'sum'
             }).round(2).reset_index()
             monthly_rpr_sorted = monthly_rpr.sort_values('RPR%', ascending=False)
+            stages.mark('monthly_analysis')
 
             # 5. Generate Visualizations
-            # City RPR Plot
-            plt.style.use('dark_background')
-            fig1, ax1 = plt.subplots(figsize=(12, 6), facecolor='#2e2e2e')
-            
-            sns.barplot(data=city_rpr_sorted, x='city_name', y='RPR%', 
-                       palette='RdYlGn', ax=ax1)
-            ax1.set_title('Repeat Passenger Rate (RPR%) by City', pad=20)
-            ax1.set_xticklabels(ax1.get_xticklabels(), rotation=45)
-            ax1.set_ylabel('RPR%')
-            ax1.set_xlabel('City')
-
-            for i, v in enumerate(city_rpr_sorted['RPR%']):
-                ax1.text(i, v, f'{v}%', ha='center', va='bottom')
-
-            plt.tight_layout()
-            
-            # Save city plot
-            buf1 = io.BytesIO()
-            fig1.savefig(buf1, format='png', bbox_inches='tight', facecolor='#2e2e2e')
-            buf1.seek(0)
-            city_plot = base64.b64encode(buf1.getvalue()).decode()
-            plt.close(fig1)
-
-            # Monthly RPR Plot
-            fig2, ax2 = plt.subplots(figsize=(12, 6), facecolor='#2e2e2e')
-            
-            sns.barplot(data=monthly_rpr_sorted, x='month_name', y='RPR%', 
-                       palette='RdYlGn', ax=ax2)
-            ax2.set_title('Monthly Repeat Passenger Rate (RPR%)', pad=20)
-            ax2.set_xticklabels(ax2.get_xticklabels(), rotation=45)
-            ax2.set_ylabel('RPR%')
-            ax2.set_xlabel('Month')
-
-            for i, v in enumerate(monthly_rpr_sorted['RPR%']):
-                ax2.text(i, v, f'{v}%', ha='center', va='bottom')
-
-            plt.tight_layout()
-            
-            # Save monthly plot
-            buf2 = io.BytesIO()
-            fig2.savefig(buf2, format='png', bbox_inches='tight', facecolor='#2e2e2e')
-            buf2.seek(0)
-            monthly_plot = base64.b64encode(buf2.getvalue()).decode()
-            plt.close(fig2)
-
-            # 6. Prepare Analysis Results
-            analysis_results = {
-                "visualizations": {
+            if include_plots:
+                plots = ChartRenderer.render_many({
                     "city_rpr": {
-                        "plot": city_plot,
-                        "type": "image/png",
-                        "encoding": "base64"
+                        'kind': 'bar',
+                        'categories': city_rpr_sorted['city_name'].tolist(),
+                        'values': city_rpr_sorted['RPR%'].tolist(),
+                        'colors': {'palette': 'RdYlGn'},
+                        'value_labels': '{}%',
+                        'title': 'Repeat Passenger Rate (RPR%) by City',
+                        'xlabel': 'City',
+                        'ylabel': 'RPR%',
+                        'xtick_rotation': 45
                     },
                     "monthly_rpr": {
-                        "plot": monthly_plot,
-                        "type": "image/png",
-                        "encoding": "base64"
+                        'kind': 'bar',
+                        'categories': monthly_rpr_sorted['month_name'].tolist(),
+                        'values': monthly_rpr_sorted['RPR%'].tolist(),
+                        'colors': {'palette': 'RdYlGn'},
+                        'value_labels': '{}%',
+                        'title': 'Monthly Repeat Passenger Rate (RPR%)',
+                        'xlabel': 'Month',
+                        'ylabel': 'RPR%',
+                        'xtick_rotation': 45
                     }
-                },
+                })
+                stages.mark('generate_visualizations', bytes=ChartRenderer.encoded_bytes(plots))
+
+            # 6. Prepare Analysis Results
+            analysis_results = {
                 "city_analysis": {
                     "top_performers": [
                         {
@@ -170,6 +143,10 @@ class RPRAnalysisService:
                 }
             }
 
+            if include_plots:
+                analysis_results["visualizations"] = plots
+
+            stages.mark('prepare_analysis_results')
             return analysis_results
 
         except Exception as e:
@@ -1,31 +1,32 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import io
-import base64
-import numpy as np
 from config.__init__ import DataPaths
+from services.fastapi.chart_renderer import ChartRenderer
+from services.fastapi.dataset_store import DatasetStore
+from services.fastapi.trips_cube import TripsCube
+from services.fastapi.stage_metrics import StageMetrics
 
 class RPRFactorsAnalysisService:
     @staticmethod
-    def analyze_rpr_factors():
+    def analyze_rpr_factors(include_plots=True):
         """
         Analyze factors influencing Repeat Passenger Rate (RPR%) including
         service quality, pricing, and distance metrics.
         """
         try:
+            stages = StageMetrics.stages()
             # 1. Data Import
-            fact_trips = pd.read_csv(DataPaths.FACT_TRIPS)
-            fact_passenger = pd.read_csv(DataPaths.FACT_PASSENGER_SUMMARY)
-            dim_city = pd.read_csv(DataPaths.DIM_CITY)
+            fact_passenger = DatasetStore.get(DataPaths.FACT_PASSENGER_SUMMARY).copy()
+            dim_city = DatasetStore.get(DataPaths.DIM_CITY)
+            stages.mark('data_import', rows=len(fact_passenger))
 
             # 2. Calculate RPR% for each city
             fact_passenger['RPR%'] = (fact_passenger['repeat_passengers'] / 
                                     fact_passenger['total_passengers'] * 100).round(2)
-            city_rpr = fact_passenger.groupby('city_id')['RPR%'].mean().round(2)
+            city_rpr = fact_passenger.groupby('city_id', observed=True)['RPR%'].mean().round(2)
+            stages.mark('calculate_rpr')
 
             # 3. Calculate city-wise metrics
-            city_metrics = fact_trips.groupby('city_id').agg({
+            city_metrics = TripsCube.rollup('city_id', {
                 'passenger_rating': 'mean',
                 'fare_amount': 'mean',
                 'distance_travelled(km)': 'mean',
@@ -35,6 +36,7 @@ class RPRFactorsAnalysisService:
             # Calculate fare per km
             city_metrics['fare_per_km'] = (city_metrics['fare_amount'] / 
                                          city_metrics['distance_travelled(km)']).round(2)
+            stages.mark('calculate_city_wise_metrics')
 
             # 4. Combine all metrics
             city_analysis = pd.DataFrame({
@@ -49,72 +51,54 @@ class RPRFactorsAnalysisService:
             # Add city names
             city_analysis = city_analysis.merge(dim_city[['city_id', 'city_name']], 
                                               on='city_id')
+            stages.mark('combine_all_metrics')
 
             # 5. Calculate correlations
             correlation_matrix = city_analysis[[
                 'RPR%', 'Avg_Rating', 'Avg_Fare', 'Avg_Distance', 
                 'Fare_per_km', 'Total_Trips'
             ]].corr()
+            stages.mark('calculate_correlations')
 
             # 6. Generate Visualizations
-            plt.style.use('dark_background')
-
-            # Correlation Heatmap
-            fig1, ax1 = plt.subplots(figsize=(10, 8), facecolor='#2e2e2e')
-            sns.heatmap(correlation_matrix,
-                       annot=True,
-                       cmap='RdYlGn',
-                       center=0,
-                       fmt='.2f',
-                       square=True,
-                       ax=ax1)
-            ax1.set_title('Correlation Matrix of Factors Affecting RPR%', pad=20)
-            plt.tight_layout()
-
-            # Save correlation plot
-            buf1 = io.BytesIO()
-            fig1.savefig(buf1, format='png', bbox_inches='tight', facecolor='#2e2e2e')
-            buf1.seek(0)
-            correlation_plot = base64.b64encode(buf1.getvalue()).decode()
-            plt.close(fig1)
-
-            # Scatter plots
-            fig2, axes = plt.subplots(2, 3, figsize=(18, 12), facecolor='#2e2e2e')
-            axes = axes.ravel()
-            factors = ['Avg_Rating', 'Avg_Fare', 'Avg_Distance', 
-                      'Fare_per_km', 'Total_Trips']
-
-            for i, factor in enumerate(factors):
-                sns.scatterplot(data=city_analysis, 
-                              x=factor, 
-                              y='RPR%', 
-                              ax=axes[i], 
-                              color='goldenrod')
-                axes[i].set_title(f'RPR% vs {factor}')
-                
-                # Add trend line
-                z = np.polyfit(city_analysis[factor], city_analysis['RPR%'], 1)
-                p = np.poly1d(z)
-                axes[i].plot(city_analysis[factor], 
-                           p(city_analysis[factor]), 
-                           "r--", 
-                           alpha=0.8)
-                
-                # Add correlation coefficient
-                corr = correlation_matrix.loc['RPR%', factor]
-                axes[i].text(0.05, 0.95, f'Correlation: {corr:.2f}',
-                           transform=axes[i].transAxes,
-                           verticalalignment='top')
-
-            axes[-1].remove()  # Remove the last empty subplot
-            plt.tight_layout()
-
-            # Save scatter plots
-            buf2 = io.BytesIO()
-            fig2.savefig(buf2, format='png', bbox_inches='tight', facecolor='#2e2e2e')
-            buf2.seek(0)
-            scatter_plots = base64.b64encode(buf2.getvalue()).decode()
-            plt.close(fig2)
+            if include_plots:
+                factors = ['Avg_Rating', 'Avg_Fare', 'Avg_Distance',
+                          'Fare_per_km', 'Total_Trips']
+                plots = ChartRenderer.render_many({
+                    "correlation_heatmap": {
+                        'kind': 'heatmap',
+                        'data': correlation_matrix.values.tolist(),
+                        'rows': correlation_matrix.index.tolist(),
+                        'columns': correlation_matrix.columns.tolist(),
+                        'cmap': 'RdYlGn',
+                        'center': 0,
+                        'fmt': '.2f',
+                        'square': True,
+                        'figsize': (10, 8),
+                        'title': 'Correlation Matrix of Factors Affecting RPR%'
+                    },
+                    "factor_scatter_plots": {
+                        'kind': 'panels',
+                        'grid': (2, 3),
+                        'figsize': (18, 12),
+                        'panels': [
+                            {
+                                'kind': 'scatter',
+                                'x': city_analysis[factor].tolist(),
+                                'y': city_analysis['RPR%'].tolist(),
+                                'color': 'goldenrod',
+                                'trend_line': True,
+                                'note': f"Correlation: {correlation_matrix.loc['RPR%', factor]:.2f}",
+                                'title': f'RPR% vs {factor}',
+                                'title_pad': 6,
+                                'xlabel': factor,
+                                'ylabel': 'RPR%'
+                            }
+                            for factor in factors
+                        ]
+                    }
+                })
+                stages.mark('generate_visualizations', bytes=ChartRenderer.encoded_bytes(plots))
 
             # 7. Identify key insights
             correlations = correlation_matrix['RPR%'].sort_values(ascending=False)
@@ -130,21 +114,10 @@ class RPRFactorsAnalysisService:
             city_analysis['Fare_Impact'] = (
                 city_analysis['Fare_per_km'] * correlation_matrix.loc['RPR%', 'Fare_per_km']
             )
+            stages.mark('identify_key_insights')
 
             # 8. Prepare Analysis Results
             analysis_results = {
-                "visualizations": {
-                    "correlation_heatmap": {
-                        "plot": correlation_plot,
-                        "type": "image/png",
-                        "encoding": "base64"
-                    },
-                    "factor_scatter_plots": {
-                        "plot": scatter_plots,
-                        "type": "image/png",
-                        "encoding": "base64"
-                    }
-                },
                 "correlation_analysis": {
                     "strong_positive_factors": [
                         {
@@ -199,6 +172,10 @@ class RPRFactorsAnalysisService:
                 }
             }
 
+            if include_plots:
+                analysis_results["visualizations"] = plots
+
+            stages.mark('prepare_analysis_results')
             return analysis_results
 
         except Exception as e:
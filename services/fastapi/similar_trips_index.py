@@ -0,0 +1,347 @@
+import numpy as np
+from config.__init__ import DataPaths
+from services.fastapi.dataset_store import DatasetStore
+
+class SimilarTripsIndex:
+    """
+    2-D summed-area tables over (distance_travelled(km), fare_amount).
+
+    When there are few enough distinct values, the grid axes are the sorted
+    distinct distances and fares ('exact' layout), so every trip falls in
+    exactly one cell and box queries are exact. Each table holds the running
+    totals of trip count and of the count, sum and sum of squares of the
+    per-trip satisfaction (mean of passenger and driver rating). A box query
+    is two binary searches per axis plus four table lookups.
+
+    With continuous values that grid would be too large, so the axes are
+    binned at a fixed resolution instead ('binned' layout, widened until the
+    grid fits BINNED_CELLS). The tables then cover the cells lying entirely
+    inside the query box. The trips of the partially covered edge cells
+    (at most two rows and two columns of cells) are read from copies of the
+    trips sorted by cell and filtered exactly, so results are the same as
+    in the exact layout. query_many gathers the edge trips of all queries
+    into flat arrays and filters them in one vectorized step per block.
+    """
+    NAME = 'similar_trips_index'
+    SOURCES = [DataPaths.FACT_TRIPS]
+    EXACT = 'exact'
+    BINNED = 'binned'
+    # Largest grid of distinct distances x fares built as an exact layout
+    MAX_CELLS = 4_000_000
+    # Binned layout: starting bin widths (a fraction of the default query
+    # tolerances of 2 km and 50) and the largest number of cells
+    DISTANCE_BIN_WIDTH = 0.25
+    FARE_BIN_WIDTH = 5.0
+    BINNED_CELLS = 1_000_000
+    # Binned query_many: edge-cell trips gathered per block of queries
+    EDGE_BLOCK_TRIPS = 1_000_000
+    TOTALS = ['count', 'valid', 'sum', 'sumsq']
+
+    def __init__(self, distances, fares, tables, rows, cells=None):
+        # distances and fares are the distinct values (exact layout) or the
+        # bin edges (binned layout); cells holds the binned layout's trips
+        self.distances = distances
+        self.fares = fares
+        self.tables = tables
+        self.rows = rows
+        self.cells = cells
+        self.layout = SimilarTripsIndex.BINNED if cells is not None else SimilarTripsIndex.EXACT
+
+    def __len__(self):
+        return self.rows
+
+    def index_stats(self):
+        """Layout, grid shape and bin widths, reported by DatasetStore.stats()."""
+        stats = {
+            "layout": self.layout,
+            "grid_shape": [int(self.tables['count'].shape[0] - 1), int(self.tables['count'].shape[1] - 1)]
+        }
+        if self.layout == SimilarTripsIndex.BINNED:
+            stats["bin_widths"] = {
+                "distance_travelled(km)": float(self.distances[1] - self.distances[0]),
+                "fare_amount": float(self.fares[1] - self.fares[0])
+            }
+        return stats
+
+    @staticmethod
+    def build():
+        trips = DatasetStore.get(DataPaths.FACT_TRIPS)
+        return SimilarTripsIndex.from_chunks(lambda: [trips])
+
+    @staticmethod
+    def _chunk_columns(chunk):
+        chunk = chunk.dropna(subset=['distance_travelled(km)', 'fare_amount'])
+        distance = chunk['distance_travelled(km)'].to_numpy()
+        fare = chunk['fare_amount'].to_numpy()
+        satisfaction = chunk[['passenger_rating', 'driver_rating']].astype('float64').mean(axis=1).to_numpy()
+        return distance, fare, satisfaction
+
+    @staticmethod
+    def from_chunks(chunks):
+        """
+        Build the index in two passes over chunks(), a callable returning an
+        iterable of trip frames: first the grid axes, then the cell totals.
+        Only one chunk is held at a time, so fact_trips can be streamed (the
+        binned layout keeps three columns of every trip).
+        """
+        # 1. Grid axes and row count
+        distance_values, fare_values, rows = [], [], 0
+        for chunk in chunks():
+            distance, fare, _ = SimilarTripsIndex._chunk_columns(chunk)
+            distance_values.append(np.unique(distance))
+            fare_values.append(np.unique(fare))
+            rows += len(distance)
+        distances = np.unique(np.concatenate(distance_values))
+        fares = np.unique(np.concatenate(fare_values))
+        if len(distances) * len(fares) > SimilarTripsIndex.MAX_CELLS:
+            return SimilarTripsIndex.from_chunks_binned(chunks, distances, fares, rows)
+
+        # 2. Per-cell trip count and count, sum and sum of squares of satisfaction
+        shape = (len(distances), len(fares))
+        grids = {name: np.zeros(shape[0] * shape[1]) for name in SimilarTripsIndex.TOTALS}
+        for chunk in chunks():
+            distance, fare, satisfaction = SimilarTripsIndex._chunk_columns(chunk)
+            cells = np.searchsorted(distances, distance) * len(fares) + np.searchsorted(fares, fare)
+            for name, weights in SimilarTripsIndex._weights(satisfaction):
+                grids[name] += np.bincount(cells, weights=weights, minlength=len(grids[name]))
+
+        return SimilarTripsIndex(distances, fares, SimilarTripsIndex._tables(grids, shape), rows)
+
+    @staticmethod
+    def _weights(satisfaction):
+        valid = ~np.isnan(satisfaction)
+        values = np.where(valid, satisfaction, 0.0)
+        return [
+            ('count', None),
+            ('valid', valid.astype('float64')),
+            ('sum', values),
+            ('sumsq', values * values)
+        ]
+
+    @staticmethod
+    def _tables(grids, shape):
+        # Summed-area tables, padded with a leading zero row and column
+        tables = {}
+        for name, grid in grids.items():
+            table = np.zeros((shape[0] + 1, shape[1] + 1))
+            table[1:, 1:] = grid.reshape(shape).cumsum(axis=0).cumsum(axis=1)
+            tables[name] = table
+        return tables
+
+    @staticmethod
+    def _edges(values, width):
+        count = max(int(np.ceil((values[-1] - values[0]) / width)), 1)
+        edges = values[0] + np.arange(count + 1) * width
+        edges[-1] = max(edges[-1], values[-1])
+        return edges
+
+    @staticmethod
+    def _bins(edges, values):
+        # Bin i holds [edges[i], edges[i + 1]); the last bin also holds its upper edge
+        return np.clip(np.searchsorted(edges, values, side='right') - 1, 0, len(edges) - 2)
+
+    @staticmethod
+    def from_chunks_binned(chunks, distances, fares, rows):
+        """Second pass of from_chunks for the binned layout, given the distinct axis values."""
+        # 1. Fixed-width bins, widened evenly until the grid fits
+        scale = 1.0
+        while True:
+            distance_edges = SimilarTripsIndex._edges(distances, SimilarTripsIndex.DISTANCE_BIN_WIDTH * scale)
+            fare_edges = SimilarTripsIndex._edges(fares, SimilarTripsIndex.FARE_BIN_WIDTH * scale)
+            cell_count = (len(distance_edges) - 1) * (len(fare_edges) - 1)
+            if cell_count <= SimilarTripsIndex.BINNED_CELLS:
+                break
+            scale *= max(np.sqrt(cell_count / SimilarTripsIndex.BINNED_CELLS), 1.01)
+        shape = (len(distance_edges) - 1, len(fare_edges) - 1)
+
+        # 2. Cell totals, and every trip's cell and columns
+        grids = {name: np.zeros(shape[0] * shape[1]) for name in SimilarTripsIndex.TOTALS}
+        parts = {'cell': [], 'distance': [], 'fare': [], 'satisfaction': []}
+        for chunk in chunks():
+            distance, fare, satisfaction = SimilarTripsIndex._chunk_columns(chunk)
+            cells = SimilarTripsIndex._bins(distance_edges, distance) * shape[1] + \
+                SimilarTripsIndex._bins(fare_edges, fare)
+            for name, weights in SimilarTripsIndex._weights(satisfaction):
+                grids[name] += np.bincount(cells, weights=weights, minlength=len(grids[name]))
+            for name, values in (('cell', cells), ('distance', distance), ('fare', fare), ('satisfaction', satisfaction)):
+                parts[name].append(values)
+
+        # 3. Trips sorted by row-major cell, and their order by column-major cell,
+        # with the offset of each cell's first trip in both orders
+        cell = np.concatenate(parts['cell'])
+        row_order = np.argsort(cell, kind='stable')
+        row_cell = cell[row_order]
+        column_cell = (row_cell % shape[1]) * shape[0] + row_cell // shape[1]
+        column_order = np.argsort(column_cell, kind='stable')
+        cell_range = np.arange(shape[0] * shape[1] + 1)
+        cells = {
+            name: np.concatenate(parts[name])[row_order].astype('float64')
+            for name in ('distance', 'fare', 'satisfaction')
+        }
+        cells.update(
+            row_offsets=np.searchsorted(row_cell, cell_range),
+            column_order=column_order,
+            column_offsets=np.searchsorted(column_cell[column_order], cell_range)
+        )
+
+        tables = SimilarTripsIndex._tables(grids, shape)
+        return SimilarTripsIndex(distance_edges, fare_edges, tables, rows, cells)
+
+    @staticmethod
+    def get():
+        """Get the shared index, rebuilding it if fact_trips changed."""
+        return DatasetStore.derived(
+            SimilarTripsIndex.NAME, SimilarTripsIndex.SOURCES, SimilarTripsIndex.build
+        )
+
+    @staticmethod
+    def summarize(ratings):
+        """Count, mean and population std of per-trip satisfaction for a frame of trips."""
+        satisfaction = ratings[['passenger_rating', 'driver_rating']].astype('float64').mean(axis=1).dropna()
+        if satisfaction.empty:
+            return {'count': int(len(ratings)), 'mean': None, 'std': None}
+        return {
+            'count': int(len(ratings)),
+            'mean': float(satisfaction.mean()),
+            'std': float(satisfaction.std(ddof=0))
+        }
+
+    @staticmethod
+    def _cover(edges, low, high):
+        """
+        Per query, the bins of one axis that intersect [low, high] (first,
+        last) and that lie entirely inside it (first, last; empty when
+        first > last).
+        """
+        last_bin = len(edges) - 2
+        first = np.clip(np.searchsorted(edges, low, side='right') - 1, 0, last_bin)
+        last = np.clip(np.searchsorted(edges, high, side='right') - 1, 0, last_bin)
+        inside_first = np.searchsorted(edges, low, side='left')
+        inside_last = np.minimum(np.searchsorted(edges, high, side='right') - 2, last_bin)
+        return first, last, inside_first, inside_last
+
+    @staticmethod
+    def _expand(starts, ends):
+        """Query number and position of every element of the ranges [starts[q], ends[q])."""
+        lengths = ends - starts
+        queries = np.repeat(np.arange(len(starts)), lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return queries, np.repeat(starts, lengths) + offsets
+
+    def _binned_totals(self, distances, fares, distance_tolerance, fare_tolerance):
+        """
+        Totals of the trips in each query box: inside cells from the tables,
+        edge cells filtered exactly. Returns a dict of arrays, one value per query.
+        """
+        d_low, d_high = distances - distance_tolerance, distances + distance_tolerance
+        f_low, f_high = fares - fare_tolerance, fares + fare_tolerance
+        d_first, d_last, d_in_first, d_in_last = SimilarTripsIndex._cover(self.distances, d_low, d_high)
+        f_first, f_last, f_in_first, f_in_last = SimilarTripsIndex._cover(self.fares, f_low, f_high)
+        rows_inside = d_in_first <= d_in_last
+        columns_inside = f_in_first <= f_in_last
+
+        # 1. Cells entirely inside the box (an empty box reads the zero corner)
+        inside = rows_inside & columns_inside
+        r0, r1 = np.where(inside, d_in_first, 0), np.where(inside, d_in_last + 1, 0)
+        c0, c1 = np.where(inside, f_in_first, 0), np.where(inside, f_in_last + 1, 0)
+        totals = {
+            name: table[r1, c1] - table[r0, c1] - table[r1, c0] + table[r0, c0]
+            for name, table in self.tables.items()
+        }
+
+        # 2. Ranges of edge trips per query: the edge rows across all
+        # intersecting columns (row-major positions), then the edge columns
+        # across the inside rows (column-major positions)
+        cells = self.cells
+        width, height = len(self.fares) - 1, len(self.distances) - 1
+        ranges = []
+        for row, other in ((d_first, None), (d_last, d_first)):
+            use = ~(rows_inside & (d_in_first <= row) & (row <= d_in_last))
+            if other is not None:
+                use &= row != other
+            ranges.append((False, np.where(use, cells['row_offsets'][row * width + f_first], 0),
+                           np.where(use, cells['row_offsets'][row * width + f_last + 1], 0)))
+        for column, other in ((f_first, None), (f_last, f_first)):
+            use = rows_inside & ~(columns_inside & (f_in_first <= column) & (column <= f_in_last))
+            if other is not None:
+                use &= column != other
+            ranges.append((True, np.where(use, cells['column_offsets'][column * height + np.minimum(d_in_first, height)], 0),
+                           np.where(use, cells['column_offsets'][column * height + np.maximum(d_in_last + 1, 0)], 0)))
+
+        # 3. Filter the edge trips exactly, a block of queries at a time so
+        # the gathered arrays stay around EDGE_BLOCK_TRIPS elements
+        per_query = sum(ends - starts for _, starts, ends in ranges)
+        blocks = np.cumsum(per_query) // SimilarTripsIndex.EDGE_BLOCK_TRIPS
+        bounds = np.flatnonzero(np.diff(blocks)) + 1
+        for block_start, block_end in zip(np.r_[0, bounds], np.r_[bounds, len(distances)]):
+            block = slice(block_start, block_end)
+            queries, positions = [], []
+            for column_major, starts, ends in ranges:
+                block_queries, block_positions = SimilarTripsIndex._expand(starts[block], ends[block])
+                queries.append(block_queries)
+                positions.append(cells['column_order'][block_positions] if column_major else block_positions)
+            queries, positions = np.concatenate(queries), np.concatenate(positions)
+            trip_distance, trip_fare = cells['distance'][positions], cells['fare'][positions]
+            query = queries + block_start
+            matched = (
+                (trip_distance >= d_low[query]) & (trip_distance <= d_high[query]) &
+                (trip_fare >= f_low[query]) & (trip_fare <= f_high[query])
+            )
+            queries = queries[matched]
+            for name, weights in SimilarTripsIndex._weights(cells['satisfaction'][positions[matched]]):
+                totals[name][block] += np.bincount(queries, weights=weights, minlength=block_end - block_start)
+        return totals
+
+    def query(self, distance, fare, distance_tolerance=2, fare_tolerance=50):
+        """
+        Summarize the trips with |distance - d| <= distance_tolerance and
+        |fare - f| <= fare_tolerance: trip count, plus mean and population std
+        of the per-trip satisfaction.
+        """
+        if self.layout == SimilarTripsIndex.BINNED:
+            count, mean, std = self.query_many([distance], [fare], distance_tolerance, fare_tolerance)
+            if np.isnan(mean[0]):
+                return {'count': int(count[0]), 'mean': None, 'std': None}
+            return {'count': int(count[0]), 'mean': float(mean[0]), 'std': float(std[0])}
+
+        d_lo = np.searchsorted(self.distances, distance - distance_tolerance, side='left')
+        d_hi = np.searchsorted(self.distances, distance + distance_tolerance, side='right')
+        f_lo = np.searchsorted(self.fares, fare - fare_tolerance, side='left')
+        f_hi = np.searchsorted(self.fares, fare + fare_tolerance, side='right')
+        totals = {
+            name: table[d_hi, f_hi] - table[d_lo, f_hi] - table[d_hi, f_lo] + table[d_lo, f_lo]
+            for name, table in self.tables.items()
+        }
+        count = int(round(totals['count']))
+        valid = int(round(totals['valid']))
+        if valid == 0:
+            return {'count': count, 'mean': None, 'std': None}
+
+        mean = totals['sum'] / valid
+        variance = max(totals['sumsq'] / valid - mean * mean, 0.0)
+        return {'count': count, 'mean': float(mean), 'std': float(np.sqrt(variance))}
+
+    def query_many(self, distances, fares, distance_tolerance=2, fare_tolerance=50):
+        """
+        Vectorized query(): arrays of trip count, mean and std for each
+        (distance, fare) pair. Mean and std are NaN where no rated trip matches.
+        """
+        distances = np.asarray(distances, dtype='float64')
+        fares = np.asarray(fares, dtype='float64')
+        if self.layout == SimilarTripsIndex.BINNED:
+            totals = self._binned_totals(distances, fares, distance_tolerance, fare_tolerance)
+        else:
+            d_lo = np.searchsorted(self.distances, distances - distance_tolerance, side='left')
+            d_hi = np.searchsorted(self.distances, distances + distance_tolerance, side='right')
+            f_lo = np.searchsorted(self.fares, fares - fare_tolerance, side='left')
+            f_hi = np.searchsorted(self.fares, fares + fare_tolerance, side='right')
+            totals = {
+                name: table[d_hi, f_hi] - table[d_lo, f_hi] - table[d_hi, f_lo] + table[d_lo, f_lo]
+                for name, table in self.tables.items()
+            }
+        count = np.rint(totals['count']).astype('int64')
+        valid = np.rint(totals['valid'])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(valid > 0, totals['sum'] / valid, np.nan)
+            variance = np.maximum(totals['sumsq'] / valid - mean * mean, 0.0)
+        return count, mean, np.where(valid > 0, np.sqrt(variance), np.nan)
@@ -0,0 +1,125 @@
+import bisect
+import contextvars
+import threading
+import time
+from config.__init__ import MetricsConfig
+
+class StageTimer:
+    """
+    Times the consecutive stages of one service call: each mark() records
+    the time since the previous mark (or since the timer was created) under
+    the stage's name, with optional rows processed and bytes produced.
+    """
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.last = time.perf_counter()
+
+    def mark(self, stage, rows=None, bytes=None):
+        now = time.perf_counter()
+        StageMetrics.observe(self.endpoint, stage, now - self.last, rows, bytes)
+        self.last = now
+
+class DisabledStageTimer:
+    def mark(self, stage, rows=None, bytes=None):
+        pass
+
+class StageMetrics:
+    """
+    Per endpoint and stage latency histograms, rows and bytes counters,
+    exported in the Prometheus text format.
+
+    Services create a timer with StageMetrics.stages() and mark the end of
+    each numbered stage. The endpoint is the one the execution layer is
+    running the call for (see call()); calls made outside it are recorded
+    under 'none'. When MetricsConfig.ENABLED is False, stages() returns a
+    timer whose marks do nothing.
+    """
+    ENDPOINT = contextvars.ContextVar('stage_metrics_endpoint', default='none')
+    _DISABLED = DisabledStageTimer()
+    _series = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def stages():
+        """Timer for the stages of the current service call."""
+        if not MetricsConfig.ENABLED:
+            return StageMetrics._DISABLED
+        return StageTimer(StageMetrics.ENDPOINT.get())
+
+    @staticmethod
+    def call(endpoint, func, *args, **kwargs):
+        """Run func(*args, **kwargs) with its stages attributed to endpoint."""
+        token = StageMetrics.ENDPOINT.set(endpoint)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            StageMetrics.ENDPOINT.reset(token)
+
+    @staticmethod
+    def observe(endpoint, stage, seconds, rows=None, bytes=None):
+        """Record one stage duration, and the rows and bytes it handled."""
+        if not MetricsConfig.ENABLED:
+            return
+        bucket = bisect.bisect_left(MetricsConfig.LATENCY_BUCKETS, seconds)
+        with StageMetrics._lock:
+            series = StageMetrics._series.get((endpoint, stage))
+            if series is None:
+                series = StageMetrics._series[(endpoint, stage)] = {
+                    'buckets': [0] * (len(MetricsConfig.LATENCY_BUCKETS) + 1),
+                    'count': 0,
+                    'sum': 0.0,
+                    'rows': 0,
+                    'bytes': 0
+                }
+            series['buckets'][bucket] += 1
+            series['count'] += 1
+            series['sum'] += seconds
+            series['rows'] += rows or 0
+            series['bytes'] += bytes or 0
+
+    @staticmethod
+    def _labels(endpoint, stage, **extra):
+        labels = dict(endpoint=endpoint, stage=stage, **extra)
+        escaped = []
+        for name, value in labels.items():
+            value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            escaped.append(f'{name}="{value}"')
+        return "{" + ",".join(escaped) + "}"
+
+    @staticmethod
+    def render():
+        """All series in the Prometheus text exposition format (version 0.0.4)."""
+        with StageMetrics._lock:
+            series = {key: dict(values, buckets=list(values['buckets']))
+                      for key, values in sorted(StageMetrics._series.items())}
+
+        prefix = MetricsConfig.PREFIX
+        duration = f"{prefix}_stage_duration_seconds"
+        lines = [
+            f"# HELP {duration} Time spent in each stage of an endpoint's service call.",
+            f"# TYPE {duration} histogram"
+        ]
+        for (endpoint, stage), values in series.items():
+            cumulative = 0
+            for bound, count in zip(MetricsConfig.LATENCY_BUCKETS, values['buckets']):
+                cumulative += count
+                lines.append(f"{duration}_bucket{StageMetrics._labels(endpoint, stage, le=repr(float(bound)))} {cumulative}")
+            lines.append(f"{duration}_bucket{StageMetrics._labels(endpoint, stage, le='+Inf')} {values['count']}")
+            lines.append(f"{duration}_sum{StageMetrics._labels(endpoint, stage)} {values['sum']!r}")
+            lines.append(f"{duration}_count{StageMetrics._labels(endpoint, stage)} {values['count']}")
+
+        for name, field, description in (
+            ('stage_rows_total', 'rows', 'Rows processed by each stage.'),
+            ('stage_bytes_total', 'bytes', 'Bytes produced by each stage.')
+        ):
+            lines.append(f"# HELP {prefix}_{name} {description}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for (endpoint, stage), values in series.items():
+                lines.append(f"{prefix}_{name}{StageMetrics._labels(endpoint, stage)} {values[field]}")
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def reset():
+        with StageMetrics._lock:
+            StageMetrics._series.clear()
@@ -0,0 +1,73 @@
+import numpy as np
+
+class MomentAccumulator:
+    """
+    Running count, column means and centered co-moment matrix
+    (sum of (v - mean)(v - mean)^T) of a stream of row blocks.
+
+    Blocks are merged with the pairwise update of Chan et al., which stays
+    accurate where raw sums of squares would cancel. These are sufficient
+    statistics for ordinary least squares: a linear fit over the columns is
+    solved from them without revisiting the data. The squared error of a fit
+    is not taken from them: expanded from the moments, its terms cancel when
+    the fit is close to exact, so callers sum the residuals over the rows
+    and pass the total to r2().
+    """
+    def __init__(self, width):
+        self.n = 0
+        self.mean = np.zeros(width)
+        self.comoment = np.zeros((width, width))
+
+    def update(self, values):
+        """Add a 2-D block of rows."""
+        values = np.asarray(values, dtype='float64')
+        if len(values) == 0:
+            return self
+        block = MomentAccumulator(values.shape[1])
+        block.n = len(values)
+        block.mean = values.mean(axis=0)
+        centered = values - block.mean
+        block.comoment = centered.T @ centered
+        return self.merge(block)
+
+    def merge(self, other):
+        """Fold another accumulator over the same columns into this one."""
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.n, self.mean, self.comoment = other.n, other.mean.copy(), other.comoment.copy()
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.comoment = self.comoment + other.comoment + np.outer(delta, delta) * (self.n * other.n / n)
+        self.mean = self.mean + delta * (other.n / n)
+        self.n = n
+        return self
+
+    @staticmethod
+    def combine(accumulators):
+        """New accumulator holding the rows of all the given ones."""
+        accumulators = list(accumulators)
+        combined = MomentAccumulator(len(accumulators[0].mean))
+        for accumulator in accumulators:
+            combined.merge(accumulator)
+        return combined
+
+    def variance(self, ddof=0):
+        return np.diag(self.comoment) / (self.n - ddof)
+
+    def fit(self, x_columns, y_column):
+        """Least-squares coef and intercept of column y_column on x_columns."""
+        cxx = self.comoment[np.ix_(x_columns, x_columns)]
+        cxy = self.comoment[x_columns, y_column]
+        coef = np.linalg.lstsq(cxx, cxy, rcond=None)[0]
+        intercept = self.mean[y_column] - self.mean[x_columns] @ coef
+        return coef, float(intercept)
+
+    def r2(self, squared_error, y_column):
+        """Coefficient of determination of a fit with the given squared error on these rows."""
+        total = self.comoment[y_column, y_column]
+        if total == 0:
+            # Same convention as sklearn's r2_score for a constant target
+            return 1.0 if squared_error == 0 else 0.0
+        return 1 - squared_error / total
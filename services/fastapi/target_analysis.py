@@ -1,9 +1,8 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import io
-import base64
 from config.__init__ import DataPaths
+from services.fastapi.chart_renderer import ChartRenderer
+from services.fastapi.dataset_store import DatasetStore
+from services.fastapi.stage_metrics import StageMetrics
 
 class TargetAnalysisService:
     @staticmethod
@@ -19,31 +18,34 @@ class TargetAnalysisService:
         return diff, status
 
     @staticmethod
-    def analyze_target_achievement():
+    def analyze_target_achievement(include_plots=True):
         """
         Analyze monthly target achievement for key metrics across cities.
         Returns visualization and detailed performance metrics.
         """
         try:
+            stages = StageMetrics.stages()
             # 1. Data Import using configured paths
-            fact_trips = pd.read_csv(DataPaths.FACT_TRIPS)
-            fact_passenger = pd.read_csv(DataPaths.FACT_PASSENGER_SUMMARY)
-            cities_df = pd.read_csv(DataPaths.DIM_CITY)
-            dates_df = pd.read_csv(DataPaths.DIM_DATE)
-            target_trips = pd.read_csv(DataPaths.MONTHLY_TARGET_TRIPS)
-            target_passengers = pd.read_csv(DataPaths.MONTHLY_TARGET_NEW_PASSENGERS)
-            target_ratings = pd.read_csv(DataPaths.CITY_TARGET_PASSENGER_RATING)
+            fact_trips = DatasetStore.get(DataPaths.FACT_TRIPS)
+            fact_passenger = DatasetStore.get(DataPaths.FACT_PASSENGER_SUMMARY)
+            cities_df = DatasetStore.get(DataPaths.DIM_CITY)
+            dates_df = DatasetStore.get(DataPaths.DIM_DATE)
+            target_trips = DatasetStore.get(DataPaths.MONTHLY_TARGET_TRIPS)
+            target_passengers = DatasetStore.get(DataPaths.MONTHLY_TARGET_NEW_PASSENGERS)
+            target_ratings = DatasetStore.get(DataPaths.CITY_TARGET_PASSENGER_RATING)
+            stages.mark('data_import', rows=len(fact_trips))
 
             # 2. Calculate actual metrics
             # Monthly trips by city
-            actual_trips = fact_trips.groupby(['city_id', 'date'])['trip_id'].count().reset_index()
+            actual_trips = fact_trips.groupby(['city_id', 'date'], observed=True)['trip_id'].count().reset_index()
             actual_trips = actual_trips.merge(dates_df[['date', 'start_of_month']], on='date')
-            monthly_trips = actual_trips.groupby(['city_id', 'start_of_month'])['trip_id'].sum().reset_index()
+            monthly_trips = actual_trips.groupby(['city_id', 'start_of_month'], observed=True)['trip_id'].sum().reset_index()
 
             # Monthly ratings by city
-            monthly_ratings = fact_trips.groupby(['city_id', 'date'])['passenger_rating'].mean().reset_index()
+            monthly_ratings = fact_trips.groupby(['city_id', 'date'], observed=True)['passenger_rating'].mean().astype('float64').reset_index()
             monthly_ratings = monthly_ratings.merge(dates_df[['date', 'start_of_month']], on='date')
-            monthly_ratings = monthly_ratings.groupby(['city_id', 'start_of_month'])['passenger_rating'].mean().round(2).reset_index()
+            monthly_ratings = monthly_ratings.groupby(['city_id', 'start_of_month'], observed=True)['passenger_rating'].mean().round(2).reset_index()
+            stages.mark('calculate_actual_metrics')
 
             # 3. Compare with targets
             performance_data = []
@@ -90,6 +92,7 @@ class TargetAnalysisService:
                         'status': rating_status
                     }
                 })
+            stages.mark('compare_with_targets')
 
             # 4. Create performance DataFrame for visualization
             performance_df = pd.DataFrame(performance_data)
@@ -99,36 +102,26 @@ class TargetAnalysisService:
                 'NewPass': [item['new_passengers']['difference_percentage'] for item in performance_data],
                 'Rating': [item['rating']['difference_percentage'] for item in performance_data]
             })
+            stages.mark('create_performance_dataframe')
 
             # 5. Generate Heatmap Visualization
-            plt.style.use('dark_background')
-            plt.figure(figsize=(15, 8), facecolor='#2e2e2e')
-            
-            sns.heatmap(
-                achievement_data.set_index('City')[['Trips', 'NewPass', 'Rating']],
-                cmap='RdYlGn',
-                center=0,
-                annot=True,
-                fmt='.1f',
-                cbar_kws={'label': 'Percentage Difference from Target'}
-            )
-            
-            plt.title('Target Achievement by City and Metric (%)', 
-                     color='white', pad=20)
-            
-            # Customize ticks and colorbar
-            plt.tick_params(colors='white')
-            plt.gcf().axes[-1].tick_params(colors='white')
-            plt.gcf().axes[-1].yaxis.label.set_color('white')
-            
-            plt.tight_layout()
-
-            # Save plot to bytes
-            buf = io.BytesIO()
-            plt.savefig(buf, format='png', bbox_inches='tight', facecolor='#2e2e2e')
-            buf.seek(0)
-            plot_base64 = base64.b64encode(buf.getvalue()).decode()
-            plt.close()
+            if include_plots:
+                heatmap_data = achievement_data.set_index('City')[['Trips', 'NewPass', 'Rating']]
+                plots = ChartRenderer.render_many({
+                    "visualization": {
+                        'kind': 'heatmap',
+                        'data': heatmap_data.values.tolist(),
+                        'rows': heatmap_data.index.tolist(),
+                        'columns': heatmap_data.columns.tolist(),
+                        'cmap': 'RdYlGn',
+                        'center': 0,
+                        'fmt': '.1f',
+                        'colorbar_label': 'Percentage Difference from Target',
+                        'figsize': (15, 8),
+                        'title': 'Target Achievement by City and Metric (%)'
+                    }
+                })
+                stages.mark('generate_visualizations', bytes=ChartRenderer.encoded_bytes(plots))
 
             # 6. Calculate overall statistics
             overall_stats = {
@@ -148,14 +141,10 @@ class TargetAnalysisService:
                     'cities_missed': sum(1 for item in performance_data if item['rating']['status'] == 'Missed')
                 }
             }
+            stages.mark('calculate_overall_statistics')
 
             # 7. Prepare Analysis Results
             analysis_results = {
-                "visualization": {
-                    "plot": plot_base64,
-                    "type": "image/png",
-                    "encoding": "base64"
-                },
                 "city_performance": performance_data,
                 "overall_statistics": overall_stats,
                 "top_performers": {
@@ -170,6 +159,10 @@ class TargetAnalysisService:
                 }
             }
 
+            if include_plots:
+                analysis_results["visualization"] = plots["visualization"]
+
+            stages.mark('prepare_analysis_results')
             return analysis_results
 
         except Exception as e:
@@ -1,48 +1,44 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import io
-import base64
-import numpy as np
 from datetime import datetime
 from config.__init__ import DataPaths
+from services.fastapi.chart_renderer import ChartRenderer
+from services.fastapi.dataset_store import DatasetStore
+from services.fastapi.trips_cube import TripsCube
+from services.fastapi.stage_metrics import StageMetrics
 
 class TourismBusinessAnalysisService:
     @staticmethod
-    def analyze_tourism_business_patterns():
+    def analyze_tourism_business_patterns(include_plots=True):
         """
         Analyze tourism vs. business demand patterns across cities,
         including weekend/weekday ratios and seasonal patterns.
         """
         try:
+            stages = StageMetrics.stages()
             # 1. Data Import
-            fact_trips = pd.read_csv(DataPaths.FACT_TRIPS)
-            dim_date = pd.read_csv(DataPaths.DIM_DATE)
-            dim_city = pd.read_csv(DataPaths.DIM_CITY)
-            fact_passenger = pd.read_csv(DataPaths.FACT_PASSENGER_SUMMARY)
+            dim_city = DatasetStore.get(DataPaths.DIM_CITY)
+            fact_passenger = DatasetStore.get(DataPaths.FACT_PASSENGER_SUMMARY)
+            stages.mark('data_import', rows=len(fact_passenger))
 
-            # Add month number to dim_date
-            dim_date['month_number'] = pd.to_datetime(dim_date['date']).dt.month
-
-            # 2. Merge data for analysis
-            trips_analysis = fact_trips.merge(
-                dim_date[['date', 'month_name', 'day_type', 'month_number']], 
-                on='date'
-            )
-            trips_analysis = trips_analysis.merge(
-                dim_city[['city_id', 'city_name']], 
-                on='city_id'
-            )
+            # 2. Passenger mix by city and day type from the trips cube
+            passenger_mix = TripsCube.rollup(
+                ['city_name', 'day_type', 'passenger_type'],
+                {'trip_id': 'count'}
+            )['trip_id'].unstack('passenger_type', fill_value=0)
+            stages.mark('passenger_mix')
 
             # 3. Day Type Analysis
-            day_type_analysis = trips_analysis.groupby(
-                ['city_name', 'day_type']
-            ).agg({
+            day_type_analysis = TripsCube.rollup(['city_name', 'day_type'], {
                 'trip_id': 'count',
-                'passenger_type': lambda x: (x == 'new').mean() * 100,
                 'fare_amount': 'mean',
                 'distance_travelled(km)': 'mean'
-            }).round(2).reset_index()
+            })
+            day_type_analysis.insert(
+                1,
+                'passenger_type',
+                passenger_mix.get('new', 0) / passenger_mix.sum(axis=1) * 100
+            )
+            day_type_analysis = day_type_analysis.round(2).reset_index()
 
             # Calculate weekend to weekday ratios
             weekend_weekday = day_type_analysis.pivot(
@@ -74,6 +70,7 @@ class TourismBusinessAnalysisService:
                 weekend_weekday['distance_travelled(km)_weekend'] / 
                 weekend_weekday['distance_travelled(km)_weekday']
             ).round(2)
+            stages.mark('day_type_analysis')
 
             # 4. Monthly Pattern Analysis
             monthly_analysis = fact_passenger.merge(
@@ -108,70 +105,44 @@ class TourismBusinessAnalysisService:
                 if month not in monthly_patterns.columns:
                     monthly_patterns[month] = 0
             monthly_patterns = monthly_patterns.reindex(sorted(monthly_patterns.columns), axis=1)
+            stages.mark('monthly_pattern_analysis')
 
             # 5. Generate Visualizations
-            plt.style.use('dark_background')
-
-            # Weekend/Weekday Ratio Plot
-            fig1, ax1 = plt.subplots(figsize=(12, 6), facecolor='#2e2e2e')
-            ratio_data = weekend_weekday.sort_values('trip_ratio', ascending=False)
-            
-            bars = ax1.bar(ratio_data['city_name'], ratio_data['trip_ratio'])
-            ax1.axhline(y=1, color='r', linestyle='--', alpha=0.5)
-
-            # Color bars based on tourism indication
-            for bar in bars:
-                if bar.get_height() > 1:
-                    bar.set_color('green')
-                else:
-                    bar.set_color('red')
-
-            ax1.set_title('Weekend to Weekday Trip Ratio by City\n' +
-                         '(Green: Tourism-Heavy, Red: Business-Heavy)', 
-                         pad=20)
-            ax1.set_xlabel('City')
-            ax1.set_ylabel('Weekend/Weekday Ratio')
-            plt.xticks(rotation=45, ha='right')
-
-            # Add value labels
-            for i, v in enumerate(ratio_data['trip_ratio']):
-                ax1.text(i, v, f'{v:.2f}', ha='center', va='bottom')
-
-            plt.tight_layout()
-
-            # Save ratio plot
-            buf1 = io.BytesIO()
-            fig1.savefig(buf1, format='png', bbox_inches='tight', facecolor='#2e2e2e')
-            buf1.seek(0)
-            ratio_plot = base64.b64encode(buf1.getvalue()).decode()
-            plt.close(fig1)
-
-            # Monthly Pattern Heatmap
-            fig2, ax2 = plt.subplots(figsize=(15, 8), facecolor='#2e2e2e')
-            
-            sns.heatmap(monthly_patterns,
-                       cmap='RdYlGn',
-                       center=monthly_patterns.mean().mean(),
-                       annot=True,
-                       fmt='.1f',
-                       ax=ax2)
-            
-            ax2.set_title('Monthly New Passenger Patterns by City\n' +
-                         '(Higher values indicate potential tourist seasons)',
-                         pad=20)
-            # Set month names for x-axis
-            month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-                         'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-            ax2.set_xticklabels(month_names, rotation=45)
-            
-            plt.tight_layout()
-
-            # Save heatmap
-            buf2 = io.BytesIO()
-            fig2.savefig(buf2, format='png', bbox_inches='tight', facecolor='#2e2e2e')
-            buf2.seek(0)
-            heatmap_plot = base64.b64encode(buf2.getvalue()).decode()
-            plt.close(fig2)
+            if include_plots:
+                ratio_data = weekend_weekday.sort_values('trip_ratio', ascending=False)
+                plots = ChartRenderer.render_many({
+                    "weekend_weekday_ratio": {
+                        'kind': 'bar',
+                        'categories': ratio_data['city_name'].tolist(),
+                        'values': ratio_data['trip_ratio'].tolist(),
+                        # Green: tourism-heavy, red: business-heavy
+                        'colors': ['green' if ratio > 1 else 'red' for ratio in ratio_data['trip_ratio']],
+                        'value_labels': '{:.2f}',
+                        'reference_line': {'y': 1, 'color': 'r', 'linestyle': '--', 'alpha': 0.5},
+                        'title': 'Weekend to Weekday Trip Ratio by City\n' +
+                                 '(Green: Tourism-Heavy, Red: Business-Heavy)',
+                        'xlabel': 'City',
+                        'ylabel': 'Weekend/Weekday Ratio',
+                        'xtick_rotation': 45,
+                        'xtick_ha': 'right'
+                    },
+                    "monthly_patterns": {
+                        'kind': 'heatmap',
+                        'data': monthly_patterns.values.tolist(),
+                        'rows': monthly_patterns.index.tolist(),
+                        'columns': monthly_patterns.columns.tolist(),
+                        'cmap': 'RdYlGn',
+                        'center': float(monthly_patterns.mean().mean()),
+                        'fmt': '.1f',
+                        'xticklabels': ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+                                        'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'],
+                        'figsize': (15, 8),
+                        'title': 'Monthly New Passenger Patterns by City\n' +
+                                 '(Higher values indicate potential tourist seasons)',
+                        'xtick_rotation': 45
+                    }
+                })
+                stages.mark('generate_visualizations', bytes=ChartRenderer.encoded_bytes(plots))
 
             # 6. Classify Cities
             tourism_threshold = 1.1  # 10% higher weekend activity
@@ -192,21 +163,10 @@ class TourismBusinessAnalysisService:
                     "peak_new_passenger_ratio": float(peak_months.loc[city['city_name']]['new_passenger_ratio'])
                 }
                 city_classifications.append(classification)
+            stages.mark('classify_cities')
 
             # 7. Prepare Analysis Results
             analysis_results = {
-                "visualizations": {
-                    "weekend_weekday_ratio": {
-                        "plot": ratio_plot,
-                        "type": "image/png",
-                        "encoding": "base64"
-                    },
-                    "monthly_patterns": {
-                        "plot": heatmap_plot,
-                        "type": "image/png",
-                        "encoding": "base64"
-                    }
-                },
                 "city_classifications": city_classifications,
                 "tourism_metrics": {
                     "tourism_heavy_cities": len([
@@ -256,6 +216,10 @@ class TourismBusinessAnalysisService:
                 }
             }
 
+            if include_plots:
+                analysis_results["visualizations"] = plots
+
+            stages.mark('prepare_analysis_results')
             return analysis_results
 
         except Exception as e:
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+from services.fastapi.dataset_store import DatasetStore
+from services.fastapi.trips_enriched import TripsEnriched
+
+class TripsCube:
+    """
+    Pre-aggregated cube of trip measures at city x month x day_type x
+    passenger_type grain.
+
+    Each cell holds additive partials (count, sum, sum of squares, min, max)
+    for every measure, so any coarser grouping can be answered by rolling the
+    cube up instead of scanning fact_trips. Every trip is in the cube: cells
+    with a missing dimension value (a null key, or a city_id or date absent
+    from the dimension tables) are kept. Built once per data version.
+    """
+    NAME = 'trips_cube'
+    DIMENSIONS = [
+        'city_id', 'city_name',
+        'start_of_month', 'month_name', 'month_number',
+        'day_type', 'passenger_type'
+    ]
+    MEASURES = ['fare_amount', 'distance_travelled(km)', 'passenger_rating', 'driver_rating']
+    PARTIALS = {'count': 'sum', 'sum': 'sum', 'sumsq': 'sum', 'min': 'min', 'max': 'max'}
+
+    @staticmethod
+    def build():
+        trips = TripsEnriched.get()
+
+        parts = pd.DataFrame({dim: trips[dim] for dim in TripsCube.DIMENSIONS})
+        parts['trip_count'] = 1
+        for measure in TripsCube.MEASURES:
+            values = trips[measure]
+            if values.dtype.kind == 'f':
+                values = values.astype('float64')
+            parts[f'{measure}|count'] = values.notna().astype('int64')
+            parts[f'{measure}|sum'] = values
+            parts[f'{measure}|sumsq'] = values.astype('float64') ** 2
+            parts[f'{measure}|min'] = values
+            parts[f'{measure}|max'] = values
+
+        return parts.groupby(TripsCube.DIMENSIONS, observed=True, sort=True, dropna=False).agg(
+            TripsCube._partial_aggregations(TripsCube.MEASURES)
+        ).reset_index()
+
+    @staticmethod
+    def get():
+        """Get the shared cube, rebuilding it if any source table changed."""
+        return DatasetStore.derived(TripsCube.NAME, TripsEnriched.SOURCES, TripsCube.build)
+
+    @staticmethod
+    def _partial_aggregations(measures):
+        aggregations = {'trip_count': 'sum'}
+        for measure in measures:
+            for partial, func in TripsCube.PARTIALS.items():
+                aggregations[f'{measure}|{partial}'] = func
+        return aggregations
+
+    @staticmethod
+    def _statistic(rolled, column, func):
+        if column == 'trip_id':
+            if func != 'count':
+                raise ValueError(f"Unsupported aggregation '{func}' for trip_id")
+            return rolled['trip_count']
+        if column not in TripsCube.MEASURES:
+            raise ValueError(f"'{column}' is not a cube measure")
+
+        count = rolled[f'{column}|count']
+        total = rolled[f'{column}|sum']
+        if func == 'count':
+            return count
+        if func == 'sum':
+            return total
+        if func == 'mean':
+            return total / count
+        if func in ('min', 'max'):
+            return rolled[f'{column}|{func}']
+        if func in ('var', 'std'):
+            variance = (rolled[f'{column}|sumsq'] - total * total / count) / (count - 1)
+            variance = variance.clip(lower=0).where(count > 1)
+            return np.sqrt(variance) if func == 'std' else variance
+        raise ValueError(f"Unsupported aggregation '{func}'")
+
+    @staticmethod
+    def rollup(by, agg):
+        """
+        Roll the cube up to the `by` dimensions.
+
+        `agg` follows the DataFrame.agg dict form, e.g.
+        {'fare_amount': 'mean', 'distance_travelled(km)': ['mean', 'sum']};
+        use {'trip_id': 'count'} for trip counts. Supported functions are
+        count, sum, mean, min, max, var and std. With by=None the whole cube
+        is reduced and a Series is returned. As with DataFrame.groupby, groups
+        whose `by` value is missing are left out; by=None covers every trip.
+        """
+        cube = TripsCube.get()
+        measures = [col for col in agg if col != 'trip_id']
+
+        if by is None:
+            grouped = cube.assign(_all=0).groupby('_all')
+        else:
+            grouped = cube.groupby(by, observed=True, sort=True)
+        rolled = grouped.agg(TripsCube._partial_aggregations(measures))
+
+        result = pd.DataFrame(index=rolled.index)
+        multi_function = any(isinstance(funcs, (list, tuple)) for funcs in agg.values())
+        for column, funcs in agg.items():
+            for func in (funcs if isinstance(funcs, (list, tuple)) else [funcs]):
+                name = (column, func) if multi_function else column
+                result[name] = TripsCube._statistic(rolled, column, func)
+        if multi_function:
+            result.columns = pd.MultiIndex.from_tuples(result.columns)
+
+        return result.iloc[0] if by is None else result
@@ -0,0 +1,41 @@
+import pandas as pd
+from config.__init__ import DataPaths
+from services.fastapi.dataset_store import DatasetStore
+
+class TripsEnriched:
+    """
+    fact_trips joined once with dim_city and dim_date.
+
+    Adds city_name, month_name, start_of_month, day_type and month_number to
+    every trip. The joins are left joins: a trip whose city_id or date is
+    missing from the dimension tables is kept with empty attributes, as
+    fact_trips itself would count it. The table is materialized once per
+    version of its source files and shared (read-only) by all services.
+    """
+    NAME = 'trips_enriched'
+    SOURCES = [DataPaths.FACT_TRIPS, DataPaths.DIM_CITY, DataPaths.DIM_DATE]
+
+    @staticmethod
+    def build():
+        fact_trips = DatasetStore.get(DataPaths.FACT_TRIPS)
+        dim_city = DatasetStore.get(DataPaths.DIM_CITY)
+        dim_date = DatasetStore.get(DataPaths.DIM_DATE)
+
+        date_attributes = dim_date[['date', 'month_name', 'start_of_month', 'day_type']].assign(
+            month_number=pd.to_datetime(dim_date['date']).dt.month
+        )
+
+        return fact_trips.merge(
+            dim_city[['city_id', 'city_name']],
+            on='city_id',
+            how='left'
+        ).merge(
+            date_attributes,
+            on='date',
+            how='left'
+        )
+
+    @staticmethod
+    def get():
+        """Get the shared enriched trips table, rebuilding it if any source changed."""
+        return DatasetStore.derived(TripsEnriched.NAME, TripsEnriched.SOURCES, TripsEnriched.build)
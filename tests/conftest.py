@@ -0,0 +1,39 @@
+import os
+import sys
+from collections import OrderedDict
+import numpy as np
+import pytest
+
+# Services import config.__init__ and read csv_files/, models/ and cache/
+# relative to the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+@pytest.fixture
+def model_registry(tmp_path, monkeypatch):
+    """An empty ModelStore registry under tmp_path, with nothing resident."""
+    from services.fastapi.model_store import ModelStore
+    registry = str(tmp_path / 'registry')
+    monkeypatch.setattr(ModelStore, 'REGISTRY_DIR', registry)
+    monkeypatch.setattr(ModelStore, 'CURRENT_POINTER', os.path.join(registry, 'CURRENT'))
+    monkeypatch.setattr(ModelStore, '_bundles', OrderedDict())
+    monkeypatch.setattr(ModelStore, '_pointer', {'signature': None, 'version': None})
+    return ModelStore
+
+@pytest.fixture
+def model_artifacts():
+    """Build {'model', 'scaler', 'metadata'} of a linear model fitted to random trips for a seed."""
+    from sklearn.linear_model import LinearRegression
+    from sklearn.preprocessing import StandardScaler
+    from services.fastapi.ml_satisfaction_prediction import MLSatisfactionPredictionService
+
+    def build(seed):
+        features = MLSatisfactionPredictionService.FEATURES
+        rng = np.random.default_rng(seed)
+        values = rng.uniform(1, 10, (50, len(features)))
+        target = values @ rng.uniform(-1, 1, len(features)) + seed
+        scaler = StandardScaler().fit(values)
+        model = LinearRegression().fit(scaler.transform(values), target)
+        return {'model': model, 'scaler': scaler, 'metadata': {'features': features, 'seed': seed, 'model_reliability': 0.9}}
+    return build
@@ -0,0 +1,69 @@
+import shutil
+import pytest
+from fastapi.testclient import TestClient
+from config.__init__ import DataPaths
+from services.fastapi.chart_renderer import ChartRenderer
+from services.fastapi.plot_cache import PlotCache
+
+URL = '/api/v1/analysis/city-repeat-passengers'
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """
+    Client for an analysis that reads only shipped tables, with its repeat
+    trip table copied under tmp_path so tests can change it.
+    """
+    from main import app
+    table = str(tmp_path / 'dim_repeat_trip_distribution.csv')
+    shutil.copy(DataPaths.DIM_REPEAT_TRIP_DISTRIBUTION, table)
+    tables = [table if path == DataPaths.DIM_REPEAT_TRIP_DISTRIBUTION else path for path in DataPaths.CSV_TABLES]
+    monkeypatch.setattr(DataPaths, 'DIM_REPEAT_TRIP_DISTRIBUTION', table)
+    monkeypatch.setattr(DataPaths, 'CSV_TABLES', tables)
+    return TestClient(app)
+
+def test_responses_carry_an_etag_and_are_cached(client):
+    first = client.get(URL, params={'include_plots': False})
+    assert first.status_code == 200
+    assert first.headers['etag'].startswith('"')
+    second = client.get(URL, params={'include_plots': False})
+    assert second.headers['etag'] == first.headers['etag']
+    assert second.headers['x-cache'] == 'hit'
+    assert second.content == first.content
+
+@pytest.mark.parametrize('header', ['{etag}', 'W/{etag}', '"other", {etag}', '*'])
+def test_matching_if_none_match_returns_304(client, header):
+    etag = client.get(URL, params={'include_plots': False}).headers['etag']
+    response = client.get(URL, params={'include_plots': False}, headers={'If-None-Match': header.format(etag=etag)})
+    assert response.status_code == 304
+    assert response.content == b''
+    assert response.headers['etag'] == etag
+
+def test_other_etags_get_a_full_response(client):
+    etag = client.get(URL, params={'include_plots': False}).headers['etag']
+    response = client.get(URL, params={'include_plots': False}, headers={'If-None-Match': '"other"'})
+    assert response.status_code == 200
+    assert response.headers['etag'] == etag
+
+def test_chart_spec_changes_invalidate_the_etag(client, monkeypatch):
+    etag = client.get(URL, params={'include_plots': False}).headers['etag']
+    monkeypatch.setattr(ChartRenderer, 'SPEC_VERSION', ChartRenderer.SPEC_VERSION + 1)
+    response = client.get(URL, params={'include_plots': False}, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['etag'] != etag
+
+def test_data_changes_invalidate_the_etag(client):
+    etag = client.get(URL, params={'include_plots': False}).headers['etag']
+    with open(DataPaths.DIM_REPEAT_TRIP_DISTRIBUTION, 'a') as f:
+        f.write('\n')
+    response = client.get(URL, params={'include_plots': False}, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['etag'] != etag
+
+def test_plot_revalidation_returns_304_without_rendering(client, monkeypatch):
+    def fail(specs):
+        raise AssertionError("a revalidated plot must not be rendered")
+    monkeypatch.setattr(ChartRenderer, 'render_many', fail)
+    etag = f'"{PlotCache.key("city-repeat-passengers", {"plot_id": "frequency_heatmap"})}"'
+    response = client.get(f'{URL}/plots/frequency_heatmap.png', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['etag'] == etag
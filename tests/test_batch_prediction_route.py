@@ -0,0 +1,51 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from config.__init__ import PredictionConfig
+
+BATCH_URL = '/api/v1/ml/predict-satisfaction/batch'
+TRIP = {'distance_travelled(km)': 15.5, 'fare_amount': 250.0, 'passenger_rating': 4.5, 'driver_rating': 4.8}
+
+@pytest.fixture
+def client(model_registry, model_artifacts):
+    from main import app
+    model_registry.publish(model_artifacts(1))
+    return TestClient(app)
+
+def test_invalid_trips_are_rejected_with_their_position(client):
+    trips = [TRIP, dict(TRIP, **{'distance_travelled(km)': 0}), {'fare_amount': 10}]
+    response = client.post(BATCH_URL, json=trips)
+    assert response.status_code == 422
+    locations = [error['loc'] for error in response.json()['detail']]
+    assert [1, 'distance_travelled(km)'] in locations
+    assert [2, 'distance_travelled(km)'] in locations
+
+def test_invalid_ndjson_line_is_rejected(client):
+    body = json.dumps(TRIP) + '\n' + json.dumps(dict(TRIP, passenger_rating='high')) + '\n'
+    response = client.post(BATCH_URL, content=body, headers={'content-type': 'application/x-ndjson'})
+    assert response.status_code == 422
+    assert response.json()['detail'][0]['loc'][:2] == [1, 'passenger_rating']
+
+def test_malformed_bodies_are_rejected(client):
+    assert client.post(BATCH_URL, content='not json').status_code == 400
+    assert client.post(BATCH_URL, json=TRIP).status_code == 400
+
+def test_batches_over_the_item_limit_are_rejected(client, monkeypatch):
+    monkeypatch.setattr(PredictionConfig, 'BATCH_MAX_ITEMS', 3)
+    response = client.post(BATCH_URL, json=[TRIP] * 4)
+    assert response.status_code == 413
+    assert 'limit of 3' in response.json()['detail']
+
+def test_bodies_over_the_byte_limit_are_rejected(client, monkeypatch):
+    monkeypatch.setattr(PredictionConfig, 'BATCH_MAX_BYTES', 200)
+    response = client.post(BATCH_URL, json=[TRIP] * 4)
+    assert response.status_code == 413
+    assert 'limit of 200 bytes' in response.json()['detail']
+
+    chunked = client.post(BATCH_URL, content=iter([json.dumps([TRIP] * 4).encode()]))
+    assert chunked.status_code == 413
+
+def test_empty_batch_returns_an_empty_array(client):
+    response = client.post(BATCH_URL, json=[])
+    assert response.status_code == 200
+    assert response.json() == []
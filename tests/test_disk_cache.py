@@ -0,0 +1,37 @@
+import os
+from services.fastapi.disk_cache import DiskCacheTier
+
+def tier(tmp_path, max_bytes=1000):
+    config = type('Config', (), {'DISK_DIR': str(tmp_path / 'cache'), 'DISK_MAX_BYTES': max_bytes})
+    return DiskCacheTier(config)
+
+def test_round_trips_and_misses(tmp_path):
+    cache = tier(tmp_path)
+    cache.write('ab12', b'{"plot": 1}')
+    assert cache.read('ab12') == b'{"plot": 1}'
+    assert cache.read('cd34') is None
+
+def test_prunes_least_recently_used_files_beyond_the_cap(tmp_path):
+    cache = tier(tmp_path, max_bytes=1000)
+    keys = [f"{index:02d}key" for index in range(6)]
+    for index, key in enumerate(keys[:4]):
+        cache.write(key, b'x' * 200)
+        # Distinct mtimes, oldest first
+        os.utime(cache.path(key), ns=(index * 10**9, index * 10**9))
+    # Reading the oldest entry makes it the most recently used
+    assert cache.read(keys[0]) is not None
+
+    cache.write(keys[4], b'x' * 200)
+    cache.write(keys[5], b'x' * 200)
+
+    remaining = [key for key in keys if os.path.exists(cache.path(key))]
+    assert sum(os.path.getsize(cache.path(key)) for key in remaining) <= 1000 * DiskCacheTier.PRUNE_TO
+    assert keys[0] in remaining and keys[5] in remaining
+    assert keys[1] not in remaining
+    assert cache.stats()['disk_pruned_files'] == len(keys) - len(remaining)
+
+def test_clear_deletes_every_file(tmp_path):
+    cache = tier(tmp_path)
+    cache.write('ab12', b'1')
+    cache.clear()
+    assert cache.read('ab12') is None
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from config.__init__ import ModelRegistryConfig
+
+def test_publish_activates_and_serves_the_folded_model(model_registry, model_artifacts):
+    published = model_artifacts(1)
+    bundle = model_registry.publish(published)
+
+    assert model_registry.current_version() == bundle['version']
+    assert model_registry.valid_version(bundle['version'])
+    features = np.random.default_rng(0).uniform(1, 10, (5, len(published['metadata']['features'])))
+    expected = published['model'].predict(published['scaler'].transform(features))
+    np.testing.assert_allclose(model_registry.get()['predictor'].predict(features), expected)
+
+def test_activate_rolls_back_and_pins_other_versions(model_registry, model_artifacts):
+    first = model_registry.publish(model_artifacts(1))['version']
+    second = model_registry.publish(model_artifacts(2))['version']
+    assert model_registry.current_version() == second
+
+    assert model_registry.activate(first) == first
+    assert model_registry.get()['metadata']['seed'] == 1
+    assert model_registry.get(second)['metadata']['seed'] == 2
+    assert [entry['version'] for entry in model_registry.versions()] == [second, first]
+
+def test_publish_without_activation_keeps_the_current_version(model_registry, model_artifacts):
+    first = model_registry.publish(model_artifacts(1))['version']
+    second = model_registry.publish(model_artifacts(2), activate=False)['version']
+    assert model_registry.current_version() == first
+    assert model_registry.has_version(second)
+
+def test_prune_keeps_retained_versions_and_the_current_one(model_registry, model_artifacts, monkeypatch):
+    monkeypatch.setattr(ModelRegistryConfig, 'RETAINED_VERSIONS', 2)
+    oldest = model_registry.publish(model_artifacts(0))['version']
+    for seed in range(1, 4):
+        model_registry.publish(model_artifacts(seed), activate=False)
+
+    kept = [entry['version'] for entry in model_registry.versions()]
+    assert len(kept) == 3
+    assert oldest in kept
+    assert model_registry.current_version() == oldest
+
+@pytest.mark.parametrize('version', [
+    '../satisfaction_predictor', '../../models/scaler', '/etc/passwd', 'CURRENT',
+    '20240101T000000000000Z-abcdeg'
+])
+def test_rejects_versions_publish_could_not_have_named(model_registry, model_artifacts, version):
+    model_registry.publish(model_artifacts(1))
+    assert not model_registry.valid_version(version)
+    assert not model_registry.has_version(version)
+    with pytest.raises(LookupError):
+        model_registry.get(version)
+    with pytest.raises(LookupError):
+        model_registry.activate(version)
+
+def test_prediction_route_returns_404_for_a_path_like_version(model_registry, model_artifacts):
+    from main import app
+    model_registry.publish(model_artifacts(1))
+    client = TestClient(app)
+    trip = {'distance_travelled(km)': 15.5, 'fare_amount': 250.0, 'passenger_rating': 4.5, 'driver_rating': 4.8}
+    for path in ('/api/v1/ml/predict-satisfaction', '/api/v1/ml/predict-satisfaction/batch'):
+        payload = trip if path.endswith('satisfaction') else [trip]
+        response = client.post(path, params={'model_version': '../satisfaction_predictor'}, json=payload)
+        assert response.status_code == 404
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+from services.fastapi.similar_trips_index import SimilarTripsIndex
+
+def trips_frame(rows=6000, seed=0):
+    """Trips on a 0.25 km x 5 fare grid (the default bin widths), so many lie exactly on bin edges."""
+    rng = np.random.default_rng(seed)
+    trips = pd.DataFrame({
+        'distance_travelled(km)': rng.integers(4, 200, rows) * 0.25,
+        'fare_amount': rng.integers(10, 240, rows) * 5.0,
+        'passenger_rating': rng.integers(1, 11, rows).astype(float),
+        'driver_rating': rng.integers(1, 11, rows).astype(float)
+    })
+    # Some continuous values, and trips without ratings or without a fare
+    trips.loc[::7, 'fare_amount'] += rng.uniform(0, 5, len(trips.loc[::7]))
+    trips.loc[::11, ['passenger_rating', 'driver_rating']] = np.nan
+    trips.loc[::97, 'fare_amount'] = np.nan
+    return trips
+
+def brute_force(trips, distance, fare, distance_tolerance, fare_tolerance):
+    matched = trips[
+        (abs(trips['distance_travelled(km)'] - distance) <= distance_tolerance) &
+        (abs(trips['fare_amount'] - fare) <= fare_tolerance)
+    ]
+    satisfaction = matched[['passenger_rating', 'driver_rating']].mean(axis=1).dropna()
+    if len(satisfaction) == 0:
+        return len(matched), np.nan, np.nan
+    return len(matched), satisfaction.mean(), satisfaction.std(ddof=0)
+
+def queries(trips, seed=1):
+    rng = np.random.default_rng(seed)
+    complete = trips.dropna(subset=['fare_amount'])
+    # Trip values (box bounds on bin edges), arbitrary points, and boxes outside the data
+    distances = np.concatenate([
+        complete['distance_travelled(km)'].to_numpy()[:150],
+        rng.uniform(-5, 60, 100), [0.0, 1.0, 49.75, 80.0]
+    ])
+    fares = np.concatenate([
+        complete['fare_amount'].to_numpy()[:150],
+        rng.uniform(-100, 1300, 100), [0.0, 50.0, 1195.0, 5000.0]
+    ])
+    return distances, fares
+
+@pytest.fixture
+def binned(monkeypatch):
+    monkeypatch.setattr(SimilarTripsIndex, 'MAX_CELLS', 10)
+    monkeypatch.setattr(SimilarTripsIndex, 'EDGE_BLOCK_TRIPS', 5000)
+
+@pytest.mark.parametrize('tolerances', [(2, 50), (0.25, 5), (0.1, 2.5), (30, 2000)])
+def test_exact_layout_matches_brute_force(tolerances):
+    trips = trips_frame()
+    index = SimilarTripsIndex.from_chunks(lambda: [trips])
+    assert index.layout == SimilarTripsIndex.EXACT
+    check(index, trips, tolerances)
+
+@pytest.mark.parametrize('tolerances', [(2, 50), (0.25, 5), (0.1, 2.5), (30, 2000)])
+def test_binned_layout_matches_brute_force(binned, tolerances):
+    trips = trips_frame()
+    index = SimilarTripsIndex.from_chunks(lambda: [trips.iloc[:2500], trips.iloc[2500:]])
+    assert index.layout == SimilarTripsIndex.BINNED
+    assert index.index_stats()['bin_widths'] == {'distance_travelled(km)': 0.25, 'fare_amount': 5.0}
+    check(index, trips, tolerances)
+
+def test_binned_layout_fits_the_cell_budget(binned, monkeypatch):
+    monkeypatch.setattr(SimilarTripsIndex, 'BINNED_CELLS', 200)
+    trips = trips_frame()
+    index = SimilarTripsIndex.from_chunks(lambda: [trips])
+    rows, columns = index.index_stats()['grid_shape']
+    assert rows * columns <= 200
+    check(index, trips, (2, 50))
+
+def check(index, trips, tolerances):
+    distances, fares = queries(trips)
+    counts, means, stds = index.query_many(distances, fares, *tolerances)
+    for i, (distance, fare) in enumerate(zip(distances, fares)):
+        count, mean, std = brute_force(trips, distance, fare, *tolerances)
+        assert counts[i] == count
+        np.testing.assert_allclose([means[i], stds[i]], [mean, std], rtol=1e-9, atol=1e-9)
+
+        single = index.query(distance, fare, *tolerances)
+        assert single['count'] == count
+        assert (single['mean'] is None) == np.isnan(mean)
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import r2_score
+from config.__init__ import DataPaths, TrainingConfig
+from services.fastapi.streaming_regression import MomentAccumulator
+
+# Streaming and in-memory fits solve the same least-squares problem through
+# different arithmetic; they must agree to these tolerances
+COEF_TOLERANCE = 1e-9
+R2_TOLERANCE = 1e-9
+
+def regression_data(rows=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.normal([10, 300, 7, 7], [5, 100, 1.5, 1.5], (rows, 4))
+    y = x @ np.array([0.02, -0.001, 0.5, 0.4]) + 1.5 + rng.normal(0, 0.3, rows)
+    return x, y
+
+def accumulate(x, y, block_sizes):
+    moments = MomentAccumulator(x.shape[1] + 1)
+    values = np.column_stack([x, y])
+    start = 0
+    for size in block_sizes:
+        moments.update(values[start:start + size])
+        start += size
+    moments.update(values[start:])
+    return moments
+
+def test_fit_matches_sklearn():
+    x, y = regression_data()
+    moments = accumulate(x, y, [1, 999, 1500, 0, 700])
+    coef, intercept = moments.fit([0, 1, 2, 3], 4)
+
+    reference = LinearRegression().fit(x, y)
+    np.testing.assert_allclose(coef, reference.coef_, rtol=0, atol=COEF_TOLERANCE)
+    assert intercept == pytest.approx(reference.intercept_, abs=COEF_TOLERANCE)
+
+    residual = y - x @ coef - intercept
+    assert moments.r2(float(np.sum(residual ** 2)), 4) == pytest.approx(
+        r2_score(y, reference.predict(x)), abs=R2_TOLERANCE
+    )
+    np.testing.assert_allclose(moments.mean, np.column_stack([x, y]).mean(axis=0))
+    np.testing.assert_allclose(moments.variance(ddof=1)[:4], x.var(axis=0, ddof=1))
+
+def test_merge_is_independent_of_block_order():
+    x, y = regression_data(rows=3000, seed=1)
+    values = np.column_stack([x, y])
+    blocks = [MomentAccumulator(5).update(block) for block in np.array_split(values, 7)]
+    forward = MomentAccumulator.combine(blocks)
+    backward = MomentAccumulator.combine(reversed(blocks))
+    assert forward.n == backward.n == len(values)
+    np.testing.assert_allclose(forward.comoment, backward.comoment, rtol=1e-12)
+    np.testing.assert_allclose(forward.mean, backward.mean, rtol=1e-12)
+
+def test_r2_of_a_constant_target_follows_sklearn():
+    moments = MomentAccumulator(2).update(np.column_stack([np.arange(5.0), np.full(5, 3.0)]))
+    assert moments.r2(0.0, 1) == 1.0
+    assert moments.r2(0.5, 1) == 0.0
+
+@pytest.fixture
+def synthetic_trips(tmp_path, monkeypatch):
+    """A fact_trips CSV of random trips under tmp_path, used as DataPaths.FACT_TRIPS."""
+    rng = np.random.default_rng(2)
+    rows = 4000
+    trips = pd.DataFrame({
+        'trip_id': [f"T{index}" for index in range(rows)],
+        'city_id': rng.choice(['AP01', 'GJ01', 'KA01'], rows),
+        'distance_travelled(km)': rng.integers(5, 50, rows).astype(float),
+        'fare_amount': rng.integers(50, 1000, rows).astype(float),
+        'passenger_rating': rng.integers(1, 11, rows).astype(float),
+        'driver_rating': rng.integers(1, 11, rows).astype(float)
+    })
+    trips.loc[rng.choice(rows, 40, replace=False), 'fare_amount'] = np.nan
+    path = str(tmp_path / 'fact_trips.csv')
+    trips.to_csv(path, index=False)
+    monkeypatch.setattr(DataPaths, 'FACT_TRIPS', path)
+    monkeypatch.setattr(TrainingConfig, 'STREAMING_CHUNK_SIZE', 700)
+    return path
+
+def test_streaming_training_agrees_with_in_memory(model_registry, synthetic_trips):
+    from services.fastapi.ml_satisfaction_prediction import MLSatisfactionPredictionService as service
+
+    in_memory = service.train_model(mode='in_memory')
+    in_memory_model = model_registry.get()
+    streaming = service.train_model(mode='streaming')
+    streaming_model = model_registry.get()
+    assert streaming_model['metadata']['training_mode'] == 'streaming'
+
+    # The target is the mean of two features, so both fits are exact: the
+    # errors must come from the residuals, not from cancelling moment terms
+    np.testing.assert_allclose(
+        streaming_model['predictor'].weights, in_memory_model['predictor'].weights, rtol=0, atol=COEF_TOLERANCE
+    )
+    assert streaming_model['predictor'].intercept == pytest.approx(
+        in_memory_model['predictor'].intercept, abs=COEF_TOLERANCE
+    )
+    for report in (in_memory, streaming):
+        performance = report['model_performance']
+        assert performance['r2_score'] == pytest.approx(1.0, abs=R2_TOLERANCE)
+        assert performance['cv_mean_score'] == pytest.approx(1.0, abs=R2_TOLERANCE)
+        assert performance['rmse'] < 1e-12
+        assert performance['mae'] < 1e-12
+    assert streaming_model['metadata']['model_reliability'] == pytest.approx(
+        in_memory_model['metadata']['model_reliability'], abs=0.02
+    )
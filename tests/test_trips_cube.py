@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+from config.__init__ import DataPaths
+from services.fastapi.dataset_store import DatasetStore
+from services.fastapi.trips_cube import TripsCube
+from services.fastapi.trips_enriched import TripsEnriched
+
+@pytest.fixture
+def tables(tmp_path, monkeypatch):
+    """
+    Small fact_trips, dim_city and dim_date tables used as the DataPaths
+    tables, with orphan trips: a city_id and a date missing from the
+    dimension tables, and a null passenger_type.
+    """
+    rng = np.random.default_rng(0)
+    dates = pd.date_range('2024-01-01', '2024-02-29')
+    rows = 300
+    fact_trips = pd.DataFrame({
+        'trip_id': [f"T{index}" for index in range(rows)],
+        'date': rng.choice(dates.strftime('%Y-%m-%d'), rows),
+        'city_id': rng.choice(['AP01', 'GJ01', 'KA01'], rows),
+        'passenger_type': rng.choice(['new', 'repeated'], rows),
+        'distance_travelled(km)': rng.integers(5, 50, rows),
+        'fare_amount': rng.integers(50, 1000, rows),
+        'passenger_rating': rng.integers(1, 11, rows),
+        'driver_rating': rng.integers(1, 11, rows)
+    })
+    fact_trips.loc[0, 'city_id'] = 'XX99'
+    fact_trips.loc[1, 'date'] = '2023-12-31'
+    fact_trips.loc[2, 'passenger_type'] = None
+    dim_city = pd.DataFrame({'city_id': ['AP01', 'GJ01', 'KA01'], 'city_name': ['Visakhapatnam', 'Surat', 'Mysore']})
+    dim_date = pd.DataFrame({
+        'date': dates.strftime('%Y-%m-%d'),
+        'start_of_month': dates.to_period('M').to_timestamp().strftime('%Y-%m-%d'),
+        'month_name': dates.month_name(),
+        'day_type': np.where(dates.dayofweek < 5, 'Weekday', 'Weekend')
+    })
+
+    paths = {}
+    for name, frame in (('FACT_TRIPS', fact_trips), ('DIM_CITY', dim_city), ('DIM_DATE', dim_date)):
+        paths[name] = str(tmp_path / f"{name.lower()}.csv")
+        frame.to_csv(paths[name], index=False)
+        monkeypatch.setattr(DataPaths, name, paths[name])
+    monkeypatch.setattr(TripsEnriched, 'SOURCES', [paths['FACT_TRIPS'], paths['DIM_CITY'], paths['DIM_DATE']])
+    monkeypatch.setattr(DatasetStore, '_tables', {})
+    monkeypatch.setattr(DatasetStore, '_derived', {})
+    return fact_trips, dim_city
+
+def test_enriched_trips_keep_orphan_rows(tables):
+    fact_trips, _ = tables
+    enriched = TripsEnriched.get()
+    assert len(enriched) == len(fact_trips)
+    assert enriched.loc[enriched['city_id'] == 'XX99', 'city_name'].isna().all()
+    assert enriched.loc[enriched['trip_id'] == 'T1', 'month_name'].isna().all()
+
+def test_cube_totals_count_every_trip(tables):
+    fact_trips, _ = tables
+    totals = TripsCube.rollup(None, {'trip_id': 'count', 'fare_amount': ['sum', 'mean', 'std']})
+    assert totals[('trip_id', 'count')] == len(fact_trips)
+    assert totals[('fare_amount', 'sum')] == fact_trips['fare_amount'].sum()
+    assert totals[('fare_amount', 'mean')] == pytest.approx(fact_trips['fare_amount'].mean())
+    assert totals[('fare_amount', 'std')] == pytest.approx(fact_trips['fare_amount'].std())
+
+def test_rollup_matches_groupby_on_fact_trips(tables):
+    fact_trips, dim_city = tables
+    by_city = TripsCube.rollup('city_id', {'trip_id': 'count', 'passenger_rating': 'mean'})
+    expected = fact_trips.groupby('city_id').agg(trip_id=('trip_id', 'count'), passenger_rating=('passenger_rating', 'mean'))
+    assert 'XX99' in by_city.index
+    assert by_city['trip_id'].to_dict() == expected['trip_id'].to_dict()
+    for city_id, rating in expected['passenger_rating'].items():
+        assert by_city.loc[city_id, 'passenger_rating'] == pytest.approx(rating)
+
+    # Like a groupby on the joined trips, a missing key forms no group
+    by_type = TripsCube.rollup('passenger_type', {'trip_id': 'count'})
+    assert by_type['trip_id'].to_dict() == fact_trips.groupby('passenger_type')['trip_id'].count().to_dict()
+    by_name = TripsCube.rollup('city_name', {'trip_id': 'count'})
+    joined = fact_trips.merge(dim_city, on='city_id')
+    assert by_name['trip_id'].to_dict() == joined.groupby('city_name')['trip_id'].count().to_dict()